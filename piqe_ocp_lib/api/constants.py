@@ -9,7 +9,9 @@ class HttpStatusCode(Enum):
     OK = 200
     Accepted = 202
     BadRequest = 400
+    Unauthorized = 401
     NotFound = 404
     Conflict = 409
     UnprocessableEntity = 422
+    TooManyRequests = 429
     ServiceUnavailable = 503
@@ -1,7 +1,9 @@
 import logging
+from typing import Dict, Iterable, Iterator, Optional
 
 from piqe_ocp_lib import __loggername__
-from piqe_ocp_lib.api.monitoring.ocp_prometheus_client import OcpPrometheusClient
+from piqe_ocp_lib.api.monitoring.ocp_prometheus_client import OcpPrometheusClient, PrometheusQueryResult
+from piqe_ocp_lib.api.monitoring.ocp_prometheus_series import PrometheusMatrix, TimeType, to_epoch
 
 logger = logging.getLogger(__loggername__)
 
@@ -13,28 +15,59 @@ class OcpClusterStatsPrometheus:
         """
         self.prometheus_client = OcpPrometheusClient(kube_config_file=kube_config_file)
 
+    def iter_prometheus_ocp_labels(self) -> Iterator[str]:
+        """
+        Stream openshift stats labels from prometheus. Labels are yielded as the response is decoded.
+        :return: Generator of prometheus_labels
+        """
+        api_path = "/v1/label/__name__/values"
+        return self.prometheus_client.stream_stats(api_path=api_path)
+
     def get_prometheus_ocp_labels(self):
         """
         Get openshift stats labels from prometheus
         :return: (list) List of prometheus_labels
         """
-        api_path = "/v1/label/__name__/values"
-        api_response = self.prometheus_client.connect_and_collect_stats(api_path=api_path)
-        prometheus_labels = api_response.get("data")
+        prometheus_labels = list(self.iter_prometheus_ocp_labels())
 
         return prometheus_labels
 
+    def iter_prometheus_ocp_jobs(self) -> Iterator[str]:
+        """
+        Stream openshift jobs name from prometheus. Jobs are yielded as the response is decoded.
+        :return: Generator of prometheus_jobs
+        """
+        api_path = "/v1/label/job/values"
+        return self.prometheus_client.stream_stats(api_path=api_path)
+
     def get_prometheus_ocp_jobs(self):
         """
         Get openshift jobs name from prometheus
         :return: (list) List of prometheus_jobs
         """
-        api_path = "/v1/label/job/values"
-        api_response = self.prometheus_client.connect_and_collect_stats(api_path=api_path)
-        prometheus_jobs = api_response.get("data")
+        prometheus_jobs = list(self.iter_prometheus_ocp_jobs())
 
         return prometheus_jobs
 
+    def iter_prometheus_series(
+        self, match: Iterable[str], start: Optional[TimeType] = None, end: Optional[TimeType] = None
+    ) -> Iterator[Dict[str, str]]:
+        """
+        Stream the label sets of the series matching series selectors from prometheus. Series are yielded
+        as the response is decoded.
+        :param match: (list) Series selectors i.e. ['up', 'container_memory_usage_bytes{namespace="default"}']
+        :param start: (optional | datetime | float) Start of the time range
+        :param end: (optional | datetime | float) End of the time range
+        :return: Generator of series labels (dict)
+        """
+        api_path = "/v1/series"
+        params = {"match[]": list(match)}
+        if start is not None:
+            params["start"] = to_epoch(start)
+        if end is not None:
+            params["end"] = to_epoch(end)
+        return self.prometheus_client.stream_stats(api_path=api_path, params=params)
+
     def get_cluster_stats_using_query_param(self, label=None):
         """
         Get cluster stats from prometheus using query parameter
@@ -49,3 +82,38 @@ class OcpClusterStatsPrometheus:
             prometheus_data = api_response.get("data")
 
         return prometheus_data
+
+    def get_cluster_stats_using_query_params(
+        self, labels: Iterable[str], max_workers: Optional[int] = None
+    ) -> Dict[str, PrometheusQueryResult]:
+        """
+        Get cluster stats of many labels concurrently from prometheus
+        :param labels: (list) prometheus labels or queries
+        :param max_workers: (int) Max number of concurrent queries
+        :return: (dict) PrometheusQueryResult with prometheus_data, latency and error of every label keyed by label
+        """
+        query_results = self.prometheus_client.batch_query(labels, api_path="/v1/query", max_workers=max_workers)
+        failed_labels = [label for label, result in query_results.items() if result.error]
+        if failed_labels:
+            logger.error("Failed to get cluster stats for labels : %s", failed_labels)
+
+        return query_results
+
+    def get_cluster_stats_using_range_query(
+        self, query: str, start: TimeType, end: TimeType, step: float = 15, use_cache: bool = True
+    ) -> Optional[PrometheusMatrix]:
+        """
+        Get cluster stats over a time range from prometheus using query_range. Ranges returning more
+        than 11000 points per series are split into consecutive queries and merged.
+        :param query: (str) prometheus query i.e. namespace:container_cpu_usage:sum
+        :param start: (datetime | float) Start of the time range as datetime or epoch timestamp
+        :param end: (datetime | float) End of the time range as datetime or epoch timestamp
+        :param step: (float) Query resolution step in seconds
+        :param use_cache: (bool) Serve cached chunks of the time range and only fetch missing ones
+        :return: PrometheusMatrix with timestamps and values of every series on success or None on failure
+        """
+        matrix = self.prometheus_client.query_range(query, start=start, end=end, step=step, use_cache=use_cache)
+        if matrix is not None:
+            logger.info("Range query %s returned %s series, %s samples", query, len(matrix), matrix.sample_count)
+
+        return matrix
@@ -0,0 +1,174 @@
+from collections import OrderedDict
+import gzip
+import json
+import logging
+import math
+from threading import RLock
+import time
+from typing import Callable, Dict, List, Tuple
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.monitoring.ocp_prometheus_series import PrometheusMatrix
+
+logger = logging.getLogger(__loggername__)
+
+# (source, query, step, chunk index)
+ChunkKey = Tuple[str, str, float, int]
+
+CACHE_FILE_VERSION = 1
+
+
+class PrometheusRangeCache:
+    """
+    Cache of prometheus range query results split in step aligned chunks. Chunk boundaries are aligned
+    on multiples of step * chunk_points since the epoch, so overlapping time ranges of the same query and
+    step share chunks. A range query is served from cached chunks and only missing chunks are fetched.
+
+    Chunks ending less than min_chunk_age seconds ago are not cached since prometheus may still ingest
+    samples for them. The cache can be saved to and loaded from a gzip compressed JSON file so it can be
+    reused between analysis runs.
+    :param chunk_points: (int) Number of steps per chunk
+    :param max_chunks: (int) Max number of cached chunks. Least recently used chunks are evicted first
+    :param min_chunk_age: (int) Min age in seconds of the end of a chunk to be cached
+    :return: None
+    """
+
+    def __init__(self, chunk_points: int = 720, max_chunks: int = 1000, min_chunk_age: int = 300):
+        self.chunk_points = chunk_points
+        self.max_chunks = max_chunks
+        self.min_chunk_age = min_chunk_age
+        # chunk key -> list of {"metric": {labels}, "values": [[timestamp, "value"], ...]}
+        self._chunks: "OrderedDict[ChunkKey, List[dict]]" = OrderedDict()
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def _put(self, key: ChunkKey, results: List[dict]):
+        with self._lock:
+            self._chunks[key] = results
+            self._chunks.move_to_end(key)
+            while len(self._chunks) > self.max_chunks:
+                self._chunks.popitem(last=False)
+
+    def get_range(
+        self,
+        query: str,
+        start: float,
+        end: float,
+        step: float,
+        fetch: Callable[[str, float, float, float], List[dict]],
+        source: str = "",
+    ) -> PrometheusMatrix:
+        """
+        Get a range query result, fetching only the chunks missing from the cache
+        :param query: (str) prometheus query
+        :param start: (float) Start epoch timestamp. Aligned down to a multiple of step
+        :param end: (float) End epoch timestamp. Aligned down to a multiple of step
+        :param step: (float) Query resolution step in seconds
+        :param fetch: (callable) Function running a range query (query, start, end, step) and returning
+                      the list of matrix results
+        :param source: (str) Identifier of the queried prometheus, i.e. its url
+        :return: PrometheusMatrix object
+        """
+        start = math.floor(start / step) * step
+        end = math.floor(end / step) * step
+        span = step * self.chunk_points
+        chunk_indexes = range(int(start // span), int(end // span) + 1)
+
+        chunks: Dict[int, List[dict]] = dict()
+        with self._lock:
+            for index in chunk_indexes:
+                key = (source, query, step, index)
+                if key in self._chunks:
+                    self._chunks.move_to_end(key)
+                    chunks[index] = self._chunks[key]
+        missing_indexes = [index for index in chunk_indexes if index not in chunks]
+        self.hits += len(chunks)
+        self.misses += len(missing_indexes)
+
+        # Fetch every run of consecutive missing chunks with a single range query
+        now = time.time()
+        for first_index, last_index in self._consecutive_runs(missing_indexes):
+            fetch_end = min((last_index + 1) * span - step, math.floor(now / step) * step)
+            results = fetch(query, first_index * span, fetch_end, step) if fetch_end >= first_index * span else []
+            fetched_chunks = self._split_into_chunks(results, span, range(first_index, last_index + 1))
+            for index, chunk_results in fetched_chunks.items():
+                chunks[index] = chunk_results
+                if (index + 1) * span <= now - self.min_chunk_age:
+                    self._put((source, query, step, index), chunk_results)
+
+        matrix = PrometheusMatrix()
+        for index in chunk_indexes:
+            is_edge_chunk = index in (chunk_indexes[0], chunk_indexes[-1])
+            for result in chunks[index]:
+                values = result["values"]
+                if is_edge_chunk:
+                    values = [pair for pair in values if start <= pair[0] <= end]
+                if values:
+                    matrix.add_result({"metric": result["metric"], "values": values})
+        return matrix
+
+    @staticmethod
+    def _consecutive_runs(indexes: List[int]) -> List[Tuple[int, int]]:
+        runs: List[Tuple[int, int]] = list()
+        for index in indexes:
+            if runs and runs[-1][1] == index - 1:
+                runs[-1] = (runs[-1][0], index)
+            else:
+                runs.append((index, index))
+        return runs
+
+    @staticmethod
+    def _split_into_chunks(results: List[dict], span: float, indexes: range) -> Dict[int, List[dict]]:
+        """
+        Split the samples of matrix results into chunks. Chunks without samples are kept empty, so they
+        are cached as well.
+        """
+        chunk_series: Dict[int, Dict[frozenset, dict]] = {index: dict() for index in indexes}
+        for result in results:
+            metric = result.get("metric") or {}
+            series_key = frozenset(metric.items())
+            for pair in result.get("values") or []:
+                index = int(pair[0] // span)
+                if index not in chunk_series:
+                    continue
+                series = chunk_series[index].get(series_key)
+                if series is None:
+                    series = chunk_series[index][series_key] = {"metric": metric, "values": list()}
+                series["values"].append(pair)
+        return {index: list(series.values()) for index, series in chunk_series.items()}
+
+    def clear(self):
+        with self._lock:
+            self._chunks.clear()
+
+    def save(self, file_path: str):
+        """
+        Save cached chunks to a gzip compressed JSON file
+        :param file_path: (str) Path of the cache file
+        :return: None
+        """
+        with self._lock:
+            entries = [[list(key), results] for key, results in self._chunks.items()]
+        with gzip.open(file_path, "wt") as f:
+            json.dump({"version": CACHE_FILE_VERSION, "chunk_points": self.chunk_points, "chunks": entries}, f)
+        logger.info("Saved %s prometheus cache chunks to %s", len(entries), file_path)
+
+    def load(self, file_path: str) -> int:
+        """
+        Load chunks from a file written by save. Files written with a different chunk size are ignored.
+        :param file_path: (str) Path of the cache file
+        :return: (int) Number of loaded chunks
+        """
+        with gzip.open(file_path, "rt") as f:
+            cache_data = json.load(f)
+        if cache_data.get("version") != CACHE_FILE_VERSION or cache_data.get("chunk_points") != self.chunk_points:
+            logger.warning("Ignoring prometheus cache file %s with a different format or chunk size", file_path)
+            return 0
+        for key, results in cache_data["chunks"]:
+            self._put(tuple(key), results)
+        logger.info("Loaded %s prometheus cache chunks from %s", len(cache_data["chunks"]), file_path)
+        return len(cache_data["chunks"])
@@ -1,19 +1,99 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+import json
 import logging
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
 import warnings
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError, HTTPError, RequestException
 from urllib3.exceptions import InsecureRequestWarning
 
 from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.constants import HttpStatusCode
+from piqe_ocp_lib.api.monitoring.ocp_prometheus_cache import PrometheusRangeCache
+from piqe_ocp_lib.api.monitoring.ocp_prometheus_series import PrometheusMatrix, TimeType, split_time_range, to_epoch
 from piqe_ocp_lib.api.resources.ocp_base import OcpBase
 from piqe_ocp_lib.api.resources.ocp_routes import OcpRoutes
 from piqe_ocp_lib.api.resources.ocp_secrets import OcpSecret
+from piqe_ocp_lib.api.resources.ocp_tokens import OcpTokenProvider
 
 warnings.simplefilter("ignore", InsecureRequestWarning)
 
 logger = logging.getLogger(__loggername__)
 
+PrometheusQueryResult = namedtuple("PrometheusQueryResult", ["query", "data", "latency", "error"])
+
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(chunks: Iterable[str], key: str = "data") -> Iterator:
+    """
+    Incrementally decode the items of the array under a top level key of a JSON object, i.e. the "data"
+    array of a prometheus api response, from chunks of text. Consumed text is dropped from the buffer
+    whenever a chunk is read, so memory use scales with a single item and a chunk. If the key isn't found,
+    i.e. in error responses, the document is decoded as a whole and a RequestException is raised with its error.
+    :param chunks: Iterable of text chunks of the JSON document
+    :param key: (str) Top level key of the array
+    :return: Generator of decoded array items
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    key_marker = f'"{key}":'
+    buffer = ""
+
+    # Locate the start of the array
+    while True:
+        key_position = buffer.find(key_marker)
+        if key_position != -1:
+            position = key_position + len(key_marker)
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position < len(buffer):
+                if buffer[position] != "[":
+                    raise ValueError(f"{key} is not an array")
+                position += 1
+                break
+        chunk = next(chunks, None)
+        if chunk is None:
+            document = json.loads(buffer) if buffer.strip() else {}
+            raise RequestException(f"No {key} array in response : {document.get('error', document)}")
+        buffer += chunk
+
+    is_exhausted = False
+    while True:
+        # Skip separators between items
+        while position < len(buffer) and buffer[position] in _WHITESPACE + ",":
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        item, end = None, None
+        if position < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                pass
+        # An item is complete when followed by a separator. A number i.e. 1.5 split as "1." and "5" is
+        # decoded without error from the first chunk, so a decoded item isn't enough.
+        next_position = end
+        while next_position is not None and next_position < len(buffer) and buffer[next_position] in _WHITESPACE:
+            next_position += 1
+        if next_position is None or next_position == len(buffer) or buffer[next_position] not in ",]":
+            if is_exhausted:
+                raise ValueError("Truncated or invalid JSON array")
+            chunk = next(chunks, None)
+            if chunk is None:
+                is_exhausted = True
+            else:
+                buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+        position = end
+
+
 """
 OcpPrometheusClient is created by using openshift prometheus route, prometheus secret token and python request module.
 Using this client, User can query openshift prometheus DB to retrieve cluster labels and it's stats, cluster jobs and
@@ -46,14 +126,27 @@ class OcpPrometheusClient(OcpBase):
     """
     OcpPrometheusClient extends OcpBase class and provide connection to openshift prometheus
     instance to retrieve stats from prometheus.
+    Requests are sent over a pooled session, so connections to prometheus are reused across queries.
+    Range query results are cached in step aligned chunks, see PrometheusRangeCache.
     :param kube_config_file: A kubernetes config file.
+    :param max_connections: (int) Max number of pooled connections to prometheus
+    :param range_cache: (PrometheusRangeCache) Cache of range query results, i.e. loaded from a previous run.
+                        Defaults to an empty in-memory cache
     """
 
-    def __init__(self, kube_config_file=None):
+    def __init__(
+        self, kube_config_file=None, max_connections: int = 10, range_cache: Optional[PrometheusRangeCache] = None
+    ):
         super().__init__(kube_config_file=kube_config_file)
         self.ocp_route = OcpRoutes(kube_config_file=kube_config_file)
         self.ocp_secret = OcpSecret(kube_config_file=kube_config_file)
+        self.token_provider = OcpTokenProvider(kube_config_file=kube_config_file)
         self._prometheus_cache = dict()
+        self.max_connections = max_connections
+        self.session = requests.Session()
+        self.session.verify = False
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_connections))
+        self.range_cache = range_cache if range_cache is not None else PrometheusRangeCache()
 
     def get_prometheus_url(self):
         """
@@ -74,48 +167,165 @@ class OcpPrometheusClient(OcpBase):
     def get_prometheus_bearer_token(self):
         """
         Get bearer token for prometheus from prometheus-k8s service account in
-        "openshift-monitoring" namespace
+        "openshift-monitoring" namespace. The token is cached by the token provider until shortly
+        before it expires.
         :return: bearer_token(str) on success
         """
-        if "bearer_token" in self._prometheus_cache:
-            return self._prometheus_cache.get("bearer_token")
-
-        bearer_token = self.ocp_secret.get_long_live_bearer_token(
-            sub_string="prometheus-k8s-token", namespace="openshift-monitoring"
+        return self.token_provider.get_token(
+            service_account="prometheus-k8s", namespace="openshift-monitoring", secret_sub_string="prometheus-k8s-token"
         )
-        self._prometheus_cache.update({"bearer_token": bearer_token})
 
-        return bearer_token
+    def _send_request(self, url: str, params: Optional[dict] = None, stream: bool = False) -> requests.Response:
+        """
+        GET a prometheus url over the pooled session. A rejected bearer token is refreshed and the request
+        retried once.
+        """
+        # Suppress only the single warning from urllib3 needed.
+        requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
+        for attempt in range(2):
+            headers = {"Authorization": "Bearer " + self.get_prometheus_bearer_token(), "Accept-Encoding": "gzip"}
+            response = self.session.get(url, headers=headers, params=params, stream=stream)
+            if response.status_code != HttpStatusCode.Unauthorized.value or attempt:
+                break
+            # The cached token was rejected, i.e. it was revoked. Get a new one and retry once
+            response.close()
+            self.token_provider.invalidate(service_account="prometheus-k8s", namespace="openshift-monitoring")
+        return response
 
-    def connect_and_collect_stats(self, api_path=None, query_param=None):
+    def connect_and_collect_stats(self, api_path=None, query_param=None, params=None):
         """
         Get openshift cluster statistics from openshift prometheus using prometheus rest api and python request module
         https://prometheus.io/docs/prometheus/latest/querying/api/
 
         :param api_path: (str) prometheus api path
         :param query_param: (str) query parameter
+        :param params: (dict) additional query parameters i.e. start, end and step of range queries
         :return: (dict) prometheus_api_response on success or None on Failure
         """
         prometheus_api_response = None
         prometheus_url = self.get_prometheus_url()
-        bearer_token = self.get_prometheus_bearer_token()
-        headers = {"Authorization": "Bearer " + bearer_token}
         final_prometheus_url = prometheus_url + api_path
+        params = dict(params or {})
+        if query_param:
+            params["query"] = query_param
         try:
-            if query_param:
-                params = {"query": query_param}
-                # Suppress only the single warning from urllib3 needed.
-                requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
-                prometheus_api_response = requests.get(
-                    final_prometheus_url, headers=headers, params=params, verify=False
-                )
-            else:
-                # Suppress only the single warning from urllib3 needed.
-                requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
-                prometheus_api_response = requests.get(final_prometheus_url, headers=headers, verify=False)
+            prometheus_api_response = self._send_request(final_prometheus_url, params=params)
         except (ConnectionError, HTTPError, RequestException):
             logger.exception(
                 "Failed to connect %s due to refused connection or unsuccessful status code", final_prometheus_url
             )
 
         return prometheus_api_response.json()
+
+    def _timed_query(self, api_path: str, query: str, params: Optional[dict]) -> PrometheusQueryResult:
+        start_time = time.perf_counter()
+        data, error = None, None
+        try:
+            api_response = self.connect_and_collect_stats(api_path=api_path, query_param=query, params=params)
+            if api_response.get("status") == "success":
+                data = api_response.get("data")
+            else:
+                error = api_response.get("error")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - start_time
+        if error:
+            logger.error("Query %s failed after %.3fs : %s", query, latency, error)
+        return PrometheusQueryResult(query, data, latency, error)
+
+    def batch_query(
+        self,
+        queries: Iterable[str],
+        api_path: str = "/v1/query",
+        params: Optional[dict] = None,
+        max_workers: Optional[int] = None,
+    ) -> Dict[str, PrometheusQueryResult]:
+        """
+        Run many prometheus queries concurrently over the pooled session
+        :param queries: (list) PromQL expressions
+        :param api_path: (str) prometheus api path, /v1/query or /v1/query_range
+        :param params: (dict) additional query parameters shared by all queries i.e. time, or start, end and step
+        :param max_workers: (int) Max number of concurrent queries. Defaults to max_connections
+        :return: (dict) PrometheusQueryResult with data, latency in seconds and error of every query keyed by query
+        """
+        queries = list(dict.fromkeys(queries))
+        max_workers = min(max_workers or self.max_connections, self.max_connections, len(queries) or 1)
+        # Resolve url and token once, before the queries race for them
+        self.get_prometheus_url()
+        self.get_prometheus_bearer_token()
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="PrometheusQuery") as executor:
+            results = executor.map(lambda query: self._timed_query(api_path, query, params), queries)
+            query_results = {result.query: result for result in results}
+        logger.info(
+            "Ran %s queries with %s workers in %.3fs", len(queries), max_workers, time.perf_counter() - start_time
+        )
+        return query_results
+
+    def _fetch_range(self, query: str, start: float, end: float, step: float) -> List[dict]:
+        """
+        Run a range query, split in consecutive queries if it exceeds the max points per series
+        :return: (list) Matrix results of all queries
+        :raises RequestException: if a query fails or its response can't be decoded
+        """
+        results = list()
+        final_prometheus_url = self.get_prometheus_url() + "/v1/query_range"
+        for range_start, range_end in split_time_range(start, end, step):
+            params = {"query": query, "start": range_start, "end": range_end, "step": step}
+            response = self._send_request(final_prometheus_url, params=params)
+            try:
+                api_response = response.json()
+            except ValueError as e:
+                raise RequestException(f"Range query {query} failed with status {response.status_code} : {e}")
+            if api_response.get("status") != "success":
+                raise RequestException(f"Range query {query} failed : {api_response.get('error')}")
+            results.extend(api_response["data"]["result"])
+        return results
+
+    def query_range(
+        self, query: str, start: TimeType, end: TimeType, step: float = 15, use_cache: bool = True
+    ) -> Optional[PrometheusMatrix]:
+        """
+        Run a range query and decode the result into a PrometheusMatrix
+        :param query: (str) PromQL expression
+        :param start: (datetime | float) Start of the time range as datetime or epoch timestamp
+        :param end: (datetime | float) End of the time range as datetime or epoch timestamp
+        :param step: (float) Query resolution step in seconds
+        :param use_cache: (bool) Serve the query from the range cache and only fetch missing chunks
+        :return: PrometheusMatrix on success or None on failure
+        """
+        start, end = to_epoch(start), to_epoch(end)
+        try:
+            if use_cache:
+                return self.range_cache.get_range(
+                    query, start, end, step, fetch=self._fetch_range, source=self.get_prometheus_url()
+                )
+            matrix = PrometheusMatrix()
+            for result in self._fetch_range(query, start, end, step):
+                matrix.add_result(result)
+            return matrix
+        except RequestException as e:
+            logger.error("Failed to run range query %s : %s", query, e)
+            return None
+
+    def stream_stats(
+        self, api_path: str, query_param: Optional[str] = None, params: Optional[dict] = None, chunk_size: int = 65536
+    ) -> Iterator:
+        """
+        Stream the items of the "data" array of a prometheus api response, i.e. of /v1/label/<name>/values
+        or /v1/series. The gzip compressed response is decoded incrementally, so memory use scales with a
+        single item rather than with the whole response.
+        :param api_path: (str) prometheus api path
+        :param query_param: (str) query parameter
+        :param params: (dict) additional query parameters i.e. match[] of series queries
+        :param chunk_size: (int) Size of the decompressed chunks read from the response
+        :return: Generator of the items of the "data" array
+        """
+        final_prometheus_url = self.get_prometheus_url() + api_path
+        params = dict(params or {})
+        if query_param:
+            params["query"] = query_param
+        with closing(self._send_request(final_prometheus_url, params=params, stream=True)) as response:
+            # Prometheus doesn't set a charset and JSON is UTF-8
+            response.encoding = "utf-8"
+            yield from iter_json_array(response.iter_content(chunk_size=chunk_size, decode_unicode=True))
@@ -0,0 +1,160 @@
+from array import array
+from datetime import datetime
+import logging
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+from piqe_ocp_lib import __loggername__
+
+logger = logging.getLogger(__loggername__)
+
+# Prometheus refuses range queries returning more than 11000 points per series
+MAX_POINTS_PER_SERIES = 11000
+
+TimeType = Union[datetime, float, int]
+
+
+def to_epoch(timestamp: TimeType) -> float:
+    """
+    Convert a datetime or an epoch timestamp to an epoch timestamp
+    :param timestamp: (datetime | float) Timestamp to convert
+    :return: (float) epoch timestamp
+    """
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+class PrometheusSeries:
+    """
+    A single time series of a range query. Timestamps and values are kept in typed arrays of doubles,
+    i.e. 8 bytes per timestamp and per value, instead of lists of python objects.
+    :param labels: (dict) Labels of the series
+    :param timestamps: (array) Epoch timestamps of the samples
+    :param values: (array) Values of the samples. NaN and +Inf/-Inf are kept as float values
+    """
+
+    __slots__ = ("labels", "timestamps", "values")
+
+    def __init__(self, labels: Dict[str, str], timestamps: Optional[array] = None, values: Optional[array] = None):
+        self.labels = labels
+        self.timestamps = timestamps if timestamps is not None else array("d")
+        self.values = values if values is not None else array("d")
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __repr__(self) -> str:
+        return f"PrometheusSeries(labels={self.labels}, samples={len(self)})"
+
+    @property
+    def key(self) -> FrozenSet[Tuple[str, str]]:
+        return frozenset(self.labels.items())
+
+    def extend(self, pairs: Iterable[Iterable]):
+        """
+        Append [timestamp, "value"] pairs as returned by prometheus
+        :param pairs: Iterable of [timestamp, "value"] pairs
+        :return: None
+        """
+        pairs = list(pairs)
+        self.timestamps.extend([pair[0] for pair in pairs])
+        self.values.extend([float(pair[1]) for pair in pairs])
+
+
+class PrometheusMatrix:
+    """
+    Series of a range query result with an index of series by label name and value
+    """
+
+    def __init__(self):
+        self.series: List[PrometheusSeries] = list()
+        self._series_by_key: Dict[FrozenSet[Tuple[str, str]], PrometheusSeries] = dict()
+        # label name -> label value -> positions of series in self.series
+        self.label_index: Dict[str, Dict[str, List[int]]] = dict()
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def __iter__(self):
+        return iter(self.series)
+
+    @property
+    def sample_count(self) -> int:
+        return sum(len(series) for series in self.series)
+
+    def add_result(self, result: dict):
+        """
+        Add the samples of a single series of a matrix result. Samples of a series already part of the
+        matrix are appended to it, so the results of consecutive range queries can be merged.
+        :param result: (dict) {"metric": {labels}, "values": [[timestamp, "value"], ...]}
+        :return: None
+        """
+        labels = result.get("metric") or {}
+        key = frozenset(labels.items())
+        series = self._series_by_key.get(key)
+        if series is None:
+            series = PrometheusSeries(labels)
+            self._series_by_key[key] = series
+            position = len(self.series)
+            self.series.append(series)
+            for label_name, label_value in labels.items():
+                self.label_index.setdefault(label_name, dict()).setdefault(label_value, list()).append(position)
+        series.extend(result.get("values") or [])
+
+    def label_values(self, label_name: str) -> List[str]:
+        """
+        Get the values of a label across all series
+        :param label_name: (str) Name of the label
+        :return: (list) Sorted list of label values
+        """
+        return sorted(self.label_index.get(label_name, {}))
+
+    def select(self, **labels: str) -> List[PrometheusSeries]:
+        """
+        Get the series matching all given label values, i.e. select(namespace="default")
+        :param labels: Label names and values to match
+        :return: (list) List of matching PrometheusSeries
+        """
+        if not labels:
+            return list(self.series)
+        positions = None
+        for label_name, label_value in labels.items():
+            label_positions = set(self.label_index.get(label_name, {}).get(label_value, ()))
+            positions = label_positions if positions is None else positions & label_positions
+            if not positions:
+                return list()
+        return [self.series[position] for position in sorted(positions)]
+
+
+def decode_matrix(data: dict, matrix: Optional[PrometheusMatrix] = None) -> PrometheusMatrix:
+    """
+    Decode the data of a prometheus range query response into a PrometheusMatrix
+    :param data: (dict) "data" field of the response, {"resultType": "matrix", "result": [...]}
+    :param matrix: (optional | PrometheusMatrix) Matrix to merge the results into
+    :return: PrometheusMatrix object
+    """
+    if data.get("resultType") != "matrix":
+        raise ValueError(f"Expected a matrix result, got {data.get('resultType')}")
+    matrix = matrix if matrix is not None else PrometheusMatrix()
+    for result in data.get("result") or []:
+        matrix.add_result(result)
+    return matrix
+
+
+def split_time_range(start: float, end: float, step: float) -> List[Tuple[float, float]]:
+    """
+    Split a time range so that no range query returns more than MAX_POINTS_PER_SERIES points per series.
+    Consecutive ranges don't overlap, so no sample is returned twice.
+    :param start: (float) Start epoch timestamp
+    :param end: (float) End epoch timestamp
+    :param step: (float) Query resolution step in seconds
+    :return: (list) List of (start, end) tuples
+    """
+    time_ranges = list()
+    span = step * (MAX_POINTS_PER_SERIES - 1)
+    range_start = start
+    while range_start <= end:
+        range_end = min(range_start + span, end)
+        time_ranges.append((range_start, range_end))
+        range_start = range_end + step
+    return time_ranges
@@ -0,0 +1,350 @@
+from collections import deque, namedtuple
+import logging
+from queue import Queue
+from threading import Condition, Lock, Thread
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from piqe_ocp_lib import __loggername__
+
+logger = logging.getLogger(__loggername__)
+
+# Queued to stop a worker thread of a StagedPipeline
+_STOP = object()
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter shared by threads issuing API requests. Tokens are added at rate per second
+    up to burst tokens, and every request takes one token, waiting until one is available.
+    :param rate: (float) Max average number of requests per second. 0 or None disables the limit
+    :param burst: (optional | int) Max number of requests issued at once. Defaults to rate rounded up
+    :return: None
+    """
+
+    def __init__(self, rate: Optional[float] = 10.0, burst: Optional[int] = None):
+        self.rate = rate or 0.0
+        self.burst = burst or max(1, int(-(-self.rate // 1)))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self) -> float:
+        """
+        Take a token, waiting until one is available
+        :return: (float) Time waited in seconds
+        """
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+# Concurrency limit of an AdaptiveConcurrencyLimiter from a point in time, with the average latency and
+# the error rate of the window of operations which led to it
+ConcurrencySample = namedtuple("ConcurrencySample", ["timestamp", "limit", "latency", "error_rate", "throttled"])
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limit the number of operations in flight, i.e. API requests issued by many threads, and adapt the
+    limit to what the server sustains with additive increase and multiplicative decrease (AIMD).
+    Operations are counted in windows of window operations. The limit grows by one after a window
+    where it was reached without any sign of overload. It's multiplied by backoff right away on a
+    throttled operation, i.e. HTTP 429, and after a window where the error rate exceeds error_threshold
+    or operations were on average more than latency_tolerance times slower than their baseline.
+    Operations of different costs, i.e. creates of different kinds, are released with different keys
+    and have a baseline each: the lowest latency of the key, which rises by baseline_decay per operation
+    so the baseline follows a lasting change of the server. Operations in flight when the limit is
+    decreased are not counted, so one overload only decreases the limit once. Every change of the limit
+    is recorded in history.
+    :param initial: (int) Initial limit
+    :param min_limit: (int) Lowest limit
+    :param max_limit: (int) Highest limit
+    :param window: (int) Number of operations of a window
+    :param latency_tolerance: (float) Max ratio of the average latency of a window to the lowest one
+    :param error_threshold: (float) Max ratio of failed operations of a window
+    :param backoff: (float) Factor the limit is multiplied by on overload
+    :param baseline_decay: (float) Ratio the latency baseline of a key rises by per operation of the key
+    :param history_size: (int) Max number of samples kept in history
+    :return: None
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        window: int = 20,
+        latency_tolerance: float = 2.0,
+        error_threshold: float = 0.1,
+        backoff: float = 0.5,
+        baseline_decay: float = 0.01,
+        history_size: int = 1000,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.window = max(1, window)
+        self.latency_tolerance = latency_tolerance
+        self.error_threshold = error_threshold
+        self.backoff = backoff
+        self.baseline_decay = baseline_decay
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.in_flight = 0
+        self._skip = 0
+        # key -> latency baseline of the operations of the key
+        self.baselines: Dict[Any, float] = dict()
+        self.history = deque([ConcurrencySample(time.time(), self.limit, None, 0.0, False)], maxlen=history_size)
+        self._condition = Condition()
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_count = 0
+        self._window_latency = 0.0
+        self._window_slowdown = 0.0
+        self._window_errors = 0
+        self._window_saturated = False
+
+    def _decrease(self, latency: Optional[float], error_rate: float, throttled: bool):
+        self._set_limit(int(self.limit * self.backoff), latency, error_rate, throttled)
+        # Operations started before the decrease still see the overload
+        self._skip = self.in_flight
+        self._reset_window()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until an operation can start under the current limit
+        :param timeout: (optional | float) Time limit in seconds
+        :return: (bool) True if the operation can start, False on timeout
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.in_flight < self.limit, timeout=timeout):
+                return False
+            self.in_flight += 1
+            if self.in_flight >= self.limit:
+                self._window_saturated = True
+            return True
+
+    def _set_limit(self, limit: int, latency: Optional[float], error_rate: float, throttled: bool):
+        limit = min(self.max_limit, max(self.min_limit, limit))
+        if limit != self.limit:
+            logger.debug(
+                "Concurrency limit %s -> %s, latency %s, error rate %s%s",
+                self.limit,
+                limit,
+                latency,
+                error_rate,
+                ", throttled" if throttled else "",
+            )
+            self.limit = limit
+            self.history.append(ConcurrencySample(time.time(), limit, latency, error_rate, throttled))
+            self._condition.notify_all()
+
+    def release(self, latency: float, error: bool = False, throttled: bool = False, key: Any = None):
+        """
+        Record the outcome of an operation started with acquire and adapt the limit
+        :param latency: (float) Duration of the operation in seconds
+        :param error: (bool) The operation failed because of the server, i.e. HTTP 5xx or timeout
+        :param throttled: (bool) The operation was throttled by the server, i.e. HTTP 429
+        :param key: (optional) Key of the latency baseline of the operation, i.e. the kind of a created object
+        :return: None
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+            if self._skip > 0:
+                self._skip -= 1
+                return
+            if throttled:
+                self._decrease(latency, 1.0, True)
+                return
+            baseline = self.baselines.get(key)
+            self._window_count += 1
+            self._window_latency += latency
+            self._window_slowdown += latency / baseline if baseline else 1.0
+            if error:
+                self._window_errors += 1
+            else:
+                # Failed operations can be fast and aren't a reference for the latency of the key
+                self.baselines[key] = (
+                    latency if baseline is None else min(latency, baseline * (1 + self.baseline_decay))
+                )
+            if self._window_count < self.window:
+                return
+            average_latency = self._window_latency / self._window_count
+            error_rate = self._window_errors / self._window_count
+            if error_rate > self.error_threshold or self._window_slowdown / self._window_count > self.latency_tolerance:
+                self._decrease(average_latency, error_rate, False)
+                return
+            if self._window_saturated:
+                self._set_limit(self.limit + 1, average_latency, error_rate, False)
+            self._reset_window()
+
+
+# Counters of a stage of a StagedPipeline
+PipelineStageStats = namedtuple("PipelineStageStats", ["name", "workers", "processed", "failed", "busy", "max_queued"])
+
+
+class _PipelineStage:
+    def __init__(self, name: str, handler: Callable[[Any], Optional[Iterable[Any]]], workers: int):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue: Queue = Queue()
+        self.threads: List[Thread] = list()
+        self.processed = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.max_queued = 0
+
+
+class StagedPipeline:
+    """
+    Pipeline of stages, each with its own queue and pool of worker threads, so the throughput of every stage
+    can be tuned on its own. A stage handler is called with an item and returns the items passed to the next
+    stage. Handlers waiting on something else, i.e. a watch, can return nothing, hold() the pipeline and
+    put() the item in the next stage once it's done, followed by release().
+    :param name: (str) Name of the pipeline, used to name worker threads
+    :return: None
+    """
+
+    def __init__(self, name: str = "Pipeline"):
+        self.name = name
+        self._stages: List[_PipelineStage] = list()
+        self._outstanding = 0
+        self._idle = Condition()
+
+    def add_stage(self, name: str, handler: Callable[[Any], Optional[Iterable[Any]]], workers: int = 1):
+        """
+        Append a stage to the pipeline
+        :param name: (str) Name of the stage
+        :param handler: (callable) Function called with an item returning the items of the next stage
+        :param workers: (int) Number of worker threads of the stage
+        :return: None
+        """
+        self._stages.append(_PipelineStage(name, handler, max(1, workers)))
+
+    def _stage(self, name: str) -> _PipelineStage:
+        for stage in self._stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(name)
+
+    def hold(self):
+        """
+        Keep the pipeline from being done while an item is processed outside of its stages
+        :return: None
+        """
+        with self._idle:
+            self._outstanding += 1
+
+    def release(self):
+        """
+        Release a hold()
+        :return: None
+        """
+        with self._idle:
+            self._outstanding -= 1
+            if self._outstanding == 0:
+                self._idle.notify_all()
+
+    def put(self, stage_name: str, item: Any):
+        """
+        Queue an item in a stage
+        :param stage_name: (str) Name of the stage
+        :param item: Item passed to the handler of the stage
+        :return: None
+        """
+        stage = self._stage(stage_name)
+        with self._idle:
+            self._outstanding += 1
+            stage.queue.put(item)
+            stage.max_queued = max(stage.max_queued, stage.queue.qsize())
+
+    def _work(self, index: int):
+        stage = self._stages[index]
+        while True:
+            item = stage.queue.get()
+            if item is _STOP:
+                return
+            start = time.monotonic()
+            try:
+                next_items = stage.handler(item)
+                if index + 1 < len(self._stages):
+                    for next_item in next_items or []:
+                        self.put(self._stages[index + 1].name, next_item)
+                failed = 0
+            except Exception as e:
+                logger.exception("%s stage %s failed: %s", self.name, stage.name, e)
+                failed = 1
+            with self._idle:
+                stage.processed += 1
+                stage.failed += failed
+                stage.busy += time.monotonic() - start
+            self.release()
+
+    def start(self):
+        """
+        Start the worker threads of all stages
+        :return: None
+        """
+        for index, stage in enumerate(self._stages):
+            for i in range(stage.workers):
+                thread = Thread(target=self._work, args=(index,), name=f"{self.name}_{stage.name}_{i}", daemon=True)
+                stage.threads.append(thread)
+                thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for all queued and held items to be processed
+        :param timeout: (optional | float) Time limit in seconds
+        :return: (bool) True if the pipeline is done otherwise False
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._outstanding == 0, timeout=timeout)
+
+    def stop(self):
+        """
+        Stop the worker threads stage by stage, once they are done with the items already queued
+        :return: None
+        """
+        for stage in self._stages:
+            for _ in stage.threads:
+                stage.queue.put(_STOP)
+            for thread in stage.threads:
+                thread.join()
+            stage.threads = list()
+
+    @property
+    def stats(self) -> List[PipelineStageStats]:
+        with self._idle:
+            return [
+                PipelineStageStats(
+                    stage.name, stage.workers, stage.processed, stage.failed, stage.busy, stage.max_queued
+                )
+                for stage in self._stages
+            ]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,87 @@
+"""
+Kubernetes resource quantities i.e. "16Gi", "3500m" or "1e3" converted to float.
+https://github.com/kubernetes/apimachinery/blob/master/pkg/api/resource/quantity.go
+
+Clusters repeat a handful of distinct quantity strings across thousands of nodes, pods and containers,
+so parse_quantity is memoized and bulk conversion mostly costs a cache lookup per value.
+"""
+
+from array import array
+from functools import lru_cache
+import re
+from typing import Iterable, Optional, Union
+
+BINARY_SUFFIXES = {"Ki": 2**10, "Mi": 2**20, "Gi": 2**30, "Ti": 2**40, "Pi": 2**50, "Ei": 2**60}
+DECIMAL_SUFFIXES = {
+    "n": 1e-9,
+    "u": 1e-6,
+    "m": 1e-3,
+    "": 1.0,
+    "k": 1e3,
+    "M": 1e6,
+    "G": 1e9,
+    "T": 1e12,
+    "P": 1e15,
+    "E": 1e18,
+}
+_QUANTITY_PATTERN = re.compile(r"^([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)(Ki|Mi|Gi|Ti|Pi|Ei|[numkMGTPE]?)$")
+
+QuantityType = Union[str, int, float, None]
+
+
+@lru_cache(maxsize=4096)
+def _parse_quantity_string(quantity: str) -> float:
+    match = _QUANTITY_PATTERN.match(quantity.strip())
+    if match is None:
+        raise ValueError(f"Invalid quantity : {quantity}")
+    number, suffix = match.groups()
+    return float(number) * BINARY_SUFFIXES.get(suffix, DECIMAL_SUFFIXES.get(suffix, 1.0))
+
+
+def parse_quantity(quantity: QuantityType) -> float:
+    """
+    Convert a kubernetes quantity to float i.e. "16Gi" to 17179869184.0 or "3500m" to 3.5
+    :param quantity: (str | int | float) Quantity. None is converted to 0
+    :return: (float) Value of the quantity in base units (bytes, cores)
+    """
+    if quantity is None:
+        return 0.0
+    if isinstance(quantity, (int, float)):
+        return float(quantity)
+    return _parse_quantity_string(quantity)
+
+
+def parse_quantities(quantities: Iterable[QuantityType]) -> array:
+    """
+    Convert many kubernetes quantities at once
+    :param quantities: Iterable of quantities. None values are converted to 0
+    :return: (array) Typed array of doubles
+    """
+    return array("d", map(parse_quantity, quantities))
+
+
+def to_millicores(quantity: QuantityType) -> int:
+    """
+    Convert a cpu quantity to millicores i.e. "2" to 2000
+    :param quantity: (str | int | float) cpu quantity
+    :return: (int) millicores
+    """
+    return round(parse_quantity(quantity) * 1000)
+
+
+def to_bytes(quantity: QuantityType) -> int:
+    """
+    Convert a memory quantity to bytes i.e. "1Ki" to 1024
+    :param quantity: (str | int | float) memory quantity
+    :return: (int) bytes
+    """
+    return round(parse_quantity(quantity))
+
+
+def ratio(used: QuantityType, hard: QuantityType) -> Optional[float]:
+    """
+    Ratio of two quantities, i.e. of used and hard limits of a resource quota
+    :return: (float) used / hard OR None if hard is 0
+    """
+    hard_value = parse_quantity(hard)
+    return parse_quantity(used) / hard_value if hard_value else None
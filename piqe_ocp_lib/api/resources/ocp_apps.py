@@ -1,75 +1,257 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import logging
+from threading import Lock
+import time
+from typing import Dict, List, Optional, Tuple
 
 from kubernetes.client.rest import ApiException
 
 from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.constants import HttpStatusCode
+from piqe_ocp_lib.api.ocp_concurrency import AdaptiveConcurrencyLimiter, RateLimiter
 
 from .ocp_base import OcpBase
-from .ocp_templates import OcpTemplates
+from .ocp_templates import OcpTemplateCache, process_template
 
 logger = logging.getLogger(__loggername__)
 
+# Objects are created in stages so objects referenced by others exist first. Objects of one stage
+# are created concurrently. Kinds not listed here are created in the last stage.
+APPLY_STAGES = (
+    ("ServiceAccount", "Secret", "ConfigMap", "PersistentVolumeClaim", "Role", "RoleBinding"),
+    ("Service", "ImageStream", "BuildConfig", "Route"),
+)
+
+# Result of the creation of a single object of an app
+ObjectApplyResult = namedtuple("ObjectApplyResult", ["kind", "name", "stage", "response", "latency", "error"])
+
+
+def object_apply_stage(kind: str) -> int:
+    """
+    Return the stage an object of a kind is created in
+    :param kind: (str) Kind of the object i.e. Secret
+    :return: (int) Index of the stage
+    """
+    for stage, kinds in enumerate(APPLY_STAGES):
+        if kind in kinds:
+            return stage
+    return len(APPLY_STAGES)
+
+
+class OcpBulkApply(OcpBase):
+    """
+    OcpBulkApply Class extends OcpBase and creates the objects of an app in dependency stages, i.e.
+    secrets, PVCs and services before deployment configs. Objects of a stage are created concurrently,
+    so creating an app takes about as long as the slowest create of every stage. API resources are
+    looked up once per apiVersion and kind.
+    :param max_workers: (int) Max number of concurrent create requests
+    :param rate_limiter: (optional | RateLimiter) Rate limiter shared with other request threads
+    :param concurrency_limiter: (optional | AdaptiveConcurrencyLimiter) Limiter of create requests in flight
+                                shared with other request threads, fed with their latency and outcome
+    :param kube_config_file: A kubernetes config file.
+    :return: None
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 10,
+        rate_limiter: Optional[RateLimiter] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        kube_config_file=None,
+    ):
+        super().__init__(kube_config_file=kube_config_file)
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self._resources: Dict[Tuple[str, str], object] = dict()
+        self._resources_lock = Lock()
+
+    def get_resource(self, api_version: str, kind: str):
+        """
+        Get the API resource of a kind, looked up once and memoized
+        :param api_version: (str) api version of the kind i.e. v1
+        :param kind: (str) The kind i.e. Secret
+        :return: The dynamic client resource
+        """
+        key = (api_version, kind)
+        with self._resources_lock:
+            resource = self._resources.get(key)
+        if resource is None:
+            resource = self.dyn_client.resources.get(api_version=api_version, kind=kind)
+            with self._resources_lock:
+                resource = self._resources.setdefault(key, resource)
+        return resource
+
+    def _create_object(self, obj: dict, namespace: str, stage: int) -> ObjectApplyResult:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.acquire()
+        name = obj["metadata"]["name"]
+        start = time.monotonic()
+        status = None
+        failed = True
+        try:
+            api_response = self.get_resource(obj["apiVersion"], obj["kind"]).create(body=obj, namespace=namespace)
+            failed = False
+        except ApiException as e:
+            status = e.status
+            logger.error("Exception when creating %s %s in %s: %s\n", obj["kind"], name, namespace, e)
+            return ObjectApplyResult(obj["kind"], name, stage, None, time.monotonic() - start, f"{e.status} {e.reason}")
+        finally:
+            if self.concurrency_limiter is not None:
+                # Client errors other than throttling, i.e. 409 Conflict, are no sign of server overload
+                self.concurrency_limiter.release(
+                    time.monotonic() - start,
+                    error=failed and (not status or status >= 500),
+                    throttled=status == HttpStatusCode.TooManyRequests.value,
+                    key=obj["kind"],
+                )
+        return ObjectApplyResult(obj["kind"], name, stage, api_response, time.monotonic() - start, None)
+
+    def create_objects(self, objects: List[dict], namespace: str) -> List[ObjectApplyResult]:
+        """
+        Create objects stage by stage, concurrently within a stage. A failed create doesn't stop
+        the creation of the following stages.
+        :param objects: (list) Objects in dict form
+        :param namespace: (str) The namespace the objects are created in
+        :return: (list) ObjectApplyResult of every object, in the order of objects
+        """
+        stages: Dict[int, List[int]] = dict()
+        for i, obj in enumerate(objects):
+            stages.setdefault(object_apply_stage(obj["kind"]), list()).append(i)
+        results: List[Optional[ObjectApplyResult]] = [None] * len(objects)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(objects)))) as executor:
+            for stage in sorted(stages):
+                futures = {i: executor.submit(self._create_object, objects[i], namespace, stage) for i in stages[stage]}
+                for i, future in futures.items():
+                    results[i] = future.result()
+        for result in results:
+            logger.debug(
+                "Create of %s %s in %s in stage %s took %.3fs",
+                result.kind,
+                result.name,
+                namespace,
+                result.stage,
+                result.latency,
+            )
+        return results
+
 
 class OcpApps(OcpBase):
     """
     OcpApps Class extends OcpBase and encapsulates all methods
-    related to managing Openshift app deployment.
+    related to managing Openshift app deployment. Raw templates are
+    cached and processed locally, so deploying and deleting apps
+    doesn't make any template request once a template is cached.
     :param kube_config_file: A kubernetes config file.
+    :param process_locally: (bool) Process templates locally instead of with the processedtemplates API.
+                            Templates which fail to process locally are processed by the API.
+    :param template_ttl: (optional | float) Time in seconds a cached template is used without checking it
+    :param max_workers: (int) Max number of objects of an app created concurrently
+    :param rate_limiter: (optional | RateLimiter) Rate limiter of create requests shared with other threads
+    :param concurrency_limiter: (optional | AdaptiveConcurrencyLimiter) Limiter of create requests in flight
+                                shared with other threads
     :return: None
     """
 
-    def __init__(self, kube_config_file=None):
+    def __init__(
+        self,
+        kube_config_file=None,
+        process_locally: bool = True,
+        template_ttl: Optional[float] = 300,
+        max_workers: int = 10,
+        rate_limiter: Optional[RateLimiter] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+    ):
         self.kube_config_file = kube_config_file
         OcpBase.__init__(self, kube_config_file=self.kube_config_file)
-        self.ocp_template_obj = OcpTemplates(kube_config_file=self.kube_config_file)
+        self.process_locally = process_locally
+        self.ocp_template_obj = OcpTemplateCache(ttl=template_ttl, kube_config_file=self.kube_config_file)
+        self.bulk_apply = OcpBulkApply(
+            max_workers=max_workers,
+            rate_limiter=rate_limiter,
+            concurrency_limiter=concurrency_limiter,
+            kube_config_file=self.kube_config_file,
+        )
 
-    def create_app_from_template(self, project, template_name, ident, app_params, template_location="openshift"):
+    def get_processed_app_template(
+        self, template_name: str, ident: int, app_params: Optional[dict], template_location: str = "openshift"
+    ) -> Optional[dict]:
         """
-        This method fetches a raw template by name, enumerates it,
-        processes it and uses it to deploy an app in a specified
-        project. project and template_name params are of type
-        string while ident is of type int
-        :param project: (required | str) The project that will host the app
+        Get a template from the template cache, enumerate it and process it
         :param template_name: (required | str) The template to be used to deploy the app
         :param ident: (required | int) Unique identifier.
-        :param app_params (required | dict) app param for ocp app
-        :return: A list of response objects obtained from the deployment of every
-                 resource in this app. Also a list of the deployment configs
-                 that are part of this app.
+        :param app_params: (optional | dict) app param for ocp app
+        :param template_location: (optional | str) The project where the template resides
+        :return: A processed template of type dict. None on failure
         """
-        # A list to store all the response objects of our deployment
-        api_response_list = list()
         # Fetch a raw template
         unprocessed_template = self.ocp_template_obj.get_a_template_in_a_namespace(
             template_name, project=template_location
         )
+        if unprocessed_template is None:
+            return None
         # Enumerate it to ensure uniqueness
         enumerated_unprocessed_template = self.ocp_template_obj.enumerate_unprocessed_template(
             unprocessed_template, ident, app_params
         )
+        if enumerated_unprocessed_template is None:
+            return None
         # Process it so it's ready to use for deploying an app
-        processed_template = self.ocp_template_obj.create_a_processed_template(enumerated_unprocessed_template)
+        if self.process_locally:
+            processed_template = process_template(enumerated_unprocessed_template)
+            if processed_template is not None:
+                return processed_template
+            logger.warning("Processing template %s with the processedtemplates API instead", template_name)
+        return self.ocp_template_obj.create_a_processed_template(enumerated_unprocessed_template)
+
+    def apply_app_from_template(
+        self, project, template_name, ident, app_params, template_location="openshift"
+    ) -> Tuple[List[ObjectApplyResult], Optional[List[str]]]:
+        """
+        Fetch a raw template by name, enumerate it, process it and create its objects in a project
+        with OcpBulkApply
+        :param project: (required | str) The project that will host the app
+        :param template_name: (required | str) The template to be used to deploy the app
+        :param ident: (required | int) Unique identifier.
+        :param app_params: (required | dict) app param for ocp app
+        :param template_location: (optional | str) The project where the template resides
+        :return: (tuple) ObjectApplyResult of every object of the app with its latency and the names of
+                 the deployment configs of the app, None if the template could not be processed.
+        """
+        processed_template = self.get_processed_app_template(template_name, ident, app_params, template_location)
+        if processed_template is None:
+            logger.error("Failed to process template %s", template_name)
+            return list(), None
         # Apps can have multiple deployment configs. it is based on their status that we determine
-        # whether an app is ready or not so we create a list where we will compile the names of
-        # deployment configs present in this app.
-        deployment_config_names = []
-        # We iterate through all the resources that make this app so we can
-        # deploy them one by one.
-        for resource in processed_template["objects"]:
-            if resource["kind"] == "DeploymentConfig":
-                deployment_config_names.append(resource["metadata"]["name"])
-            try:
-                current_resource = self.dyn_client.resources.get(
-                    api_version=resource["apiVersion"], kind=resource["kind"]
-                )
-                api_response = current_resource.create(body=resource, namespace=project)
-                api_response_list.append(api_response)
-            except ApiException as e:
-                logger.error(
-                    "Exception when calling method: "
-                    " create_app_from_template_" + str(resource["kind"]).lower() + "%s\n",
-                    e,
-                )
+        # whether an app is ready or not so we compile the names of deployment configs present in this app.
+        deployment_config_names = [
+            resource["metadata"]["name"]
+            for resource in processed_template["objects"]
+            if resource["kind"] == "DeploymentConfig"
+        ]
+        return self.bulk_apply.create_objects(processed_template["objects"], project), deployment_config_names
+
+    def create_app_from_template(self, project, template_name, ident, app_params, template_location="openshift"):
+        """
+        This method fetches a raw template by name, enumerates it,
+        processes it and uses it to deploy an app in a specified
+        project. project and template_name params are of type
+        string while ident is of type int
+        :param project: (required | str) The project that will host the app
+        :param template_name: (required | str) The template to be used to deploy the app
+        :param ident: (required | int) Unique identifier.
+        :param app_params (required | dict) app param for ocp app
+        :return: A list of response objects obtained from the deployment of every
+                 resource in this app. Also a list of the deployment configs
+                 that are part of this app, None if the template could not be processed.
+        """
+        apply_results, deployment_config_names = self.apply_app_from_template(
+            project, template_name, ident, app_params, template_location
+        )
+        api_response_list = [result.response for result in apply_results if result.error is None]
         return api_response_list, deployment_config_names
 
     def delete_template_based_app(self, project, template_name, ident, app_params, template_location="openshift"):
@@ -89,19 +271,14 @@ class OcpApps(OcpBase):
         api_response_list = list()
         # Fetch the app template, enumerate it and process it so we can obtain the correct names
         # of the resources that need to be deleted.
-        unprocessed_template = self.ocp_template_obj.get_a_template_in_a_namespace(
-            template_name, project=template_location
-        )
-        enumerated_unprocessed_template = self.ocp_template_obj.enumerate_unprocessed_template(
-            unprocessed_template, ident, app_params
-        )
-        processed_template = self.ocp_template_obj.create_a_processed_template(enumerated_unprocessed_template)
+        processed_template = self.get_processed_app_template(template_name, ident, app_params, template_location)
+        if processed_template is None:
+            logger.error("Failed to process template %s", template_name)
+            return api_response_list
         # Loop through the name of every resouce defined in the processed template and delete it.
         for resource in processed_template["objects"]:
             try:
-                current_resource = self.dyn_client.resources.get(
-                    api_version=resource["apiVersion"], kind=resource["kind"]
-                )
+                current_resource = self.bulk_apply.get_resource(resource["apiVersion"], resource["kind"])
                 api_response = current_resource.delete(name=resource["metadata"]["name"], namespace=project)
                 api_response_list.append(api_response)
             except ApiException as e:
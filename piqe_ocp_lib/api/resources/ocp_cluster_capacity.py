@@ -0,0 +1,154 @@
+from array import array
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from kubernetes.client.rest import ApiException
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.ocp_quantity import parse_quantities, parse_quantity
+from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+
+logger = logging.getLogger(__loggername__)
+
+# Pods which completed don't hold any resources anymore
+ACTIVE_PODS_FIELD_SELECTOR = "status.phase!=Succeeded,status.phase!=Failed"
+
+CAPACITY_COLUMNS = ("cpu_requests", "memory_requests", "cpu_limits", "memory_limits")
+
+
+def get_pod_resources(pod: dict) -> Tuple[float, float, float, float]:
+    """
+    Get the effective cpu (cores) and memory (bytes) requests and limits of a pod. Like the scheduler, the
+    effective value of a resource is the max of the sum over containers and of any init container, plus
+    the pod overhead.
+    :param pod: (dict) Pod in dict form
+    :return: (tuple) cpu_requests, memory_requests, cpu_limits, memory_limits
+    """
+    spec = pod.get("spec") or {}
+    overhead = spec.get("overhead") or {}
+    pod_resources = list()
+    for kind in ("requests", "limits"):
+        for resource in ("cpu", "memory"):
+            containers = parse_quantities(
+                ((container.get("resources") or {}).get(kind) or {}).get(resource)
+                for container in spec.get("containers") or []
+            )
+            init_containers = parse_quantities(
+                ((container.get("resources") or {}).get(kind) or {}).get(resource)
+                for container in spec.get("initContainers") or []
+            )
+            pod_resources.append(
+                max(sum(containers), max(init_containers, default=0.0)) + parse_quantity(overhead.get(resource))
+            )
+    cpu_requests, memory_requests, cpu_limits, memory_limits = pod_resources
+    return cpu_requests, memory_requests, cpu_limits, memory_limits
+
+
+class OcpClusterCapacity(OcpBase):
+    """
+    OcpClusterCapacity Class extends OcpBase and summarizes allocatable, requested and limit cpu and memory
+    per node and per namespace. Nodes and active pods are listed once with capture(), then summaries are
+    computed over typed arrays of the resources of all pods.
+    :param kube_config_file: A kubernetes config file.
+    :return: None
+    """
+
+    def __init__(self, kube_config_file=None):
+        super().__init__(kube_config_file=kube_config_file)
+        self.ocp_nodes = self.dyn_client.resources.get(api_version="v1", kind="Node")
+        self.ocp_pods = self.dyn_client.resources.get(api_version="v1", kind="Pod")
+        self.nodes: List[dict] = list()
+        self.pod_keys: List[Tuple[str, str, Optional[str]]] = list()
+        # One typed array per column, with one value per pod in pod_keys order
+        self.pod_resources: Dict[str, array] = {column: array("d") for column in CAPACITY_COLUMNS}
+
+    def capture(self, nodes: Optional[List[dict]] = None, pods: Optional[List[dict]] = None) -> "OcpClusterCapacity":
+        """
+        List nodes and active pods and compute the resources of every pod
+        :param nodes: (optional | list) Nodes in dict form, i.e. from an OcpClusterSnapshot. Listed if not provided
+        :param pods: (optional | list) Pods in dict form. Active pods of all namespaces are listed if not provided
+        :return: self on success OR None on failure
+        """
+        try:
+            if nodes is None:
+                nodes = self.ocp_nodes.get().to_dict()["items"]
+            if pods is None:
+                pods = self.ocp_pods.get(field_selector=ACTIVE_PODS_FIELD_SELECTOR).to_dict()["items"]
+        except ApiException as e:
+            logger.error("Exception while capturing cluster capacity: %s\n", e)
+            return None
+        self.nodes = nodes
+        self.pod_keys = list()
+        self.pod_resources = {column: array("d") for column in CAPACITY_COLUMNS}
+        for pod in pods:
+            self.pod_keys.append(
+                (pod["metadata"]["namespace"], pod["metadata"]["name"], (pod.get("spec") or {}).get("nodeName"))
+            )
+            for column, value in zip(CAPACITY_COLUMNS, get_pod_resources(pod)):
+                self.pod_resources[column].append(value)
+        logger.info("Captured capacity of %s nodes and %s pods", len(self.nodes), len(self.pod_keys))
+        return self
+
+    def _sum_by(self, group_position: int) -> Dict[str, Dict[str, float]]:
+        """
+        Sum the resources of pods grouped by namespace (0) or node (2)
+        """
+        totals: Dict[str, Dict[str, float]] = dict()
+        columns = [self.pod_resources[column] for column in CAPACITY_COLUMNS]
+        for position, pod_key in enumerate(self.pod_keys):
+            group = pod_key[group_position]
+            if group is None:
+                continue
+            group_totals = totals.get(group)
+            if group_totals is None:
+                group_totals = totals[group] = dict.fromkeys(CAPACITY_COLUMNS, 0.0)
+                group_totals["pods"] = 0
+            for column, values in zip(CAPACITY_COLUMNS, columns):
+                group_totals[column] += values[position]
+            group_totals["pods"] += 1
+        return totals
+
+    def get_node_capacity(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize capacity of every node. cpu is in cores and memory in bytes.
+        :return: (dict) {node_name: {"cpu_allocatable", "memory_allocatable", "pods_allocatable", "cpu_requests",
+                 "memory_requests", "cpu_limits", "memory_limits", "pods", "schedulable"}}
+        """
+        pod_totals = self._sum_by(2)
+        allocatable = [node["status"].get("allocatable") or {} for node in self.nodes]
+        cpu_allocatable = parse_quantities(resources.get("cpu") for resources in allocatable)
+        memory_allocatable = parse_quantities(resources.get("memory") for resources in allocatable)
+        pods_allocatable = parse_quantities(resources.get("pods") for resources in allocatable)
+        node_capacity = dict()
+        for position, node in enumerate(self.nodes):
+            name = node["metadata"]["name"]
+            node_capacity[name] = {
+                "cpu_allocatable": cpu_allocatable[position],
+                "memory_allocatable": memory_allocatable[position],
+                "pods_allocatable": pods_allocatable[position],
+                "schedulable": not (node.get("spec") or {}).get("unschedulable", False),
+            }
+            node_capacity[name].update(pod_totals.get(name) or dict(dict.fromkeys(CAPACITY_COLUMNS, 0.0), pods=0))
+        return node_capacity
+
+    def get_namespace_capacity(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarize requests and limits of the pods of every namespace. cpu is in cores and memory in bytes.
+        :return: (dict) {namespace: {"cpu_requests", "memory_requests", "cpu_limits", "memory_limits", "pods"}}
+        """
+        return self._sum_by(0)
+
+    def get_cluster_capacity(self, schedulable_only: bool = True) -> Dict[str, float]:
+        """
+        Summarize capacity of the cluster
+        :param schedulable_only: (bool) Only count nodes which are schedulable
+        :return: (dict) Totals of the node capacity columns
+        """
+        cluster_capacity: Dict[str, float] = dict()
+        for capacity in self.get_node_capacity().values():
+            if schedulable_only and not capacity["schedulable"]:
+                continue
+            for column, value in capacity.items():
+                if column != "schedulable":
+                    cluster_capacity[column] = cluster_capacity.get(column, 0) + value
+        return cluster_capacity
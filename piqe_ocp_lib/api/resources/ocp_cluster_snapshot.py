@@ -0,0 +1,298 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+from piqe_ocp_lib.api.resources.ocp_cluster_operators import OcpClusterOperator
+from piqe_ocp_lib.api.resources.ocp_cluster_versions import OcpClusterVersion
+from piqe_ocp_lib.api.resources.ocp_deploymentconfigs import OcpDeploymentconfigs
+from piqe_ocp_lib.api.resources.ocp_nodes import MASTER_NODE_ROLE_LABEL, WORKER_NODE_ROLE_LABEL, OcpNodes, is_node_ready
+from piqe_ocp_lib.api.resources.ocp_pods import OcpPods
+
+logger = logging.getLogger(__loggername__)
+
+ROUTER_NAMESPACE = "openshift-ingress"
+ROUTER_DEPLOYMENTS = ("router-default",)
+IMAGE_REGISTRY_NAMESPACE = "openshift-image-registry"
+IMAGE_REGISTRY_DEPLOYMENTS = ("cluster-image-registry-operator", "image-registry")
+
+SNAPSHOT_COMPONENTS = ("nodes", "pods", "deployments", "cluster_operators", "cluster_version")
+
+
+def evaluate_node_conditions(node: dict) -> List[dict]:
+    """
+    Evaluate the status conditions of a single node
+    :param node: (dict) Node object in dict form
+    :return: (list) List of failure reasons. Empty list if the node is healthy
+    """
+    failures = list()
+    for condition in node.get("status", {}).get("conditions") or []:
+        if condition["type"] == "Ready" and condition["status"] != "True":
+            failures.append({"NodeReadyStatus": condition["status"]})
+        elif condition["type"] == "MemoryPressure" and condition["status"] == "True":
+            failures.append({"MemoryPressure": "The node memory is low"})
+        elif condition["type"] == "DiskPressure" and condition["status"] == "True":
+            failures.append({"DiskPressure": "The disk capacity is low"})
+        elif condition["type"] == "PIDPressure" and condition["status"] == "True":
+            failures.append({"PIDPressure": "There are too many processes on the node"})
+    return failures
+
+
+def is_pod_ready(pod: dict) -> bool:
+    """
+    Check the Ready condition of a single pod. Pods without a Ready condition
+    are not reported as unhealthy.
+    :param pod: (dict) Pod object in dict form
+    :return: (bool) False if Ready condition status is False otherwise True
+    """
+    for condition in pod.get("status", {}).get("conditions") or []:
+        if condition["type"] == "Ready" and condition["status"] == "False":
+            return False
+    return True
+
+
+def are_deployment_replicas_matching(deployment: dict) -> bool:
+    """
+    Check that desired, available and ready replicas of a deployment are matching
+    :param deployment: (dict) Deployment object in dict form
+    :return: (bool) True if replicas counts are matching otherwise False
+    """
+    status = deployment.get("status", {})
+    return status.get("replicas") == status.get("availableReplicas") == status.get("readyReplicas")
+
+
+def is_cluster_operator_available(cluster_operator: dict) -> bool:
+    """
+    Check the Available condition of a single cluster operator
+    :param cluster_operator: (dict) ClusterOperator object in dict form
+    :return: (bool) False if Available condition status is False otherwise True
+    """
+    for condition in cluster_operator.get("status", {}).get("conditions") or []:
+        if condition["type"] == "Available" and condition["status"] == "False":
+            return False
+    return True
+
+
+def is_cluster_version_progressing(cluster_version: dict) -> bool:
+    """
+    Check the Progressing condition of the ClusterVersion
+    :param cluster_version: (dict) ClusterVersion object in dict form
+    :return: (bool) True if Progressing condition status is True otherwise False
+    """
+    for condition in cluster_version.get("status", {}).get("conditions") or []:
+        if condition["type"] == "Progressing" and condition["status"] == "True":
+            return True
+    return False
+
+
+def evaluate_nodes_health(nodes: Iterable[dict]) -> Tuple[bool, dict]:
+    """
+    Evaluate overall health of a group of nodes
+    :param nodes: Node objects in dict form
+    :return: Return tuple of all_nodes_healthy(boolean) and node_health_info(dict of node name and failure reason)
+    """
+    node_health_info = dict()
+    ready_statuses = list()
+    for node in nodes:
+        ready_statuses.append(is_node_ready(node))
+        node_health_info[node["metadata"]["name"]] = evaluate_node_conditions(node)
+    return bool(ready_statuses) and all(ready_statuses), node_health_info
+
+
+def evaluate_component_health(
+    pods: Iterable[dict], deployments: Iterable[dict], deployment_names: Iterable[str], pod_name_filter=None
+) -> Tuple[bool, List[str], Dict[str, bool]]:
+    """
+    Evaluate health of a component made of pods and deployments
+    :param pods: Pod objects in dict form
+    :param deployments: Deployment objects in dict form
+    :param deployment_names: Names of the deployments which make the component
+    :param pod_name_filter: (optional | callable) Only pods whose name satisfy the filter are evaluated
+    :return: Return tuple of overall health (bool), unhealthy pod names (list) and replicas matching
+             status per deployment (dict)
+    """
+    unhealthy_pod_names = [
+        pod["metadata"]["name"]
+        for pod in pods
+        if (pod_name_filter is None or pod_name_filter(pod["metadata"]["name"])) and not is_pod_ready(pod)
+    ]
+    replicas_matching = {
+        deployment["metadata"]["name"]: are_deployment_replicas_matching(deployment)
+        for deployment in deployments
+        if deployment["metadata"]["name"] in deployment_names
+    }
+    is_healthy = not unhealthy_pod_names and bool(replicas_matching) and all(replicas_matching.values())
+    return is_healthy, unhealthy_pod_names, replicas_matching
+
+
+class OcpClusterSnapshot(OcpBase):
+    """
+    OcpClusterSnapshot Class extends OcpBase and gathers, in a single concurrent pass, the cluster
+    objects needed to evaluate the health of critical openshift components:
+    - Nodes
+    - Pods and Deployments of router and image registry
+    - Cluster Operators
+    - Cluster Version
+
+    Gathered objects are kept in dict form so all health predicates can be evaluated against the
+    snapshot without any further API request.
+    :param kube_config_file: A kubernetes config file.
+    :return: None
+    """
+
+    def __init__(self, kube_config_file=None):
+        super().__init__(kube_config_file=kube_config_file)
+        self.ocp_node = OcpNodes(kube_config_file=self.kube_config_file)
+        self.ocp_pod = OcpPods(kube_config_file=self.kube_config_file)
+        self.ocp_deployment = OcpDeploymentconfigs(kind="Deployment", kube_config_file=self.kube_config_file)
+        self.ocp_cluster_operator = OcpClusterOperator(kube_config_file=self.kube_config_file)
+        self.ocp_cluster_version = OcpClusterVersion(kube_config_file=self.kube_config_file)
+        self.namespaces = (ROUTER_NAMESPACE, IMAGE_REGISTRY_NAMESPACE)
+        self.nodes: List[dict] = list()
+        self.pods: Dict[str, List[dict]] = dict()
+        self.deployments: Dict[str, List[dict]] = dict()
+        self.cluster_operators: List[dict] = list()
+        self.cluster_version: Optional[dict] = None
+        self.captured_components: Tuple[str, ...] = tuple()
+        self.captured_at: Optional[float] = None
+        self.capture_duration: Optional[float] = None
+
+    @staticmethod
+    def _items(api_response) -> List[dict]:
+        """
+        Convert a list response into a list of objects in dict form
+        :param api_response: ResourceList response or None
+        :return: (list) List of objects in dict form. Empty list on failure
+        """
+        if not api_response:
+            return list()
+        return api_response.to_dict().get("items") or list()
+
+    def _capture_nodes(self):
+        self.nodes = self._items(self.ocp_node.get_all_nodes())
+
+    def _capture_pods(self, namespace):
+        self.pods[namespace] = self._items(self.ocp_pod.list_pods_in_a_namespace(namespace=namespace))
+
+    def _capture_deployments(self, namespace):
+        self.deployments[namespace] = self._items(
+            self.ocp_deployment.list_all_deployments_in_a_namespace(namespace=namespace)
+        )
+
+    def _capture_cluster_operators(self):
+        self.cluster_operators = self._items(self.ocp_cluster_operator.get_all_cluster_operators())
+
+    def _capture_cluster_version(self):
+        cluster_version = self.ocp_cluster_version.get_cluster_version()
+        self.cluster_version = cluster_version.to_dict() if cluster_version else None
+
+    def capture(self, components: Optional[Iterable[str]] = None) -> "OcpClusterSnapshot":
+        """
+        Gather cluster objects concurrently. Each component costs one list request, pods and
+        deployments cost one list request per namespace.
+        :param components: (optional | list) Components to be gathered. Defaults to SNAPSHOT_COMPONENTS
+        :return: The snapshot itself
+        """
+        components = tuple(components) if components else SNAPSHOT_COMPONENTS
+        unknown_components = set(components) - set(SNAPSHOT_COMPONENTS)
+        if unknown_components:
+            raise ValueError(f"Unknown snapshot components: {sorted(unknown_components)}")
+
+        tasks = list()
+        if "nodes" in components:
+            tasks.append((self._capture_nodes, ()))
+        if "pods" in components:
+            tasks.extend((self._capture_pods, (namespace,)) for namespace in self.namespaces)
+        if "deployments" in components:
+            tasks.extend((self._capture_deployments, (namespace,)) for namespace in self.namespaces)
+        if "cluster_operators" in components:
+            tasks.append((self._capture_cluster_operators, ()))
+        if "cluster_version" in components:
+            tasks.append((self._capture_cluster_version, ()))
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="Snapshot") as executor:
+            futures = [executor.submit(func, *args) for func, args in tasks]
+            for future in futures:
+                future.result()
+        self.captured_at = start
+        self.capture_duration = time.time() - start
+        self.captured_components = components
+        logger.info(
+            "Captured cluster snapshot of %s with %s requests in %s seconds",
+            components,
+            len(tasks),
+            round(self.capture_duration, 2),
+        )
+        return self
+
+    def get_nodes(self, role: Optional[str] = None) -> List[dict]:
+        """
+        Get nodes from snapshot
+        :param role: (optional | str) Node role, 'master' or 'worker'. Defaults to all nodes
+        :return: (list) List of nodes in dict form
+        """
+        if role is None:
+            return self.nodes
+        role_label = {"master": MASTER_NODE_ROLE_LABEL, "worker": WORKER_NODE_ROLE_LABEL}[role]
+        return [node for node in self.nodes if role_label in (node["metadata"].get("labels") or {})]
+
+    def check_nodes_health(self, role: Optional[str] = None) -> Tuple[bool, dict]:
+        """
+        Check health of nodes in snapshot
+        :param role: (optional | str) Node role, 'master' or 'worker'. Defaults to all nodes
+        :return: Return tuple of all_nodes_healthy(boolean) and node_health_info(dict of node name and failure reason)
+        """
+        return evaluate_nodes_health(self.get_nodes(role=role))
+
+    def check_router_health(self) -> Tuple[bool, dict]:
+        """
+        Check router pods readiness and router deployment replicas in snapshot
+        :return: Return tuple of bool (is_router_healthy) and dict (unhealthy_router_info)
+        """
+        is_router_healthy, unhealthy_pod_names, replicas_matching = evaluate_component_health(
+            self.pods.get(ROUTER_NAMESPACE, []), self.deployments.get(ROUTER_NAMESPACE, []), ROUTER_DEPLOYMENTS
+        )
+        unhealthy_router_info = {"router_pod": unhealthy_pod_names}
+        if not (replicas_matching and all(replicas_matching.values())):
+            unhealthy_router_info["router_replicas"] = False
+        return is_router_healthy, unhealthy_router_info
+
+    def check_image_registry_health(self) -> Tuple[bool, dict]:
+        """
+        Check image registry pods readiness and image registry deployments replicas in snapshot
+        :return: Return tuple of bool (is_image_registry_healthy) and dict (unhealthy_image_registry_info)
+        """
+        is_image_registry_healthy, unhealthy_pod_names, replicas_matching = evaluate_component_health(
+            self.pods.get(IMAGE_REGISTRY_NAMESPACE, []),
+            self.deployments.get(IMAGE_REGISTRY_NAMESPACE, []),
+            IMAGE_REGISTRY_DEPLOYMENTS,
+            pod_name_filter=lambda name: any(deployment in name for deployment in IMAGE_REGISTRY_DEPLOYMENTS),
+        )
+        unhealthy_image_registry_info = {"image_registry_pod": unhealthy_pod_names}
+        if not (replicas_matching and all(replicas_matching.values())):
+            unhealthy_image_registry_info["image_registry_replicas"] = False
+        return is_image_registry_healthy, unhealthy_image_registry_info
+
+    def check_cluster_version_operator_health(self) -> bool:
+        """
+        Check ClusterVersion operator in snapshot is not progressing
+        :return: (bool) True if ClusterVersion operator is healthy otherwise False
+        """
+        if self.cluster_version is None:
+            return False
+        return not is_cluster_version_progressing(self.cluster_version)
+
+    def check_cluster_operators_health(self) -> Tuple[bool, List[str]]:
+        """
+        Check availability of cluster operators in snapshot
+        :return: (tuple) Return overall health of cluster operator (boolean) and list of unhealthy operator if any
+        """
+        unhealthy_operators_list = [
+            cluster_operator["metadata"]["name"]
+            for cluster_operator in self.cluster_operators
+            if not is_cluster_operator_available(cluster_operator)
+        ]
+        return len(unhealthy_operators_list) == 0, unhealthy_operators_list
@@ -1,10 +1,14 @@
 import logging
-from time import sleep, time
+from threading import Condition, Event, Thread
+from time import monotonic, sleep, time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 from kubernetes.client.rest import ApiException
 
 from piqe_ocp_lib import __loggername__
 from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+from piqe_ocp_lib.api.resources.ocp_informer import DELETED, OcpInformer
+from piqe_ocp_lib.api.resources.ocp_pods import iter_log_lines
 
 logger = logging.getLogger(__loggername__)
 
@@ -182,20 +186,256 @@ class OcpDeploymentconfigs(OcpBase):
                 unhealthy_dcs.append(dc)
         return unhealthy_dcs
 
-    def read_dc_log(self, namespace, dc, tail_lines=6):
+    @staticmethod
+    def _log_query_params(
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
+        since_seconds: Optional[int] = None,
+        follow: bool = False,
+        timestamps: bool = False,
+    ) -> List[Tuple[str, str]]:
+        params = [("tailLines", tail_lines), ("limitBytes", limit_bytes), ("sinceSeconds", since_seconds)]
+        query_params = [(name, str(value)) for name, value in params if value is not None]
+        if follow:
+            query_params.append(("follow", "true"))
+        if timestamps:
+            query_params.append(("timestamps", "true"))
+        return query_params
+
+    def read_dc_log(
+        self,
+        namespace,
+        dc,
+        tail_lines: Optional[int] = 6,
+        limit_bytes: Optional[int] = None,
+        since_seconds: Optional[int] = None,
+    ):
         """
         Method to read the logs of a deployment config
         within a namespace. Returns a list of lines of
-        requested log file.
+        requested log file. The log is cut on the server,
+        so only the requested lines are transferred.
         :param namespace: The namespace where the targeted dc resides
         :param dc: The targeted deployment config
         :param tail_lines: The number of most recent lines in the log
-                           to be displayed.
-        :return: A list of strings.
+                           to be displayed. None for the whole log.
+        :param limit_bytes: (optional | int) Max number of bytes of the log
+        :param since_seconds: (optional | int) Only lines written in the last since_seconds seconds
+        :return: A list of strings on success. None on failure.
         """
         try:
-            api_response = self.ocp_dcs.log.get(namespace=namespace, name=dc)
+            api_response = self.ocp_dcs.log.get(
+                namespace=namespace,
+                name=dc,
+                query_params=self._log_query_params(tail_lines, limit_bytes, since_seconds),
+                serialize=False,
+            )
         except ApiException as e:
             logger.error("Exception while getting deploymentconfig log: %s\n", e)
-        dc_log = api_response.split("\n")[-tail_lines:-1]
-        return dc_log
+            return None
+        return list(iter_log_lines(api_response))
+
+    def stream_dc_log(
+        self,
+        namespace: str,
+        dc: str,
+        follow: bool = True,
+        tail_lines: Optional[int] = None,
+        since_seconds: Optional[int] = None,
+        timestamps: bool = False,
+        chunk_size: int = 4096,
+    ) -> Iterator[str]:
+        """
+        Yield the lines of the log of the latest deployment of a deployment config as they are received,
+        with memory use bounded by the longest line. With follow the generator keeps yielding new lines
+        until the deployment ends or the generator is closed.
+        :param namespace: The namespace where the targeted dc resides
+        :param dc: The targeted deployment config
+        :param follow: (bool) Keep streaming lines written after the request
+        :param tail_lines: (optional | int) Number of lines from the end of the log to start with
+        :param since_seconds: (optional | int) Only lines written in the last since_seconds seconds
+        :param timestamps: (bool) Prefix every line with its timestamp
+        :param chunk_size: (int) Size in bytes of the chunks read from the response
+        :return: (generator) Lines of the log
+        """
+        try:
+            api_response = self.ocp_dcs.log.get(
+                namespace=namespace,
+                name=dc,
+                query_params=self._log_query_params(
+                    tail_lines, since_seconds=since_seconds, follow=follow, timestamps=timestamps
+                ),
+                serialize=False,
+            )
+        except ApiException as e:
+            logger.error("Exception while streaming deploymentconfig log: %s\n", e)
+            return
+        yield from iter_log_lines(api_response, chunk_size=chunk_size)
+
+
+class OcpDcReadinessTracker(OcpBase):
+    """
+    OcpDcReadinessTracker Class extends OcpBase and tracks the readiness of many deployment configs
+    through a single DeploymentConfig watch, instead of one watch or poll per deployment config.
+    A deployment config is ready when its Available and Progressing conditions are True.
+    Callbacks registered with notify_when_ready are called from the watch thread, or from the
+    expiry thread on timeout, so they should return quickly. Callbacks still waiting when the
+    tracker is stopped are called as not ready.
+    :param namespace: (optional | str) Track deployment configs of a single namespace. Defaults to all namespaces
+    :param label_selector: (optional | str) Only track deployment configs matching the label selector
+    :param watch_timeout: (int) Server side timeout of a single watch request in seconds
+    :param kube_config_file: A kubernetes config file.
+    :return: None
+    """
+
+    def __init__(
+        self,
+        namespace: Optional[str] = None,
+        label_selector: Optional[str] = None,
+        watch_timeout: int = 60,
+        kube_config_file=None,
+    ):
+        super().__init__(kube_config_file=kube_config_file)
+        self.dc_informer = OcpInformer(
+            "v1",
+            "DeploymentConfig",
+            namespace=namespace,
+            label_selector=label_selector,
+            watch_timeout=watch_timeout,
+            kube_config_file=kube_config_file,
+        )
+        self.dc_informer.add_event_handler(self._on_event)
+        # (namespace, name) -> list of (deadline, callback) waiting for the dc to be ready
+        self._waiters: Dict[Tuple[str, str], List[Tuple[float, Callable[[str, str, bool], None]]]] = dict()
+        self._lock = Condition()
+        self._stop_event = Event()
+        self._expiry_thread: Optional[Thread] = None
+
+    def _on_event(self, event_type: str, obj: dict, old_obj: Optional[dict]):
+        if event_type == DELETED or not is_dc_available(obj):
+            return
+        key = (obj["metadata"].get("namespace"), obj["metadata"]["name"])
+        with self._lock:
+            waiters = self._waiters.pop(key, [])
+        self._call([(key, callback) for _, callback in waiters], True)
+
+    @staticmethod
+    def _call(callbacks: List[Tuple[Tuple[str, str], Callable[[str, str, bool], None]]], ready: bool):
+        for (namespace, name), callback in callbacks:
+            try:
+                callback(namespace, name, ready)
+            except Exception as e:
+                logger.exception("Readiness callback of deploymentconfig %s in %s failed: %s", name, namespace, e)
+
+    def _expire(self):
+        while not self._stop_event.is_set():
+            expired = list()
+            with self._lock:
+                now = monotonic()
+                for key in list(self._waiters):
+                    waiters = self._waiters[key]
+                    expired.extend((key, callback) for deadline, callback in waiters if deadline <= now)
+                    waiters[:] = [(deadline, callback) for deadline, callback in waiters if deadline > now]
+                    if not waiters:
+                        del self._waiters[key]
+                deadlines = [deadline for waiters in self._waiters.values() for deadline, _ in waiters]
+                if not expired:
+                    self._lock.wait(timeout=min(deadlines) - now if deadlines else None)
+            for (namespace, name), _ in expired:
+                logger.error("Timed out waiting for the deploymentconfig %s in %s to become ready", name, namespace)
+            self._call(expired, False)
+
+    def notify_when_ready(
+        self, namespace: str, dc: str, callback: Callable[[str, str, bool], None], timeout: float = 1800
+    ):
+        """
+        Call callback with (namespace, dc, True) once the deployment config is ready, or with
+        (namespace, dc, False) if it isn't ready within timeout seconds. The callback is called
+        right away if the deployment config is already ready.
+        :param namespace: The namespace where the targeted dc resides
+        :param dc: The name of the deploymentconfig
+        :param callback: (callable) Function called with (namespace, dc, ready)
+        :param timeout: (float) Time limit in seconds
+        :return: None
+        """
+        with self._lock:
+            current_dc = self.dc_informer.get(dc, namespace=namespace)
+            if current_dc is None or not is_dc_available(current_dc):
+                self._waiters.setdefault((namespace, dc), list()).append((monotonic() + timeout, callback))
+                self._lock.notify_all()
+                return
+        self._call([((namespace, dc), callback)], True)
+
+    def wait_for_ready(self, namespace: str, dc: str, timeout: float = 1800) -> bool:
+        """
+        Wait for a deployment config to be ready
+        :param namespace: The namespace where the targeted dc resides
+        :param dc: The name of the deploymentconfig
+        :param timeout: (float) Time limit in seconds
+        :return: (bool) True if the deployment config is ready otherwise False
+        """
+        ready_event = Event()
+        result = list()
+
+        def on_ready(namespace, dc, ready):
+            result.append(ready)
+            ready_event.set()
+
+        self.notify_when_ready(namespace, dc, on_ready, timeout=timeout)
+        if not ready_event.wait(timeout=timeout):
+            with self._lock:
+                waiters = self._waiters.get((namespace, dc), [])
+                waiters[:] = [(deadline, callback) for deadline, callback in waiters if callback is not on_ready]
+                if not waiters:
+                    self._waiters.pop((namespace, dc), None)
+            return bool(result and result[0])
+        return result[0]
+
+    def start(self, timeout: int = 60) -> bool:
+        """
+        Start the deploymentconfig watch
+        :param timeout: (int) Time limit in seconds to wait for the initial list of deployment configs
+        :return: (bool) True if the initial list of deployment configs is synced otherwise False
+        """
+        self._stop_event.clear()
+        if self._expiry_thread is None or not self._expiry_thread.is_alive():
+            self._expiry_thread = Thread(target=self._expire, name="DcReadinessExpiry", daemon=True)
+            self._expiry_thread.start()
+        return self.dc_informer.start(timeout=timeout)
+
+    def stop(self):
+        """
+        Stop the deploymentconfig watch. Callbacks still waiting are called as not ready.
+        :return: None
+        """
+        self._stop_event.set()
+        with self._lock:
+            waiters, self._waiters = self._waiters, dict()
+            self._lock.notify_all()
+        self.dc_informer.stop()
+        self._call([(key, callback) for key, key_waiters in waiters.items() for _, callback in key_waiters], False)
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+    def __enter__(self):
+        if not self.start():
+            logger.warning("DeploymentConfig watch not synced, readiness is only tracked once it is")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def is_dc_available(dc: dict) -> bool:
+    """
+    Check the Available and Progressing status conditions of a deployment config
+    :param dc: (dict) Deployment config in dict form
+    :return: (bool) True if both conditions are True otherwise False
+    """
+    conditions = {
+        condition.get("type"): condition.get("status") for condition in (dc.get("status") or {}).get("conditions") or []
+    }
+    return conditions.get("Available") == "True" and conditions.get("Progressing") == "True"
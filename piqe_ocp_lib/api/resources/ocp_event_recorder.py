@@ -0,0 +1,297 @@
+from datetime import datetime, timezone
+import gzip
+import json
+import logging
+import os
+from threading import Event, RLock, Thread
+import time
+from typing import Dict, Iterator, List, Optional
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+from piqe_ocp_lib.api.resources.ocp_informer import ADDED, DELETED, MODIFIED, OcpInformer
+
+logger = logging.getLogger(__loggername__)
+
+# Suffix of the index file written next to an event log
+EVENT_LOG_INDEX_SUFFIX = ".idx"
+
+
+def parse_event_timestamp(timestamp: Optional[str]) -> Optional[float]:
+    """
+    Convert an event timestamp i.e. 2021-03-01T10:00:00Z or 2021-03-01T10:00:00.123456Z to seconds since the epoch
+    :param timestamp: (optional | str) RFC 3339 timestamp
+    :return: (float) Seconds since the epoch OR None if timestamp is not set
+    """
+    if not timestamp:
+        return None
+    fmt = "%Y-%m-%dT%H:%M:%S.%fZ" if "." in timestamp else "%Y-%m-%dT%H:%M:%SZ"
+    return datetime.strptime(timestamp, fmt).replace(tzinfo=timezone.utc).timestamp()
+
+
+def event_record(event: dict) -> dict:
+    """
+    Build the compact record of an event written to the event log. The timestamp is the time the
+    event was last seen.
+    :param event: (dict) Event in dict form
+    :return: (dict) Event record
+    """
+    metadata = event["metadata"]
+    involved_object = event.get("involvedObject") or {}
+    timestamp = (
+        parse_event_timestamp(event.get("lastTimestamp"))
+        or parse_event_timestamp(event.get("eventTime"))
+        or parse_event_timestamp(event.get("firstTimestamp"))
+        or parse_event_timestamp(metadata.get("creationTimestamp"))
+        or time.time()
+    )
+    return {
+        "timestamp": timestamp,
+        "namespace": metadata.get("namespace"),
+        "uid": metadata.get("uid"),
+        "count": event.get("count") or 1,
+        "type": event.get("type"),
+        "reason": event.get("reason"),
+        "kind": involved_object.get("kind"),
+        "name": involved_object.get("name"),
+        "message": event.get("message"),
+        "source": (event.get("source") or {}).get("component") or event.get("reportingComponent"),
+    }
+
+
+class OcpEventLog:
+    """
+    OcpEventLog reads and appends to an event log. The log is a sequence of gzip members, one per block
+    of records, so the whole file can also be read with zcat. Every block written is checkpointed in an
+    index file with its offset and size, the time range of its records and their namespaces and reasons.
+    Queries read the index and only decompress the blocks which can match, one block at a time.
+    :param log_path: (str) Path of the event log
+    :return: None
+    """
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        self.index_path = log_path + EVENT_LOG_INDEX_SUFFIX
+
+    def write_block(self, records: List[dict]) -> Optional[dict]:
+        """
+        Append a block of records to the log and checkpoint it in the index
+        :param records: (list) Event records
+        :return: (dict) The index entry of the block OR None if there are no records
+        """
+        if not records:
+            return None
+        data = gzip.compress(
+            "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records).encode("utf-8")
+        )
+        with open(self.log_path, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+        entry = {
+            "offset": offset,
+            "size": len(data),
+            "records": len(records),
+            "start": min(record["timestamp"] for record in records),
+            "end": max(record["timestamp"] for record in records),
+            "namespaces": sorted({record["namespace"] or "" for record in records}),
+            "reasons": sorted({record["reason"] or "" for record in records}),
+        }
+        # The index is written after the block, so a block is only queried once it is complete
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        return entry
+
+    def iter_index(self) -> Iterator[dict]:
+        """
+        Iterate over the index entries of the blocks of the log
+        :return: (generator) Index entries
+        """
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        namespace: Optional[str] = None,
+        reason: Optional[str] = None,
+    ) -> Iterator[dict]:
+        """
+        Iterate over the recorded events matching a time range, a namespace and a reason
+        :param start: (optional | float) Start of the time range in seconds since the epoch
+        :param end: (optional | float) End of the time range in seconds since the epoch
+        :param namespace: (optional | str) Namespace of the events
+        :param reason: (optional | str) Reason of the events i.e. FailedScheduling
+        :return: (generator) Event records in the order they were recorded
+        """
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, "rb") as log_file:
+            for entry in self.iter_index():
+                if start is not None and entry["end"] < start:
+                    continue
+                if end is not None and entry["start"] > end:
+                    continue
+                if namespace is not None and namespace not in entry["namespaces"]:
+                    continue
+                if reason is not None and reason not in entry["reasons"]:
+                    continue
+                log_file.seek(entry["offset"])
+                for line in gzip.decompress(log_file.read(entry["size"])).splitlines():
+                    record = json.loads(line)
+                    if start is not None and record["timestamp"] < start:
+                        continue
+                    if end is not None and record["timestamp"] > end:
+                        continue
+                    if namespace is not None and record["namespace"] != namespace:
+                        continue
+                    if reason is not None and record["reason"] != reason:
+                        continue
+                    yield record
+
+
+class OcpEventRecorder(OcpBase):
+    """
+    OcpEventRecorder Class extends OcpBase and persists cluster events for post-mortem analysis of long
+    runs. Events are received from a watch, so none are lost to event TTL expiry between polls. An event
+    is recorded every time its count changes, duplicates of the same (uid, count) i.e. after a relist are
+    dropped, including events already in an existing log. Records are buffered and appended to an OcpEventLog
+    in blocks of block_records records, and by a background thread every checkpoint_interval seconds.
+    Buffered records are written on stop() or flush().
+    :param log_path: (str) Path of the event log. An existing log is appended to
+    :param namespace: (optional | str) Record events of a single namespace. Defaults to all namespaces
+    :param block_records: (int) Max number of records of a block
+    :param checkpoint_interval: (int) Max time in seconds a record is buffered before it is written
+    :param watch_timeout: (int) Server side timeout of a single watch request in seconds
+    :param kube_config_file: A kubernetes config file.
+    :return: None
+    """
+
+    def __init__(
+        self,
+        log_path: str,
+        namespace: Optional[str] = None,
+        block_records: int = 1000,
+        checkpoint_interval: int = 60,
+        watch_timeout: int = 60,
+        kube_config_file=None,
+    ):
+        super().__init__(kube_config_file=kube_config_file)
+        self.event_log = OcpEventLog(log_path)
+        self.block_records = block_records
+        self.checkpoint_interval = checkpoint_interval
+        self.recorded = 0
+        self.duplicates = 0
+        self._lock = RLock()
+        self._buffer: List[dict] = list()
+        self._last_checkpoint = time.monotonic()
+        # uid -> count of the last recorded occurrence of the event
+        self._recorded_counts: Dict[str, int] = dict()
+        for record in self.event_log.query():
+            self._recorded_counts[record["uid"]] = max(record["count"], self._recorded_counts.get(record["uid"], 0))
+        self._stop_event = Event()
+        self._checkpoint_thread: Optional[Thread] = None
+        self.event_informer = OcpInformer(
+            "v1", "Event", namespace=namespace, watch_timeout=watch_timeout, kube_config_file=kube_config_file
+        )
+        self.event_informer.add_event_handler(self._on_event)
+
+    def _on_event(self, event_type: str, obj: dict, old_obj: Optional[dict]):
+        uid = obj["metadata"].get("uid")
+        with self._lock:
+            if event_type == DELETED:
+                # Expired events are not sent again, forget them to bound memory use
+                self._recorded_counts.pop(uid, None)
+                return
+            if event_type not in (ADDED, MODIFIED):
+                return
+            record = event_record(obj)
+            if self._recorded_counts.get(uid, 0) >= record["count"]:
+                self.duplicates += 1
+                return
+            self._recorded_counts[uid] = record["count"]
+            self._buffer.append(record)
+            self.recorded += 1
+            if len(self._buffer) >= self.block_records:
+                self.flush()
+
+    def _run_checkpoints(self):
+        while True:
+            with self._lock:
+                wait = self._last_checkpoint + self.checkpoint_interval - time.monotonic()
+                if wait <= 0:
+                    if self._buffer:
+                        self.flush()
+                    else:
+                        self._last_checkpoint = time.monotonic()
+                    wait = self.checkpoint_interval
+            if self._stop_event.wait(wait):
+                return
+
+    def flush(self) -> int:
+        """
+        Write buffered records to the event log
+        :return: (int) Number of records written
+        """
+        with self._lock:
+            records, self._buffer = self._buffer, list()
+            self._last_checkpoint = time.monotonic()
+            try:
+                self.event_log.write_block(records)
+            except OSError as e:
+                logger.error("Failed to write %s events to %s: %s", len(records), self.event_log.log_path, e)
+                self._buffer = records + self._buffer
+                return 0
+        return len(records)
+
+    def start(self, timeout: int = 60) -> bool:
+        """
+        Start recording events
+        :param timeout: (int) Time limit in seconds to wait for the initial list of events
+        :return: (bool) True if the initial list of events was recorded otherwise False
+        """
+        self._stop_event.clear()
+        self._checkpoint_thread = Thread(target=self._run_checkpoints, name="EventCheckpoint", daemon=True)
+        self._checkpoint_thread.start()
+        started = self.event_informer.start(timeout=timeout)
+        if started:
+            # Events of an existing log which expired from the cluster won't be sent again
+            uids = {obj["metadata"].get("uid") for obj in self.event_informer.list()}
+            with self._lock:
+                self._recorded_counts = {uid: count for uid, count in self._recorded_counts.items() if uid in uids}
+        return started
+
+    def stop(self, timeout: Optional[int] = None):
+        """
+        Stop recording events and write buffered records to the event log
+        :param timeout: (optional | int) Time limit in seconds to wait for the watch thread to finish
+        :return: None
+        """
+        self.event_informer.stop(timeout=timeout)
+        self._stop_event.set()
+        if self._checkpoint_thread is not None:
+            self._checkpoint_thread.join(timeout=timeout)
+        self.flush()
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        namespace: Optional[str] = None,
+        reason: Optional[str] = None,
+    ) -> Iterator[dict]:
+        """
+        Iterate over the recorded events matching a time range, a namespace and a reason.
+        Records still buffered are written first.
+        :param start: (optional | float) Start of the time range in seconds since the epoch
+        :param end: (optional | float) End of the time range in seconds since the epoch
+        :param namespace: (optional | str) Namespace of the events
+        :param reason: (optional | str) Reason of the events i.e. FailedScheduling
+        :return: (generator) Event records in the order they were recorded
+        """
+        self.flush()
+        return self.event_log.query(start=start, end=end, namespace=namespace, reason=reason)
@@ -1,9 +1,12 @@
 import logging
+from typing import List, Optional
 
 from kubernetes.client.rest import ApiException
+from openshift.dynamic.resource import ResourceInstance
 
 from .ocp_base import OcpBase
-from .ocp_pods import OcpPods
+from .ocp_informer import OcpInformer
+from .ocp_pods import OcpPods, owner_key
 
 # Initiate child logger. Parent logger is in the script invoking this
 # module and is named 'ocp_test_logger'
@@ -12,6 +15,95 @@ from .ocp_pods import OcpPods
 logger = logging.getLogger("ocp_test_logger.ocp_events")
 
 
+def involved_object_field_selector(kind: str, name: str) -> str:
+    """
+    Build the field selector of the events of an object
+    :param kind: (str) Kind of the involved object i.e. Pod
+    :param name: (str) Name of the involved object
+    :return: (str) Field selector
+    """
+    return f"involvedObject.kind={kind},involvedObject.name={name}"
+
+
+def event_involved_object_keys(event: dict) -> List[str]:
+    """
+    Index function of events by involved object
+    :param event: (dict) Event in dict form
+    :return: (list) Key of the involved object of the event
+    """
+    involved_object = event.get("involvedObject") or {}
+    if not involved_object.get("kind") or not involved_object.get("name"):
+        return []
+    namespace = involved_object.get("namespace") or event["metadata"].get("namespace")
+    return [owner_key(namespace, involved_object["kind"], involved_object["name"])]
+
+
+class OcpEventStore(OcpBase):
+    """
+    OcpEventStore Class extends OcpBase and keeps the events of a namespace, or of all namespaces, in a
+    local store fed by a single watch and indexed by namespace and involved object, so event lookups don't
+    make any API request and don't depend on the number of events. Used as a context manager the store
+    watches events for the duration of the with block.
+    :param namespace: (optional | str) The namespace whose events are watched. Defaults to all namespaces
+    :param kube_config_file: A kubernetes config file.
+    :return: None
+    """
+
+    def __init__(self, namespace: Optional[str] = None, kube_config_file=None):
+        super().__init__(kube_config_file=kube_config_file)
+        self.namespace = namespace
+        self.event_informer = OcpInformer("v1", "Event", namespace=namespace, kube_config_file=kube_config_file)
+        self.event_informer.add_indexer("involved_object", event_involved_object_keys)
+
+    def start(self, timeout: int = 60) -> bool:
+        """
+        Start watching events
+        :param timeout: (int) Time limit in seconds to wait for the initial list
+        :return: (bool) True if the store is synced otherwise False
+        """
+        return self.event_informer.start(timeout=timeout)
+
+    def stop(self, timeout: Optional[int] = None):
+        """
+        Stop watching events
+        :param timeout: (optional | int) Time limit in seconds to wait for the watch thread to finish
+        :return: None
+        """
+        self.event_informer.stop(timeout=timeout)
+
+    def __enter__(self):
+        if not self.start():
+            logger.warning(
+                "Event store of namespace %s is not synced, events are listed instead", self.namespace or "all"
+            )
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def is_ready(self) -> bool:
+        return self.event_informer.is_running and self.event_informer.has_synced
+
+    def is_watching(self, namespace: str) -> bool:
+        """
+        Check the store is ready and holds the events of a namespace
+        :param namespace: (str) The namespace
+        :return: (bool) True if events of the namespace can be looked up in the store otherwise False
+        """
+        return self.namespace in (None, namespace) and self.is_ready
+
+    def get_events(self, kind: str, name: str, namespace: Optional[str] = None) -> List[dict]:
+        """
+        Get the events of an object
+        :param kind: (str) Kind of the involved object i.e. DeploymentConfig
+        :param name: (str) Name of the involved object
+        :param namespace: (optional | str) Namespace of the involved object. Defaults to the watched namespace
+        :return: (list) Events in dict form
+        """
+        return self.event_informer.by_index("involved_object", owner_key(namespace or self.namespace, kind, name))
+
+
 class OcpEvents(OcpBase):
     """
     OcpEvents Class extends OcpBase and encapsulates all methods
@@ -31,48 +123,64 @@ class OcpEvents(OcpBase):
         self.kind = "Event"
         self.ocp_events = self.dyn_client.resources.get(api_version=self.api_version, kind=self.kind)
 
-    def list_dc_events_in_a_namespace(self, namespace, dc):
+    def _list_object_events(
+        self, namespace: str, kind: str, name: str, event_store: Optional[OcpEventStore] = None
+    ) -> list:
+        """
+        List the events of an object, from the event store if it is watching the namespace
+        otherwise with a field selector on the server. Raises ApiException on failure.
+        """
+        if event_store is not None and event_store.is_watching(namespace):
+            return [
+                ResourceInstance(self.ocp_events.client, event).attributes
+                for event in event_store.get_events(kind, name, namespace=namespace)
+            ]
+        api_response = self.ocp_events.get(
+            namespace=namespace, field_selector=involved_object_field_selector(kind, name)
+        )
+        return api_response.items
+
+    def list_dc_events_in_a_namespace(self, namespace, dc, event_store: Optional[OcpEventStore] = None):
         """
         Method that lists the events for a deploymentconfig in a specific namespace
         :param namespace: The namespace where the targeted dc resides
         :param dc: The Deployment Config whose pods we want to retrieve
                    events for.
+        :param event_store: (optional | OcpEventStore) A started event store of the namespace to
+                            look events up in instead of listing them
         :return: A list of objects of type V1Event on success. None on failure.
         """
-        api_response = None
         dc_events = None
         try:
-            api_response = self.ocp_events.get(namespace=namespace)
+            dc_events = self._list_object_events(namespace, "DeploymentConfig", dc, event_store=event_store)
         except ApiException as e:
             logger.error("Exception while getting dc events: %s\n", e)
-        if api_response:
-            dc_events = [
-                ev
-                for ev in api_response.items
-                if (ev.involvedObject.kind == "DeploymentConfig" and ev.involvedObject.name == dc)
-            ]
         return dc_events
 
-    def list_pod_events_in_a_namespace(self, namespace, dc):
+    def list_pod_events_in_a_namespace(self, namespace, dc, event_store: Optional[OcpEventStore] = None):
         """
         Method that lists the events for pods belonging to a specific
         deploymentconfig in a specific namespace
         :param namespace: The namespace where the targeted dc resides
         :param dc: The Deployment Config whose pods we want to retrieve
                    events for.
+        :param event_store: (optional | OcpEventStore) A started event store of the namespace to
+                            look events up in instead of listing them
         :return: A list of objects of type V1Event on success. None on failure.
         """
-        api_response = None
         pod_events = None
         try:
             pods_in_dc = self.ocp_pod_obj.list_pods_in_a_deployment(namespace, dc)
-            api_response = self.ocp_events.get(namespace=namespace)
+            if pods_in_dc is not None and event_store is not None and event_store.is_watching(namespace):
+                pod_events = list()
+                for pod in pods_in_dc:
+                    pod_events.extend(self._list_object_events(namespace, "Pod", pod, event_store=event_store))
+            elif pods_in_dc is not None:
+                # A single request for the events of all pods of the namespace instead of one per pod
+                pod_names = set(pods_in_dc)
+                api_response = self.ocp_events.get(namespace=namespace, field_selector="involvedObject.kind=Pod")
+                pod_events = [event for event in api_response.items if event.involvedObject.name in pod_names]
         except ApiException as e:
             logger.error("Exception while getting pod events: %s\n", e)
-        if api_response:
-            pod_events = [
-                ev
-                for ev in api_response.items
-                if (ev.involvedObject.kind == "Pod" and ev.involvedObject.name in pods_in_dc)
-            ]
+            pod_events = None
         return pod_events
@@ -1,5 +1,6 @@
 import logging
-from typing import Tuple
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import warnings
 
 import requests
@@ -8,19 +9,40 @@ from urllib3.exceptions import InsecureRequestWarning
 from piqe_ocp_lib import __loggername__
 from piqe_ocp_lib.api.resources.ocp_base import OcpBase
 from piqe_ocp_lib.api.resources.ocp_cluster_operators import OcpClusterOperator
+from piqe_ocp_lib.api.resources.ocp_cluster_snapshot import OcpClusterSnapshot
 from piqe_ocp_lib.api.resources.ocp_cluster_versions import OcpClusterVersion
 from piqe_ocp_lib.api.resources.ocp_configs import OcpConfig
 from piqe_ocp_lib.api.resources.ocp_control_planes import OcpControlPlane
 from piqe_ocp_lib.api.resources.ocp_deploymentconfigs import OcpDeploymentconfigs
+from piqe_ocp_lib.api.resources.ocp_health_report import ApiRequestTracker, HealthCheckResult, HealthReport
 from piqe_ocp_lib.api.resources.ocp_nodes import OcpNodes
 from piqe_ocp_lib.api.resources.ocp_pods import OcpPods
 from piqe_ocp_lib.api.resources.ocp_routes import OcpRoutes
 from piqe_ocp_lib.api.resources.ocp_secrets import OcpSecret
+from piqe_ocp_lib.api.resources.ocp_tokens import OcpTokenProvider
 
 warnings.simplefilter("ignore", InsecureRequestWarning)
 
 logger = logging.getLogger(__loggername__)
 
+# Health checks which can be evaluated against an OcpClusterSnapshot
+SNAPSHOT_HEALTH_CHECKS = (
+    "node_health",
+    "master_nodes_health",
+    "worker_nodes_health",
+    "router_health",
+    "image_registry_health",
+    "cluster_version_operator_health",
+    "cluster_operators_health",
+)
+
+HEALTH_REPORT_CHECKS = SNAPSHOT_HEALTH_CHECKS + (
+    "persistence_storage_for_image_registry",
+    "api_server_health",
+    "web_console_health",
+    "control_plane_status",
+)
+
 
 class OcpHealthChecker(OcpBase):
     """
@@ -55,8 +77,29 @@ class OcpHealthChecker(OcpBase):
             kind="Config", api_version="imageregistry.operator.openshift.io/v1", kube_config_file=self.kube_config_file
         )
         self.ocp_secret = OcpSecret(kube_config_file=self.kube_config_file)
+        self.token_provider = OcpTokenProvider(kube_config_file=self.kube_config_file)
+        self._request_tracker: Optional[ApiRequestTracker] = None
+
+    def _get_url(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET an url with the requests module and record the response in the active request tracker, if any
+        """
+        response = requests.get(url, **kwargs)
+        if self._request_tracker is not None:
+            self._request_tracker.record_http_response(response)
+        return response
+
+    def take_snapshot(self, components: Optional[Iterable[str]] = None) -> OcpClusterSnapshot:
+        """
+        Gather nodes, router and image registry pods and deployments, cluster operators and cluster version
+        in one concurrent pass. Health checks evaluated against the returned snapshot don't make any further
+        API request.
+        :param components: (optional | list) Snapshot components to be gathered. Defaults to all components
+        :return: OcpClusterSnapshot object
+        """
+        return OcpClusterSnapshot(kube_config_file=self.kube_config_file).capture(components=components)
 
-    def check_node_health(self):
+    def check_node_health(self, snapshot: Optional[OcpClusterSnapshot] = None) -> Tuple[bool, dict]:
         """
         Check health of each cluster node
         Methods checks for:
@@ -64,40 +107,14 @@ class OcpHealthChecker(OcpBase):
             - MemoryPressure: All have sufficient memory
             - PIDPressure: All have sufficient number processes are running
             - If ALL above is False and NodeReadyStatus is True, then node is in ready(healthy) state
+        :param snapshot: (optional | OcpClusterSnapshot) Snapshot to evaluate. A new one is taken if not provided
         :return: Return tuple of all_nodes_healthy(boolean) and node_health_info(dict of node name and failure reason)
         """
         logger.info("Checking all cluster nodes health")
-        unhealthy_node_info = dict()
-        all_nodes_healthy = False
-        individual_node_health_status_list = list()
-        node_list_info = self.ocp_node.get_all_nodes()
-        if node_list_info:
-            for node_info in node_list_info.items:
-                temp_list = list()
-                for condition in node_info.status.conditions:
-                    if condition["type"] == "Ready":
-                        individual_node_health_status_list.append(condition["status"])
-                    if condition["type"] == "Ready" and condition["status"] != "True":
-                        temp_list.append({"NodeReadyStatus": condition["status"]})
-                    elif condition["type"] == "MemoryPressure" and condition["status"] == "True":
-                        temp_list.append({"MemoryPressure": "The node memory is low"})
-                    elif condition["type"] == "DiskPressure" and condition["status"] == "True":
-                        temp_list.append({"DiskPressure": "The disk capacity is low"})
-                    elif condition["type"] == "PIDPressure" and condition["status"] == "True":
-                        temp_list.append({"PIDPressure": "There are too many processes on the node"})
-
-                unhealthy_node_info[node_info["metadata"]["name"]] = temp_list
-
-        logger.info("Check overall health of cluster nodes by checking each node health")
-        if (
-            len(set(individual_node_health_status_list)) == 1
-            and list(set(individual_node_health_status_list))[0] == "True"
-        ):
-            all_nodes_healthy = True
-
-        return all_nodes_healthy, unhealthy_node_info
-
-    def check_master_nodes_health(self) -> Tuple[bool, dict]:
+        snapshot = snapshot or self.take_snapshot(components=["nodes"])
+        return snapshot.check_nodes_health()
+
+    def check_master_nodes_health(self, snapshot: Optional[OcpClusterSnapshot] = None) -> Tuple[bool, dict]:
         """
         Check health of each master node
         Methods checks for:
@@ -105,41 +122,15 @@ class OcpHealthChecker(OcpBase):
             - MemoryPressure: All have sufficient memory
             - PIDPressure: All have sufficient number processes are running
             - If ALL above is False and NodeReadyStatus is True, then node is in ready(healthy) state
+        :param snapshot: (optional | OcpClusterSnapshot) Snapshot to evaluate. A new one is taken if not provided
         :return: Return tuple of all_master_nodes_healthy(boolean) and
         node_health_info(dict of node name and failure reason)
         """
         logger.info("Checking master nodes health")
-        unhealthy_node_info = dict()
-        all_master_nodes_healthy = False
-        individual_node_health_status_list = list()
-        node_list_info = self.ocp_node.get_master_nodes()
-        if node_list_info:
-            for node_info in node_list_info.items:
-                temp_list = list()
-                for condition in node_info.status.conditions:
-                    if condition["type"] == "Ready":
-                        individual_node_health_status_list.append(condition["status"])
-                    if condition["type"] == "Ready" and condition["status"] != "True":
-                        temp_list.append({"NodeReadyStatus": condition["status"]})
-                    elif condition["type"] == "MemoryPressure" and condition["status"] == "True":
-                        temp_list.append({"MemoryPressure": "The node memory is low"})
-                    elif condition["type"] == "DiskPressure" and condition["status"] == "True":
-                        temp_list.append({"DiskPressure": "The disk capacity is low"})
-                    elif condition["type"] == "PIDPressure" and condition["status"] == "True":
-                        temp_list.append({"PIDPressure": "There are too many processes on the node"})
-
-                unhealthy_node_info[node_info["metadata"]["name"]] = temp_list
-
-        logger.info("Check overall health of master nodes by checking each node health")
-        if (
-            len(set(individual_node_health_status_list)) == 1
-            and list(set(individual_node_health_status_list))[0] == "True"
-        ):
-            all_master_nodes_healthy = True
-
-        return all_master_nodes_healthy, unhealthy_node_info
-
-    def check_worker_nodes_health(self) -> Tuple[bool, dict]:
+        snapshot = snapshot or self.take_snapshot(components=["nodes"])
+        return snapshot.check_nodes_health(role="master")
+
+    def check_worker_nodes_health(self, snapshot: Optional[OcpClusterSnapshot] = None) -> Tuple[bool, dict]:
         """
         Check health of each worker nodes
         Methods checks for:
@@ -147,157 +138,40 @@ class OcpHealthChecker(OcpBase):
             - MemoryPressure: All have sufficient memory
             - PIDPressure: All have sufficient number processes are running
             - If ALL above is False and NodeReadyStatus is True, then node is in ready(healthy) state
+        :param snapshot: (optional | OcpClusterSnapshot) Snapshot to evaluate. A new one is taken if not provided
         :return: Return tuple of all_worker_nodes_healthy(boolean) and
         node_health_info(dict of node name and failure reason)
         """
         logger.info("Checking all worker nodes health")
-        unhealthy_node_info = dict()
-        all_worker_nodes_healthy = False
-        individual_node_health_status_list = list()
-        node_list_info = self.ocp_node.get_worker_nodes()
-        if node_list_info:
-            for node_info in node_list_info.items:
-                temp_list = list()
-                for condition in node_info.status.conditions:
-                    if condition["type"] == "Ready":
-                        individual_node_health_status_list.append(condition["status"])
-                    if condition["type"] == "Ready" and condition["status"] != "True":
-                        temp_list.append({"NodeReadyStatus": condition["status"]})
-                    elif condition["type"] == "MemoryPressure" and condition["status"] == "True":
-                        temp_list.append({"MemoryPressure": "The node memory is low"})
-                    elif condition["type"] == "DiskPressure" and condition["status"] == "True":
-                        temp_list.append({"DiskPressure": "The disk capacity is low"})
-                    elif condition["type"] == "PIDPressure" and condition["status"] == "True":
-                        temp_list.append({"PIDPressure": "There are too many processes on the node"})
-
-                unhealthy_node_info[node_info["metadata"]["name"]] = temp_list
-
-        logger.info("Check overall health of worker nodes by checking each node health")
-        if (
-            len(set(individual_node_health_status_list)) == 1
-            and list(set(individual_node_health_status_list))[0] == "True"
-        ):
-            all_worker_nodes_healthy = True
-
-        return all_worker_nodes_healthy, unhealthy_node_info
-
-    def check_router_health(self):
+        snapshot = snapshot or self.take_snapshot(components=["nodes"])
+        return snapshot.check_nodes_health(role="worker")
+
+    def check_router_health(self, snapshot: Optional[OcpClusterSnapshot] = None) -> Tuple[bool, dict]:
         """
         Check openshift router health
         - Check if router pod is running fine in openshift-ingress namespace
         - Check if deployments of router has matching number of replicas
+        :param snapshot: (optional | OcpClusterSnapshot) Snapshot to evaluate. A new one is taken if not provided
         :return:Return tuple of bool (is_router_healthy) and dict (unhealthy_router_info)
         """
         logger.info("Check the health of openshift router operator pod")
-        is_router_healthy = False
-        unhealthy_router_info = dict()
-        is_router_pod_healthy = False
-        is_replicas_count_matching = False
-        unhealthy_pods = dict()
-        pods_response = self.ocp_pod.list_pods_in_a_namespace(namespace="openshift-ingress")
-        for pod in pods_response.items:
-            for condition in pod["status"]["conditions"]:
-                if condition["type"] == "Ready" and condition["status"] == "False":
-                    unhealthy_pods[pod["metadata"]["name"]] = condition["status"]
-
-        if len(unhealthy_pods.values()) == 0:
-            is_router_pod_healthy = True
-        # Get unhealthy pod names
-        unhealthy_pod_names = list()
-        for key, value in unhealthy_pods.items():
-            unhealthy_pod_names.append(key)
-        unhealthy_router_info.update({"router_pod": unhealthy_pod_names})
-        logger.info("Is router pod/s healthy : %s", is_router_pod_healthy)
-
-        logger.info("Check replicas count of openshift router deployment are matching")
-        deployment_response = self.ocp_deployment.list_all_deployments_in_a_namespace(namespace="openshift-ingress")
-        for deployment in deployment_response.items:
-            if deployment.metadata.name == "router-default":
-                replicas = deployment.status.replicas
-                available_replicas = deployment.status.availableReplicas
-                ready_replicas = deployment.status.readyReplicas
-        if replicas == available_replicas == ready_replicas:
-            is_replicas_count_matching = True
-        # If replicas count doesn't match, add them into unhealthy component list
-        if not is_replicas_count_matching:
-            unhealthy_router_info.update({"router_replicas": is_replicas_count_matching})
-        logger.info("Is router deployment replicas count matching : %s", is_replicas_count_matching)
-
-        logger.info("Check overall health of router operator")
-        if is_router_pod_healthy and is_replicas_count_matching:
-            is_router_healthy = True
-
-        return is_router_healthy, unhealthy_router_info
-
-        logger.info("Check overall health of router operator")
-        if is_router_pod_healthy and is_replicas_count_matching:
-            is_router_healthy = True
-
+        snapshot = snapshot or self.take_snapshot(components=["pods", "deployments"])
+        is_router_healthy, unhealthy_router_info = snapshot.check_router_health()
+        logger.info("Is router healthy : %s", is_router_healthy)
         return is_router_healthy, unhealthy_router_info
 
-    def check_image_registry_health(self):
+    def check_image_registry_health(self, snapshot: Optional[OcpClusterSnapshot] = None) -> Tuple[bool, dict]:
         """
         Check openshift cluster image registry
         - Check if image registry pod is running fine in openshift-image-registry namespace
         - Check if deployments of image registry has matching number of replicas
-        :return:
+        :param snapshot: (optional | OcpClusterSnapshot) Snapshot to evaluate. A new one is taken if not provided
+        :return: Return tuple of bool (is_image_registry_healthy) and dict (unhealthy_image_registry_info)
         """
         logger.info("Check health of openshift image registry pods")
-        is_image_registry_healthy = False
-        unhealthy_image_registry_info = dict()
-        is_image_registry_pods_healthy = False
-        unhealthy_pods = dict()
-        pods_response = self.ocp_pod.list_pods_in_a_namespace(namespace="openshift-image-registry")
-        for pod in pods_response.items:
-            if "cluster-image-registry-operator" in pod.metadata.name or "image-registry" in pod.metadata.name:
-                for condition in pod["status"]["conditions"]:
-                    if condition["type"] == "Ready" and condition["status"] == "False":
-                        unhealthy_pods[pod["metadata"]["name"]] = condition["status"]
-
-        if len(unhealthy_pods.values()) == 0:
-            is_image_registry_pods_healthy = True
-        # Get unhealthy pod names
-        unhealthy_pod_names = list()
-        for key, value in unhealthy_pods.items():
-            unhealthy_pod_names.append(key)
-        unhealthy_image_registry_info.update({"image_registry_pod": unhealthy_pod_names})
-        logger.info("Is image registry pod/s healthy : %s", is_image_registry_pods_healthy)
-
-        logger.info("Check replicas count of openshift image registry deployment are matching")
-        is_replicas_count_matching = False
-        replica_count_dict = dict()
-        deployment_response = self.ocp_deployment.list_all_deployments_in_a_namespace(
-            namespace="openshift-image-registry"
-        )
-        for deployment in deployment_response.items:
-            if (
-                deployment.metadata.name == "cluster-image-registry-operator"
-                or deployment.metadata.name == "image-registry"
-            ):
-                replicas = deployment.status.replicas
-                available_replicas = deployment.status.availableReplicas
-                ready_replicas = deployment.status.readyReplicas
-
-            if replicas == available_replicas == ready_replicas:
-                is_replicas_count_matching_for_each_image_registry = True
-            replica_count_dict[deployment.metadata.name] = is_replicas_count_matching_for_each_image_registry
-            logger.info(
-                "Is replicas count for %s matching? : %s",
-                deployment.metadata.name,
-                is_replicas_count_matching_for_each_image_registry,
-            )
-
-        if all(val for val in replica_count_dict.values()):
-            is_replicas_count_matching = True
-        # If replicas count doesn't match, add them into unhealthy component list
-        if not is_replicas_count_matching:
-            unhealthy_image_registry_info.update({"image_registry_replicas": is_replicas_count_matching})
-        logger.info("Is replicas count matching for all image registry deployment : %s", is_replicas_count_matching)
-
-        logger.info("Check overall health of image registry operator by checking pod/s status and replicas count match")
-        if is_image_registry_pods_healthy and is_replicas_count_matching:
-            is_image_registry_healthy = True
-
+        snapshot = snapshot or self.take_snapshot(components=["pods", "deployments"])
+        is_image_registry_healthy, unhealthy_image_registry_info = snapshot.check_image_registry_health()
+        logger.info("Is image registry healthy : %s", is_image_registry_healthy)
         return is_image_registry_healthy, unhealthy_image_registry_info
 
     def check_persistence_storage_for_image_registry(self):
@@ -346,13 +220,13 @@ class OcpHealthChecker(OcpBase):
         api_server_url = kubeconfig_data["api_server_url"]
         final_api_server_url = api_server_url + "/healthz"
         logger.info("API Server URL : %s", final_api_server_url)
-        bearer_token = self.ocp_secret.get_long_live_bearer_token()
+        bearer_token = self.token_provider.get_token()
         headers = {"Authorization": "Bearer " + bearer_token}
 
         # Suppress only the single warning from urllib3 needed.
         requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
 
-        api_server_response = requests.get(final_api_server_url, headers=headers, verify=False)
+        api_server_response = self._get_url(final_api_server_url, headers=headers, verify=False)
         logger.info("API Server Status Code : %s", api_server_response.status_code)
         status_codes["api_server_status"] = api_server_response.status_code
 
@@ -378,7 +252,7 @@ class OcpHealthChecker(OcpBase):
         # Suppress only the single warning from urllib3 needed.
         requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
 
-        web_console_response = requests.get(web_console_url, verify=False)
+        web_console_response = self._get_url(web_console_url, verify=False)
         logger.info("Web Console Status Code : %s", web_console_response.status_code)
         status_codes["web_console_status"] = web_console_response.status_code
 
@@ -388,22 +262,15 @@ class OcpHealthChecker(OcpBase):
 
         return is_web_console_healthy
 
-    def check_cluster_version_operator_health(self):
+    def check_cluster_version_operator_health(self, snapshot: Optional[OcpClusterSnapshot] = None) -> bool:
         """
         Check ClusterVersion operator health
-        :return: (boolean) Return
+        :param snapshot: (optional | OcpClusterSnapshot) Snapshot to evaluate. A new one is taken if not provided
+        :return: (boolean) Return True if ClusterVersion operator is not progressing otherwise False
         """
         logger.info("Check health of ClusterVersion operator")
-        is_cluster_version_operator_healthy = True
-
-        cluster_version_response = self.ocp_cluster_version.get_cluster_version()
-        if cluster_version_response["metadata"]["name"] == "version":
-            for condition in cluster_version_response["status"]["conditions"]:
-                logger.info("iteration one")
-                if condition["type"] == "Progressing" and condition["status"] == "True":
-                    is_cluster_version_operator_healthy = False
-
-        return is_cluster_version_operator_healthy
+        snapshot = snapshot or self.take_snapshot(components=["cluster_version"])
+        return snapshot.check_cluster_version_operator_health()
 
     def check_control_plane_status(self):
         """
@@ -428,24 +295,101 @@ class OcpHealthChecker(OcpBase):
 
         return all_control_plane_components_healthy, unhealthy_components_list
 
-    def check_cluster_operators_health(self):
+    def check_cluster_operators_health(self, snapshot: Optional[OcpClusterSnapshot] = None) -> Tuple[bool, list]:
         """
         Check health of cluster operator
         Command : "oc get co OR oc get clusteroperator"
+        :param snapshot: (optional | OcpClusterSnapshot) Snapshot to evaluate. A new one is taken if not provided
         :return: (tuple) Return overall health of cluster operator (boolean) and list of unhealthy operator if any
         """
         logger.info("Checking all cluster operators health")
-        all_cluster_operators_healthy = False
-        unhealthy_operators_list = list()
-        cluster_operators = self.ocp_cluster_operator.get_all_cluster_operators()
-        if cluster_operators:
-            for cluster_operator in cluster_operators.items:
-                for condition in cluster_operator.status.conditions:
-                    if condition["type"] == "Available" and condition["status"] == "False":
-                        unhealthy_operators_list.append(cluster_operator["metadata"]["name"])
-
-        # Set cluster operator health status by checking all operator are health
-        if len(unhealthy_operators_list) == 0:
-            all_cluster_operators_healthy = True
-
-        return all_cluster_operators_healthy, unhealthy_operators_list
+        snapshot = snapshot or self.take_snapshot(components=["cluster_operators"])
+        return snapshot.check_cluster_operators_health()
+
+    def check_cluster_health(self, snapshot: Optional[OcpClusterSnapshot] = None) -> Dict[str, Any]:
+        """
+        Check health of nodes, router, image registry, cluster version and cluster operators against a
+        single cluster snapshot. A full report costs one snapshot, i.e. a handful of concurrent list requests.
+        :param snapshot: (optional | OcpClusterSnapshot) Snapshot to evaluate. A new one is taken if not provided
+        :return: (dict) Result of every check keyed by check name
+        """
+        snapshot = snapshot or self.take_snapshot()
+        return {
+            "node_health": self.check_node_health(snapshot=snapshot),
+            "master_nodes_health": self.check_master_nodes_health(snapshot=snapshot),
+            "worker_nodes_health": self.check_worker_nodes_health(snapshot=snapshot),
+            "router_health": self.check_router_health(snapshot=snapshot),
+            "image_registry_health": self.check_image_registry_health(snapshot=snapshot),
+            "cluster_version_operator_health": self.check_cluster_version_operator_health(snapshot=snapshot),
+            "cluster_operators_health": self.check_cluster_operators_health(snapshot=snapshot),
+        }
+
+    def _run_tracked(self, check_name: str, check, **kwargs) -> Tuple[HealthCheckResult, Any]:
+        """
+        Run a single health check while tracking its duration, requests and response bytes
+        :return: Tuple of HealthCheckResult and the value returned by the check (None on error)
+        """
+        return_value, error = None, None
+        with ApiRequestTracker(self.k8s_client) as tracker:
+            self._request_tracker = tracker
+            start_time = time.perf_counter()
+            try:
+                return_value = check(**kwargs)
+            except Exception as e:
+                logger.exception("Health check %s failed: %s", check_name, e)
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                duration = time.perf_counter() - start_time
+                self._request_tracker = None
+        # Checks return either the overall health or a tuple of overall health and unhealthy components
+        if isinstance(return_value, tuple):
+            healthy, unhealthy_components = return_value
+        else:
+            healthy, unhealthy_components = return_value, None
+        result = HealthCheckResult(
+            name=check_name,
+            healthy=bool(healthy) and error is None,
+            unhealthy_components=unhealthy_components,
+            duration=duration,
+            request_count=tracker.request_count,
+            response_bytes=tracker.response_bytes,
+            error=error,
+        )
+        return result, return_value
+
+    def run_health_report(self, checks: Optional[List[str]] = None, use_snapshot: bool = True) -> HealthReport:
+        """
+        Run health checks and collect a HealthReport with result, unhealthy components, duration, request count
+        and response bytes of every check. The report can be serialized to JSON or JUnit XML.
+        :param checks: (optional | list) Names of the checks to run, see HEALTH_REPORT_CHECKS. Defaults to all checks
+        :param use_snapshot: (bool) Evaluate snapshot capable checks against a single snapshot. The snapshot is
+                             reported as its own "cluster_snapshot" entry and the checks evaluated against it don't
+                             make any request. If False, every check gathers its own data, so per check timing
+                             includes the API requests.
+        :return: HealthReport object
+        """
+        checks = list(checks or HEALTH_REPORT_CHECKS)
+        unknown_checks = set(checks) - set(HEALTH_REPORT_CHECKS)
+        if unknown_checks:
+            raise ValueError(f"Unknown health checks : {sorted(unknown_checks)}")
+        report = HealthReport(cluster=self.k8s_client.configuration.host)
+        snapshot = None
+        if use_snapshot and any(check_name in SNAPSHOT_HEALTH_CHECKS for check_name in checks):
+            snapshot_result, snapshot = self._run_tracked("cluster_snapshot", self.take_snapshot)
+            report.add_result(snapshot_result._replace(healthy=snapshot_result.error is None))
+        for check_name in checks:
+            check = getattr(self, f"check_{check_name}")
+            if check_name in SNAPSHOT_HEALTH_CHECKS and snapshot is not None:
+                result, _ = self._run_tracked(check_name, check, snapshot=snapshot)
+            else:
+                result, _ = self._run_tracked(check_name, check)
+            report.add_result(result)
+        logger.info(
+            "Health report : healthy %s, %s checks in %.3fs, %s requests, %s bytes",
+            report.is_healthy,
+            len(report.results),
+            report.duration,
+            report.request_count,
+            report.response_bytes,
+        )
+        return report
@@ -0,0 +1,261 @@
+from collections import deque, namedtuple
+import logging
+from threading import RLock
+import time
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+from piqe_ocp_lib.api.resources.ocp_cluster_snapshot import (
+    IMAGE_REGISTRY_DEPLOYMENTS,
+    IMAGE_REGISTRY_NAMESPACE,
+    MASTER_NODE_ROLE_LABEL,
+    ROUTER_DEPLOYMENTS,
+    ROUTER_NAMESPACE,
+    WORKER_NODE_ROLE_LABEL,
+    are_deployment_replicas_matching,
+    evaluate_node_conditions,
+    is_cluster_operator_available,
+    is_cluster_version_progressing,
+    is_node_ready,
+)
+from piqe_ocp_lib.api.resources.ocp_informer import DELETED, OcpInformer
+
+logger = logging.getLogger(__loggername__)
+
+HealthTransition = namedtuple("HealthTransition", ["timestamp", "component", "name", "healthy", "details"])
+
+HEALTH_MONITOR_COMPONENTS = (
+    "nodes",
+    "master_nodes",
+    "worker_nodes",
+    "router",
+    "image_registry",
+    "cluster_version_operator",
+    "cluster_operators",
+)
+
+
+class OcpHealthMonitor(OcpBase):
+    """
+    OcpHealthMonitor Class extends OcpBase and continuously tracks the health of critical openshift
+    components for long running (soak) tests. It keeps watches on:
+    - Nodes
+    - Cluster Operators
+    - Cluster Version
+    - Router and Image Registry deployments
+
+    Health state is updated incrementally on every watch event, so health queries are lookups against
+    in-memory state and don't make any API request. Every change of health of a watched object is
+    recorded in a timeline of transitions.
+    :param kube_config_file: A kubernetes config file.
+    :param timeline_size: (int) Max number of transitions kept in the timeline
+    :param watch_timeout: (int) Server side timeout of a single watch request in seconds
+    :return: None
+    """
+
+    def __init__(self, kube_config_file=None, timeline_size: int = 10000, watch_timeout: int = 60):
+        super().__init__(kube_config_file=kube_config_file)
+        self._lock = RLock()
+        # component -> object name -> (healthy, details)
+        self._state: Dict[str, Dict[str, Tuple[bool, object]]] = {
+            component: dict() for component in HEALTH_MONITOR_COMPONENTS
+        }
+        self.timeline: Deque[HealthTransition] = deque(maxlen=timeline_size)
+        self._transition_handlers: List[Callable[[HealthTransition], None]] = list()
+        self.started_at: Optional[float] = None
+
+        self.node_informer = OcpInformer(
+            api_version="v1", kind="Node", watch_timeout=watch_timeout, kube_config_file=self.kube_config_file
+        )
+        self.cluster_operator_informer = OcpInformer(
+            api_version="config.openshift.io/v1",
+            kind="ClusterOperator",
+            watch_timeout=watch_timeout,
+            kube_config_file=self.kube_config_file,
+        )
+        self.cluster_version_informer = OcpInformer(
+            api_version="config.openshift.io/v1",
+            kind="ClusterVersion",
+            watch_timeout=watch_timeout,
+            kube_config_file=self.kube_config_file,
+        )
+        self.router_informer = OcpInformer(
+            api_version="apps/v1",
+            kind="Deployment",
+            namespace=ROUTER_NAMESPACE,
+            watch_timeout=watch_timeout,
+            kube_config_file=self.kube_config_file,
+        )
+        self.image_registry_informer = OcpInformer(
+            api_version="apps/v1",
+            kind="Deployment",
+            namespace=IMAGE_REGISTRY_NAMESPACE,
+            watch_timeout=watch_timeout,
+            kube_config_file=self.kube_config_file,
+        )
+        self.node_informer.add_event_handler(self._on_node_event)
+        self.cluster_operator_informer.add_event_handler(self._on_cluster_operator_event)
+        self.cluster_version_informer.add_event_handler(self._on_cluster_version_event)
+        self.router_informer.add_event_handler(self._on_router_event)
+        self.image_registry_informer.add_event_handler(self._on_image_registry_event)
+
+    @property
+    def informers(self) -> List[OcpInformer]:
+        return [
+            self.node_informer,
+            self.cluster_operator_informer,
+            self.cluster_version_informer,
+            self.router_informer,
+            self.image_registry_informer,
+        ]
+
+    def add_transition_handler(self, handler: Callable[[HealthTransition], None]):
+        """
+        Register a handler called with every HealthTransition as soon as it is recorded,
+        i.e. to detect degradations within seconds.
+        :param handler: (callable) The transition handler
+        :return: None
+        """
+        self._transition_handlers.append(handler)
+
+    def _update(self, component: str, name: str, healthy: Optional[bool], details=None, record: bool = True):
+        """
+        Update health of a single object and record a transition if it changed.
+        A healthy value of None removes the object from the component.
+        """
+        with self._lock:
+            previous = self._state[component].get(name)
+            if healthy is None:
+                if previous is None:
+                    return
+                del self._state[component][name]
+            else:
+                if previous == (healthy, details):
+                    return
+                self._state[component][name] = (healthy, details)
+            if not record:
+                return
+            transition = HealthTransition(time.time(), component, name, healthy, details)
+            self.timeline.append(transition)
+        if previous is not None or healthy is False:
+            logger.info("Health transition of %s %s: %s -> %s %s", component, name, previous, healthy, details or "")
+        for handler in self._transition_handlers:
+            try:
+                handler(transition)
+            except Exception as e:
+                logger.exception("Health transition handler failed: %s", e)
+
+    def _on_node_event(self, event_type: str, node: dict, old_node: Optional[dict]):
+        name = node["metadata"]["name"]
+        labels = node["metadata"].get("labels") or {}
+        healthy = None if event_type == DELETED else is_node_ready(node)
+        details = None if event_type == DELETED else evaluate_node_conditions(node)
+        self._update("nodes", name, healthy, details)
+        for component, role_label in (
+            ("master_nodes", MASTER_NODE_ROLE_LABEL),
+            ("worker_nodes", WORKER_NODE_ROLE_LABEL),
+        ):
+            # Node transitions are already recorded under the nodes component
+            self._update(component, name, healthy if role_label in labels else None, details, record=False)
+
+    def _on_cluster_operator_event(self, event_type: str, cluster_operator: dict, old_cluster_operator: Optional[dict]):
+        healthy = None if event_type == DELETED else is_cluster_operator_available(cluster_operator)
+        self._update("cluster_operators", cluster_operator["metadata"]["name"], healthy)
+
+    def _on_cluster_version_event(self, event_type: str, cluster_version: dict, old_cluster_version: Optional[dict]):
+        healthy = None if event_type == DELETED else not is_cluster_version_progressing(cluster_version)
+        self._update("cluster_version_operator", cluster_version["metadata"]["name"], healthy)
+
+    def _on_deployment_event(
+        self, component: str, deployment_names: Tuple[str, ...], event_type: str, deployment: dict
+    ):
+        name = deployment["metadata"]["name"]
+        if name not in deployment_names:
+            return
+        # A deleted deployment of a component is unhealthy rather than untracked
+        if event_type == DELETED:
+            self._update(component, name, False, {"deleted": True})
+        else:
+            status = deployment.get("status") or {}
+            replicas = {key: status.get(key) for key in ("replicas", "availableReplicas", "readyReplicas")}
+            self._update(component, name, are_deployment_replicas_matching(deployment), replicas)
+
+    def _on_router_event(self, event_type: str, deployment: dict, old_deployment: Optional[dict]):
+        self._on_deployment_event("router", ROUTER_DEPLOYMENTS, event_type, deployment)
+
+    def _on_image_registry_event(self, event_type: str, deployment: dict, old_deployment: Optional[dict]):
+        self._on_deployment_event("image_registry", IMAGE_REGISTRY_DEPLOYMENTS, event_type, deployment)
+
+    def start(self, timeout: int = 60) -> bool:
+        """
+        Start all watches and wait for the initial state to be populated
+        :param timeout: (int) Time limit in seconds to wait for the initial state of every watch
+        :return: (bool) True if all watches are synced otherwise False
+        """
+        self.started_at = time.time()
+        for informer in self.informers:
+            informer.start(wait_for_sync=False)
+        is_synced = all(informer.wait_for_sync(timeout=timeout) for informer in self.informers)
+        logger.info("Health monitor started. Initial state synced : %s", is_synced)
+        return is_synced
+
+    def stop(self, timeout: Optional[int] = None):
+        """
+        Stop all watches
+        :param timeout: (optional | int) Time limit in seconds to wait for each watch thread to finish
+        :return: None
+        """
+        for informer in self.informers:
+            informer.stop(timeout=timeout)
+        logger.info("Health monitor stopped")
+
+    @property
+    def is_running(self) -> bool:
+        return all(informer.is_running for informer in self.informers)
+
+    def get_component_health(self, component: str) -> Tuple[bool, dict]:
+        """
+        Get current health of a component from in-memory state
+        :param component: (str) One of HEALTH_MONITOR_COMPONENTS
+        :return: Return tuple of overall health of the component (bool) and dict of unhealthy
+                 object names and their failure details
+        """
+        with self._lock:
+            objects = self._state[component]
+            unhealthy = {name: details for name, (healthy, details) in objects.items() if not healthy}
+            return bool(objects) and not unhealthy, unhealthy
+
+    def get_health_state(self) -> Dict[str, Tuple[bool, dict]]:
+        """
+        Get current health of every monitored component from in-memory state
+        :return: (dict) Health of every component keyed by component name
+        """
+        return {component: self.get_component_health(component) for component in HEALTH_MONITOR_COMPONENTS}
+
+    def is_cluster_healthy(self) -> bool:
+        """
+        Check that every monitored component is currently healthy
+        :return: (bool) True if all components are healthy otherwise False
+        """
+        return all(healthy for healthy, _ in self.get_health_state().values())
+
+    def get_transitions(
+        self, component: Optional[str] = None, since: Optional[float] = None, unhealthy_only: bool = False
+    ) -> List[HealthTransition]:
+        """
+        Get recorded health transitions
+        :param component: (optional | str) Only return transitions of this component
+        :param since: (optional | float) Only return transitions recorded after this epoch timestamp
+        :param unhealthy_only: (bool) Only return transitions to an unhealthy state
+        :return: (list) List of HealthTransition ordered by time
+        """
+        with self._lock:
+            transitions = list(self.timeline)
+        return [
+            transition
+            for transition in transitions
+            if (component is None or transition.component == component)
+            and (since is None or transition.timestamp > since)
+            and (not unhealthy_only or transition.healthy is False)
+        ]
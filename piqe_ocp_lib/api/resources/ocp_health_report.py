@@ -0,0 +1,202 @@
+from collections import namedtuple
+from datetime import datetime
+import json
+import logging
+from threading import Lock
+from typing import Dict, List, Optional
+from xml.etree import ElementTree
+
+from kubernetes.client.api_client import ApiClient as K8sClient
+
+from piqe_ocp_lib import __loggername__
+
+logger = logging.getLogger(__loggername__)
+
+HealthCheckResult = namedtuple(
+    "HealthCheckResult",
+    ["name", "healthy", "unhealthy_components", "duration", "request_count", "response_bytes", "error"],
+)
+
+
+class ApiRequestTracker:
+    """
+    Count the requests made, and the response bytes received, through kubernetes api clients while
+    the tracker is active. Requests made outside of the kubernetes clients (i.e. with the requests
+    module) can be added with record_http_response.
+
+    NOTE: Every request going through the tracked clients is counted, including requests made by other
+    threads sharing the same client.
+    :param k8s_clients: kubernetes ApiClient objects to track
+    """
+
+    _lock = Lock()
+
+    def __init__(self, *k8s_clients: K8sClient):
+        self.rest_clients = [k8s_client.rest_client for k8s_client in k8s_clients]
+        self.request_count = 0
+        self._responses: list = list()
+        self._http_response_bytes = 0
+
+    @staticmethod
+    def _install(rest_client):
+        """
+        Wrap the request method of a rest client once, so it reports to all active trackers
+        """
+        if getattr(rest_client, "_active_request_trackers", None) is None:
+            rest_client._active_request_trackers = list()
+            original_request = rest_client.request
+
+            def request(*args, **kwargs):
+                response = original_request(*args, **kwargs)
+                for tracker in list(rest_client._active_request_trackers):
+                    tracker._record_rest_response(response)
+                return response
+
+            rest_client.request = request
+
+    def _record_rest_response(self, response):
+        with ApiRequestTracker._lock:
+            self.request_count += 1
+            self._responses.append(response)
+
+    def record_http_response(self, response):
+        """
+        Record a response obtained with the requests module
+        :param response: requests Response object
+        :return: None
+        """
+        with ApiRequestTracker._lock:
+            self.request_count += 1
+            self._http_response_bytes += len(response.content or b"")
+
+    @property
+    def response_bytes(self) -> int:
+        """
+        Bytes received so far. Response bodies are usually read after the request returns, so bytes are
+        summed from the responses when asked for.
+        :return: (int) Number of response bytes
+        """
+        total_bytes = self._http_response_bytes
+        for response in self._responses:
+            # urllib3 responses report the number of bytes read from the wire with tell()
+            if hasattr(response, "tell"):
+                total_bytes += response.tell()
+            elif getattr(response, "data", None):
+                total_bytes += len(response.data)
+        return total_bytes
+
+    def __enter__(self) -> "ApiRequestTracker":
+        with ApiRequestTracker._lock:
+            for rest_client in self.rest_clients:
+                self._install(rest_client)
+                rest_client._active_request_trackers.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with ApiRequestTracker._lock:
+            for rest_client in self.rest_clients:
+                rest_client._active_request_trackers.remove(self)
+
+
+class HealthReport:
+    """
+    HealthReport holds the result of every health check of a run, along with its duration, request count
+    and response bytes, and serializes them to JSON or JUnit XML so CI can trend health check latency.
+    :param cluster: (str) Cluster identifier, i.e. API server URL
+    :return: None
+    """
+
+    def __init__(self, cluster: str = ""):
+        self.cluster = cluster
+        self.timestamp = datetime.utcnow()
+        self.results: List[HealthCheckResult] = list()
+
+    def add_result(self, result: HealthCheckResult):
+        self.results.append(result)
+
+    @property
+    def is_healthy(self) -> bool:
+        return all(result.healthy for result in self.results)
+
+    @property
+    def duration(self) -> float:
+        return sum(result.duration for result in self.results)
+
+    @property
+    def request_count(self) -> int:
+        return sum(result.request_count for result in self.results)
+
+    @property
+    def response_bytes(self) -> int:
+        return sum(result.response_bytes for result in self.results)
+
+    def get_result(self, name: str) -> Optional[HealthCheckResult]:
+        """
+        Get the result of a health check by name
+        :param name: (str) Name of the health check
+        :return: HealthCheckResult on success OR None if check is not part of the report
+        """
+        return next((result for result in self.results if result.name == name), None)
+
+    def to_dict(self) -> Dict:
+        return {
+            "cluster": self.cluster,
+            "timestamp": self.timestamp.isoformat(),
+            "healthy": self.is_healthy,
+            "duration": self.duration,
+            "request_count": self.request_count,
+            "response_bytes": self.response_bytes,
+            "checks": [result._asdict() for result in self.results],
+        }
+
+    def to_json(self, file_path: Optional[str] = None) -> str:
+        """
+        Serialize the report to JSON
+        :param file_path: (optional | str) Also write the report to this file
+        :return: (str) The report in JSON format
+        """
+        report_json = json.dumps(self.to_dict(), indent=2, default=str)
+        if file_path:
+            with open(file_path, "w") as f:
+                f.write(report_json)
+        return report_json
+
+    def to_junit_xml(self, file_path: Optional[str] = None, suite_name: str = "ocp-health-check") -> str:
+        """
+        Serialize the report to JUnit XML. Every health check is a testcase. Unhealthy checks are
+        reported as failures and checks which raised an exception as errors. Request count and
+        response bytes are reported as testcase properties.
+        :param file_path: (optional | str) Also write the report to this file
+        :param suite_name: (str) Name of the testsuite
+        :return: (str) The report in JUnit XML format
+        """
+        testsuites = ElementTree.Element("testsuites")
+        testsuite = ElementTree.SubElement(
+            testsuites,
+            "testsuite",
+            name=suite_name,
+            tests=str(len(self.results)),
+            failures=str(sum(1 for result in self.results if not result.healthy and not result.error)),
+            errors=str(sum(1 for result in self.results if result.error)),
+            time=f"{self.duration:.3f}",
+            timestamp=self.timestamp.strftime("%Y-%m-%dT%H:%M:%S"),
+            hostname=self.cluster,
+        )
+        for result in self.results:
+            testcase = ElementTree.SubElement(
+                testsuite, "testcase", classname=suite_name, name=result.name, time=f"{result.duration:.3f}"
+            )
+            properties = ElementTree.SubElement(testcase, "properties")
+            ElementTree.SubElement(properties, "property", name="request_count", value=str(result.request_count))
+            ElementTree.SubElement(properties, "property", name="response_bytes", value=str(result.response_bytes))
+            if result.error:
+                error = ElementTree.SubElement(testcase, "error", message=result.error)
+                error.text = result.error
+            elif not result.healthy:
+                failure = ElementTree.SubElement(testcase, "failure", message=f"{result.name} is unhealthy")
+                failure.text = json.dumps(result.unhealthy_components, default=str)
+        report_xml = ElementTree.tostring(testsuites, encoding="unicode")
+        if file_path:
+            with open(file_path, "w") as f:
+                f.write(report_xml)
+        return report_xml
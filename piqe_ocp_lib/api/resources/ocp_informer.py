@@ -0,0 +1,274 @@
+import logging
+from threading import Event, RLock, Thread
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from kubernetes.client.rest import ApiException
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+
+logger = logging.getLogger(__loggername__)
+
+ADDED = "ADDED"
+MODIFIED = "MODIFIED"
+DELETED = "DELETED"
+
+# HTTP 410 Gone is returned when the resourceVersion we watch from is too old
+HTTP_STATUS_GONE = 410
+
+
+def object_key(obj: dict) -> Tuple[Optional[str], str]:
+    """
+    Return the store key of an object
+    :param obj: (dict) Object in dict form
+    :return: (tuple) (namespace, name) of the object. namespace is None for cluster scoped objects
+    """
+    return obj["metadata"].get("namespace"), obj["metadata"]["name"]
+
+
+class OcpInformer(OcpBase):
+    """
+    OcpInformer Class extends OcpBase and keeps a local store of objects of one kind in sync with
+    the cluster. Objects are listed once and then kept up to date with a watch running in a
+    background thread, so lookups against the store don't make any API request.
+
+    Event handlers are called with (event_type, obj, old_obj) for every change applied to the store.
+    Indexers map an object to a list of index keys so objects can be looked up by e.g. node name.
+    :param api_version: (str) api version of the watched kind i.e. v1
+    :param kind: (str) The watched kind i.e. Node
+    :param namespace: (optional | str) Watch objects of a single namespace. Defaults to all namespaces
+    :param label_selector: (optional | str) Only keep objects matching the label selector
+    :param field_selector: (optional | str) Only keep objects matching the field selector
+    :param watch_timeout: (int) Server side timeout of a single watch request in seconds. The watch is
+                          restarted from the last seen resourceVersion when it expires.
+    :param kube_config_file: A kubernetes config file.
+    :return: None
+    """
+
+    def __init__(
+        self,
+        api_version: str,
+        kind: str,
+        namespace: Optional[str] = None,
+        label_selector: Optional[str] = None,
+        field_selector: Optional[str] = None,
+        watch_timeout: int = 60,
+        kube_config_file: Optional[str] = None,
+    ):
+        super().__init__(kube_config_file=kube_config_file)
+        self.api_version = api_version
+        self.kind = kind
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.field_selector = field_selector
+        self.watch_timeout = watch_timeout
+        self.resource = self.dyn_client.resources.get(api_version=self.api_version, kind=self.kind)
+        self.resource_version: Optional[str] = None
+        self._store: Dict[Tuple[Optional[str], str], dict] = dict()
+        self._indexers: Dict[str, Callable[[dict], Iterable[str]]] = dict()
+        self._indices: Dict[str, Dict[str, Set[Tuple[Optional[str], str]]]] = dict()
+        self._handlers: List[Callable[[str, dict, Optional[dict]], None]] = list()
+        self._lock = RLock()
+        self._synced = Event()
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+    def add_event_handler(self, handler: Callable[[str, dict, Optional[dict]], None]):
+        """
+        Register a handler called with (event_type, obj, old_obj) for every change applied to the store.
+        Handlers registered after start are not called for objects already in the store.
+        :param handler: (callable) The event handler
+        :return: None
+        """
+        with self._lock:
+            self._handlers.append(handler)
+
+    def add_indexer(self, index_name: str, index_func: Callable[[dict], Iterable[str]]):
+        """
+        Register an index over the store
+        :param index_name: (str) Name of the index
+        :param index_func: (callable) Function returning the index keys of an object
+        :return: None
+        """
+        with self._lock:
+            self._indexers[index_name] = index_func
+            self._indices[index_name] = dict()
+            for key, obj in self._store.items():
+                self._index_object(index_name, key, obj)
+
+    def _index_object(self, index_name: str, key: Tuple[Optional[str], str], obj: dict):
+        for index_key in self._indexers[index_name](obj) or []:
+            self._indices[index_name].setdefault(index_key, set()).add(key)
+
+    def _unindex_object(self, index_name: str, key: Tuple[Optional[str], str], obj: dict):
+        index = self._indices[index_name]
+        for index_key in self._indexers[index_name](obj) or []:
+            keys = index.get(index_key)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[index_key]
+
+    def _apply(self, event_type: str, obj: dict):
+        """
+        Apply a single event to the store, update indices and call event handlers
+        """
+        key = object_key(obj)
+        with self._lock:
+            old_obj = self._store.get(key)
+            if old_obj is not None:
+                for index_name in self._indexers:
+                    self._unindex_object(index_name, key, old_obj)
+            if event_type == DELETED:
+                self._store.pop(key, None)
+            else:
+                self._store[key] = obj
+                for index_name in self._indexers:
+                    self._index_object(index_name, key, obj)
+            handlers = list(self._handlers)
+        for handler in handlers:
+            try:
+                handler(event_type, obj, old_obj)
+            except Exception as e:
+                logger.exception("%s informer event handler failed: %s", self.kind, e)
+
+    def _relist(self):
+        """
+        List all objects, replace the store content and remember the list resourceVersion to watch from
+        """
+        api_response = self.resource.get(
+            namespace=self.namespace, label_selector=self.label_selector, field_selector=self.field_selector
+        )
+        listed = {object_key(item): item for item in api_response.to_dict().get("items") or []}
+        with self._lock:
+            stale_objects = [obj for key, obj in self._store.items() if key not in listed]
+        for obj in stale_objects:
+            self._apply(DELETED, obj)
+        for key, obj in listed.items():
+            with self._lock:
+                old_obj = self._store.get(key)
+            if old_obj is None:
+                self._apply(ADDED, obj)
+            elif old_obj["metadata"].get("resourceVersion") != obj["metadata"].get("resourceVersion"):
+                self._apply(MODIFIED, obj)
+        self.resource_version = api_response.metadata.resourceVersion
+        self._synced.set()
+        logger.debug(
+            "%s informer listed %s objects at resourceVersion %s", self.kind, len(listed), self.resource_version
+        )
+
+    def relist(self):
+        """
+        List all objects once and replace the store content, i.e. to use the store without watching
+        :return: None
+        """
+        self._relist()
+
+    def _watch(self):
+        """
+        Watch from the last seen resourceVersion until the watch expires or the informer is stopped
+        """
+        for event in self.resource.watch(
+            namespace=self.namespace,
+            label_selector=self.label_selector,
+            field_selector=self.field_selector,
+            resource_version=self.resource_version,
+            timeout=self.watch_timeout,
+        ):
+            if self._stop_event.is_set():
+                return
+            obj = event["raw_object"]
+            if event["type"] in (ADDED, MODIFIED, DELETED):
+                self._apply(event["type"], obj)
+            self.resource_version = obj["metadata"].get("resourceVersion", self.resource_version)
+
+    def _run(self):
+        relist_required = True
+        while not self._stop_event.is_set():
+            try:
+                if relist_required:
+                    self._relist()
+                    relist_required = False
+                self._watch()
+            except ApiException as e:
+                if e.status == HTTP_STATUS_GONE:
+                    logger.info("%s informer resourceVersion %s expired, relisting", self.kind, self.resource_version)
+                else:
+                    logger.error("Exception while watching %s: %s\n", self.kind, e)
+                    self._stop_event.wait(5)
+                relist_required = True
+            except Exception as e:
+                logger.exception("Unexpected exception while watching %s: %s\n", self.kind, e)
+                self._stop_event.wait(5)
+                relist_required = True
+
+    def start(self, wait_for_sync: bool = True, timeout: int = 60) -> bool:
+        """
+        Start the background list/watch thread
+        :param wait_for_sync: (bool) Wait for the initial list to populate the store
+        :param timeout: (int) Time limit in seconds to wait for the initial list
+        :return: (bool) True if the store is synced (or wait_for_sync is False) otherwise False
+        """
+        if self.is_running:
+            return self.has_synced or not wait_for_sync
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name=f"Informer_{self.kind}", daemon=True)
+        self._thread.start()
+        if wait_for_sync:
+            return self.wait_for_sync(timeout=timeout)
+        return True
+
+    def stop(self, timeout: Optional[int] = None):
+        """
+        Stop the background list/watch thread. The running watch request ends at its next event or
+        when it expires, at the latest after watch_timeout seconds.
+        :param timeout: (optional | int) Time limit in seconds to wait for the thread to finish
+        :return: None
+        """
+        self._stop_event.set()
+        if self._thread is not None and timeout is not None:
+            self._thread.join(timeout=timeout)
+
+    def wait_for_sync(self, timeout: Optional[int] = None) -> bool:
+        """
+        Wait for the initial list to populate the store
+        :param timeout: (optional | int) Time limit in seconds
+        :return: (bool) True if the store is synced otherwise False
+        """
+        return self._synced.wait(timeout=timeout)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set()
+
+    @property
+    def has_synced(self) -> bool:
+        return self._synced.is_set()
+
+    def get(self, name: str, namespace: Optional[str] = None) -> Optional[dict]:
+        """
+        Get an object from the store
+        :param name: (str) Name of the object
+        :param namespace: (optional | str) Namespace of the object. None for cluster scoped objects
+        :return: (dict) The object on success OR None if not in store
+        """
+        with self._lock:
+            return self._store.get((namespace, name))
+
+    def list(self) -> List[dict]:
+        """
+        List all objects in the store
+        :return: (list) List of objects in dict form
+        """
+        with self._lock:
+            return list(self._store.values())
+
+    def by_index(self, index_name: str, index_key: str) -> List[dict]:
+        """
+        Get the objects of the store matching an index key
+        :param index_name: (str) Name of the index
+        :param index_key: (str) Index key to look up
+        :return: (list) List of objects in dict form
+        """
+        with self._lock:
+            return [self._store[key] for key in self._indices[index_name].get(index_key, ())]
@@ -0,0 +1,290 @@
+from array import array
+import base64
+import gzip
+import json
+import logging
+import math
+import sys
+from threading import Event, RLock, Thread
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from kubernetes.client.rest import ApiException
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.ocp_quantity import parse_quantity
+from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+
+logger = logging.getLogger(__loggername__)
+
+SAMPLE_COLUMNS = ("timestamp", "cpu", "memory")
+SAMPLES_FILE_VERSION = 1
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """
+    Percentile of values with linear interpolation between closest ranks
+    :param values: Sequence of values
+    :param q: (float) Percentile between 0 and 100
+    :return: (float) The percentile OR None if values is empty
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower, upper = math.floor(rank), math.ceil(rank)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class RingBuffer:
+    """
+    Fixed size buffer of samples, with one typed array of doubles per column. Arrays grow up to capacity,
+    after which the oldest samples are overwritten.
+    :param capacity: (int) Max number of samples
+    :param columns: (tuple) Names of the columns of a sample
+    """
+
+    def __init__(self, capacity: int, columns: Sequence[str] = SAMPLE_COLUMNS):
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self._arrays: Dict[str, array] = {column: array("d") for column in self.columns}
+        # Position of the oldest sample once the buffer is full
+        self._start = 0
+
+    def __len__(self) -> int:
+        return len(self._arrays[self.columns[0]])
+
+    def append(self, *values: float):
+        """
+        Append a sample with one value per column
+        """
+        if len(self) < self.capacity:
+            for column, value in zip(self.columns, values):
+                self._arrays[column].append(value)
+        else:
+            for column, value in zip(self.columns, values):
+                self._arrays[column][self._start] = value
+            self._start = (self._start + 1) % self.capacity
+
+    def column(self, column: str) -> array:
+        """
+        Get the values of a column ordered from oldest to newest sample
+        :param column: (str) Column name
+        :return: (array) Copy of the column values
+        """
+        values = self._arrays[column]
+        return values[self._start :] + values[: self._start]
+
+
+class OcpMetricsSampler(OcpBase):
+    """
+    OcpMetricsSampler Class extends OcpBase and samples NodeMetrics and PodMetrics of metrics.k8s.io at a
+    fixed interval in a background thread, i.e. during longevity runs. CPU (cores) and memory (bytes) usage
+    of every node and pod are kept in ring buffers holding the last capacity samples. Samples of pods which
+    are gone are dropped, so memory use doesn't grow with pod churn.
+    :param interval: (float) Sampling interval in seconds
+    :param capacity: (int) Max number of samples kept per node and per pod. Defaults to 24h at 15s interval
+    :param sample_pods: (bool) Sample PodMetrics along with NodeMetrics
+    :param namespace: (optional | str) Only sample pods of this namespace. Defaults to all namespaces
+    :param kube_config_file: A kubernetes config file.
+    :return: None
+    """
+
+    def __init__(
+        self,
+        interval: float = 15,
+        capacity: int = 5760,
+        sample_pods: bool = True,
+        namespace: Optional[str] = None,
+        kube_config_file=None,
+    ):
+        super().__init__(kube_config_file=kube_config_file)
+        self.api_version = "metrics.k8s.io/v1beta1"
+        self.interval = interval
+        self.capacity = capacity
+        self.sample_pods = sample_pods
+        self.namespace = namespace
+        self.node_metrics = self.dyn_client.resources.get(api_version=self.api_version, kind="NodeMetrics")
+        self.pod_metrics = self.dyn_client.resources.get(api_version=self.api_version, kind="PodMetrics")
+        # kind ("node" or "pod") -> node name or "<namespace>/<pod name>" -> RingBuffer
+        self._buffers: Dict[str, Dict[str, RingBuffer]] = {"node": dict(), "pod": dict()}
+        self._lock = RLock()
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+        self.sample_count = 0
+
+    def _record(self, kind: str, name: str, timestamp: float, cpu: float, memory: float):
+        with self._lock:
+            buffer = self._buffers[kind].get(name)
+            if buffer is None:
+                buffer = self._buffers[kind][name] = RingBuffer(self.capacity)
+            buffer.append(timestamp, cpu, memory)
+
+    def sample(self):
+        """
+        Take a single sample of NodeMetrics and, if enabled, PodMetrics
+        :return: None
+        """
+        timestamp = time.time()
+        try:
+            for node_metrics in self.node_metrics.get().to_dict()["items"]:
+                usage = node_metrics["usage"]
+                self._record(
+                    "node",
+                    node_metrics["metadata"]["name"],
+                    timestamp,
+                    parse_quantity(usage["cpu"]),
+                    parse_quantity(usage["memory"]),
+                )
+            if self.sample_pods:
+                pod_names = set()
+                for pod_metrics in self.pod_metrics.get(namespace=self.namespace).to_dict()["items"]:
+                    containers = pod_metrics.get("containers") or []
+                    pod_name = f"{pod_metrics['metadata']['namespace']}/{pod_metrics['metadata']['name']}"
+                    pod_names.add(pod_name)
+                    self._record(
+                        "pod",
+                        pod_name,
+                        timestamp,
+                        sum(parse_quantity(container["usage"]["cpu"]) for container in containers),
+                        sum(parse_quantity(container["usage"]["memory"]) for container in containers),
+                    )
+                self._drop_missing("pod", pod_names)
+        except ApiException as e:
+            logger.error("Exception encountered while sampling metrics: %s\n", e)
+            return
+        self.sample_count += 1
+
+    def _drop_missing(self, kind: str, names: set):
+        with self._lock:
+            for name in set(self._buffers[kind]) - names:
+                del self._buffers[kind][name]
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            start_time = time.monotonic()
+            try:
+                self.sample()
+            except Exception as e:
+                logger.exception("Unexpected exception while sampling metrics: %s\n", e)
+            self._stop_event.wait(max(0.0, self.interval - (time.monotonic() - start_time)))
+
+    def start(self):
+        """
+        Start sampling in a background thread
+        :return: None
+        """
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = Thread(target=self._run, name="MetricsSampler", daemon=True)
+        self._thread.start()
+        logger.info("Metrics sampler started with %ss interval", self.interval)
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stop sampling
+        :param timeout: (optional | float) Time limit in seconds to wait for the sampling thread to finish
+        :return: None
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        logger.info("Metrics sampler stopped after %s samples", self.sample_count)
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set()
+
+    def get_names(self, kind: str = "node") -> List[str]:
+        """
+        Get the names of the sampled nodes or pods
+        :param kind: (str) "node" or "pod"
+        :return: (list) Sorted list of node names or "<namespace>/<pod name>"
+        """
+        with self._lock:
+            return sorted(self._buffers[kind])
+
+    def get_samples(self, name: str, kind: str = "node") -> Dict[str, array]:
+        """
+        Get the samples of a node or pod ordered from oldest to newest
+        :param name: (str) Node name or "<namespace>/<pod name>"
+        :param kind: (str) "node" or "pod"
+        :return: (dict) Arrays of timestamp, cpu and memory values keyed by column OR empty dict if not sampled
+        """
+        with self._lock:
+            buffer = self._buffers[kind].get(name)
+            if buffer is None:
+                return dict()
+            return {column: buffer.column(column) for column in buffer.columns}
+
+    def summary(self, kind: str = "node", names: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """
+        Summarize cpu and memory usage of sampled nodes or pods
+        :param kind: (str) "node" or "pod"
+        :param names: (optional | list) Only summarize these nodes or pods
+        :return: (dict) {name: {"samples": n, "cpu": {"p50", "p95", "max"}, "memory": {"p50", "p95", "max"}}}
+        """
+        usage_summary = dict()
+        for name in names or self.get_names(kind):
+            samples = self.get_samples(name, kind)
+            if not samples:
+                continue
+            usage_summary[name] = {"samples": len(samples["timestamp"])}
+            for column in ("cpu", "memory"):
+                values = samples[column]
+                usage_summary[name][column] = {
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                    "max": max(values),
+                }
+        return usage_summary
+
+    def export(self, file_path: str):
+        """
+        Export all samples to a gzip compressed columnar file. Every column of every node and pod is stored
+        as the raw bytes of its array of doubles. Use load_samples to read it back.
+        :param file_path: (str) Path of the file
+        :return: None
+        """
+        series = dict()
+        for kind in ("node", "pod"):
+            for name in self.get_names(kind):
+                series[f"{kind}:{name}"] = {
+                    column: base64.b64encode(values.tobytes()).decode()
+                    for column, values in self.get_samples(name, kind).items()
+                }
+        with gzip.open(file_path, "wt") as f:
+            json.dump(
+                {
+                    "version": SAMPLES_FILE_VERSION,
+                    "byteorder": sys.byteorder,
+                    "interval": self.interval,
+                    "columns": SAMPLE_COLUMNS,
+                    "series": series,
+                },
+                f,
+            )
+        logger.info("Exported samples of %s nodes and pods to %s", len(series), file_path)
+
+
+def load_samples(file_path: str) -> Dict[str, Dict[str, array]]:
+    """
+    Load samples exported with OcpMetricsSampler.export
+    :param file_path: (str) Path of the file
+    :return: (dict) {"node:<name>" or "pod:<namespace>/<name>": {column: array of doubles}}
+    """
+    with gzip.open(file_path, "rt") as f:
+        samples_data = json.load(f)
+    if samples_data.get("version") != SAMPLES_FILE_VERSION:
+        raise ValueError(f"Unsupported samples file version {samples_data.get('version')}")
+    series = dict()
+    for key, columns in samples_data["series"].items():
+        series[key] = dict()
+        for column, encoded_values in columns.items():
+            values = array("d")
+            values.frombytes(base64.b64decode(encoded_values))
+            if samples_data["byteorder"] != sys.byteorder:
+                values.byteswap()
+            series[key][column] = values
+    return series
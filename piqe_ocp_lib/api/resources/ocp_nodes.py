@@ -1,30 +1,97 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
-import subprocess
-from typing import Optional
+import math
+from threading import Condition, Lock
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import uuid
 
+from kubernetes import client
+from kubernetes.client.api_client import ApiClient
 from kubernetes.client.rest import ApiException
+from kubernetes.stream import stream
+from kubernetes.stream.ws_client import ERROR_CHANNEL, STDERR_CHANNEL, STDOUT_CHANNEL
 from openshift.dynamic.resource import ResourceInstance, ResourceList
+import yaml
 
 from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.constants import HttpStatusCode
+from piqe_ocp_lib.api.ocp_quantity import parse_quantities
 from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+from piqe_ocp_lib.api.resources.ocp_informer import DELETED, OcpInformer
 
 logger = logging.getLogger(__loggername__)
 
+DEBUG_POD_IMAGE = "alexeiled/nsenter:2.34"
+DEBUG_POD_LABEL = "piqe-node-debug"
+# Label of the debug pods of a single execute_command_on_nodes call
+DEBUG_SESSION_LABEL = "piqe-node-debug-session"
+# Enter all namespaces of the host init process
+NSENTER_COMMAND = ["/nsenter", "--all", "--target=1", "--"]
+
+NodeCommandResult = namedtuple("NodeCommandResult", ["node_name", "returncode", "stdout", "stderr", "duration"])
+
+# remaining_pods lists "<namespace>/<name>" of pods still on the node when the drain timed out
+DrainResult = namedtuple("DrainResult", ["node_name", "drained", "duration", "evicted_pods", "remaining_pods"])
+
+MASTER_NODE_ROLE_LABEL = "node-role.kubernetes.io/master"
+WORKER_NODE_ROLE_LABEL = "node-role.kubernetes.io/worker"
+
+NodesReadiness = namedtuple("NodesReadiness", ["ready", "nodes"])
+
+# Pods of static manifests, which can't be evicted through the API server
+MIRROR_POD_ANNOTATION = "kubernetes.io/config.mirror"
+
+
+def is_node_ready(node: dict) -> bool:
+    """
+    Check the Ready condition of a single node
+    :param node: (dict) Node object in dict form
+    :return: (bool) True if Ready condition status is True otherwise False
+    """
+    for condition in node.get("status", {}).get("conditions") or []:
+        if condition["type"] == "Ready":
+            return condition["status"] == "True"
+    return False
+
+
+def is_evictable_pod(pod: dict) -> bool:
+    """
+    Return whether a drain evicts a pod. DaemonSet pods are ignored since they would be recreated on
+    the node and mirror pods since they are managed by the kubelet.
+    :param pod: (dict) Pod in dict form
+    :return: (bool) True if the pod is evicted by a drain
+    """
+    metadata = pod["metadata"]
+    if MIRROR_POD_ANNOTATION in (metadata.get("annotations") or {}):
+        return False
+    return not any(owner.get("kind") == "DaemonSet" for owner in metadata.get("ownerReferences") or [])
+
 
 class OcpNodes(OcpBase):
     """
     OcpNodes Class extends OcpBase and encapsulates all methods
     related to managing Openshift nodes.
     :param kube_config_file: A kubernetes config file.
+    :param node_informer: (optional | OcpInformer) A Node informer, i.e. of an OcpHealthMonitor. Node
+                          readiness is read from its store while it is running.
     :return: None
     """
 
-    def __init__(self, kube_config_file=None):
+    def __init__(self, kube_config_file=None, node_informer: Optional[OcpInformer] = None):
         self.kube_config_file = kube_config_file
+        self.node_informer = node_informer
         OcpBase.__init__(self, kube_config_file=self.kube_config_file)
         self.api_version = "v1"
         self.kind = "Node"
         self.ocp_nodes = self.dyn_client.resources.get(api_version=self.api_version, kind=self.kind)
+        self.ocp_pods = self.dyn_client.resources.get(api_version="v1", kind="Pod")
+        self._core_v1: Optional[client.CoreV1Api] = None
+        # (namespace, pod name) of debug pods known to be running
+        self._debug_pods = set()
+        self._debug_pod_locks = dict()
+        self._debug_pods_lock = Lock()
 
     def get_all_nodes(self, label_selector=None):
         """
@@ -75,13 +142,9 @@ class OcpNodes(OcpBase):
         total_memory_in_bytes = 0
         node_response = self.get_all_nodes()
         if node_response:
-            for node in node_response.items:
-                if node["status"]["capacity"]["memory"][-2:] == "Ki":
-                    total_memory_in_bytes += int(node["status"]["capacity"]["memory"][:-2]) * 1024
-                if node["status"]["capacity"]["memory"][-2:] == "Mi":
-                    total_memory_in_bytes += int(node["status"]["capacity"]["memory"][:-2]) * (1024 * 1024)
-                if node["status"]["capacity"]["memory"][-2:] == "Gi":
-                    total_memory_in_bytes += int(node["status"]["capacity"]["memory"][:-2]) * (1024 * 1024)
+            total_memory_in_bytes = round(
+                sum(parse_quantities(node["status"]["capacity"]["memory"] for node in node_response.items))
+            )
             logger.info("Total memory in bytes : %s", total_memory_in_bytes)
         return total_memory_in_bytes
 
@@ -182,84 +245,274 @@ class OcpNodes(OcpBase):
             logger.error("Exception encountered while getting a node by name: %s\n", e)
         return node_role
 
-    def execute_command_on_a_node(self, node_name, command_to_execute):
+    def _get_debug_pod_body(self, node_name: str, pod_name: str, session: Optional[str] = None) -> dict:
+        labels = {"app": DEBUG_POD_LABEL}
+        if session is not None:
+            labels[DEBUG_SESSION_LABEL] = session
+        return {
+            "apiVersion": "v1",
+            "kind": "Pod",
+            "metadata": {"name": pod_name, "labels": labels},
+            "spec": {
+                "hostPID": True,
+                "hostNetwork": True,
+                "restartPolicy": "Never",
+                "nodeSelector": {"kubernetes.io/hostname": node_name},
+                "tolerations": [{"operator": "Exists"}],
+                "containers": [
+                    {
+                        "name": "nsenter",
+                        "image": DEBUG_POD_IMAGE,
+                        "command": NSENTER_COMMAND + ["sleep", "infinity"],
+                        "securityContext": {"privileged": True},
+                        "resources": {"requests": {"cpu": "10m"}},
+                    }
+                ],
+            },
+        }
+
+    def get_debug_pod(
+        self, node_name: str, namespace: str = "default", timeout: int = 300, session: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Get a running privileged debug pod on a node, creating it on first use. The pod is reused by
+        later commands on the same node and session.
+        :param node_name: The name of the node
+        :param namespace: The namespace of the debug pod
+        :param timeout: Time limit in seconds to wait for a new pod to be running
+        :param session: (optional | str) Use a pod of its own for this session, deleted with
+                        delete_debug_pods(session=session) without affecting other sessions
+        :return: (str) Name of the debug pod on success. None on failure.
+        """
+        pod_name = "execute-on-%s" % node_name if session is None else "execute-on-%s-%s" % (node_name, session)
+        with self._debug_pods_lock:
+            if (namespace, pod_name) in self._debug_pods:
+                return pod_name
+            # Pods of different nodes are created concurrently, pods of the same node only once
+            pod_lock = self._debug_pod_locks.setdefault((namespace, pod_name), Lock())
+        with pod_lock:
+            if (namespace, pod_name) in self._debug_pods:
+                return pod_name
+            try:
+                try:
+                    pod_phase = self.ocp_pods.get(name=pod_name, namespace=namespace).status.phase
+                except ApiException as e:
+                    if e.status != HttpStatusCode.NotFound.value:
+                        raise
+                    pod_phase = None
+                if pod_phase in ("Succeeded", "Failed"):
+                    self.ocp_pods.delete(name=pod_name, namespace=namespace, body={"gracePeriodSeconds": 0})
+                    self._wait_for_pod_deletion(pod_name, namespace, timeout)
+                    pod_phase = None
+                if pod_phase is None:
+                    logger.info("Creating debug pod %s on node %s", pod_name, node_name)
+                    self.ocp_pods.create(
+                        body=self._get_debug_pod_body(node_name, pod_name, session=session), namespace=namespace
+                    )
+                if pod_phase != "Running":
+                    for event in self.ocp_pods.watch(
+                        namespace=namespace, field_selector=f"metadata.name={pod_name}", timeout=timeout
+                    ):
+                        pod_phase = event["object"]["status"]["phase"]
+                        if pod_phase != "Pending":
+                            break
+            except ApiException as e:
+                logger.error("Exception encountered while getting debug pod on node %s: %s\n", node_name, e)
+                return None
+            if pod_phase != "Running":
+                logger.error("Debug pod %s on node %s is in %s phase", pod_name, node_name, pod_phase)
+                return None
+            with self._debug_pods_lock:
+                self._debug_pods.add((namespace, pod_name))
+        return pod_name
+
+    def _wait_for_pod_deletion(self, pod_name: str, namespace: str, timeout: int):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                self.ocp_pods.get(name=pod_name, namespace=namespace)
+            except ApiException as e:
+                if e.status == HttpStatusCode.NotFound.value:
+                    return
+                raise
+            time.sleep(1)
+
+    def delete_debug_pods(self, namespace: str = "default", session: Optional[str] = None):
         """
-        Executes the provided command on the specified node_name.
+        Delete the debug pods created by execute_command_on_a_node
+        :param namespace: The namespace of the debug pods
+        :param session: (optional | str) Only delete the pods of this session. Defaults to all debug pods
+        :return: None
+        """
+        label_selector = f"app={DEBUG_POD_LABEL}"
+        if session is not None:
+            label_selector += f",{DEBUG_SESSION_LABEL}={session}"
+        try:
+            self.ocp_pods.delete(namespace=namespace, label_selector=label_selector)
+        except ApiException as e:
+            logger.error("Exception encountered while deleting debug pods: %s\n", e)
+        with self._debug_pods_lock:
+            self._debug_pods = {
+                (pod_namespace, pod_name)
+                for pod_namespace, pod_name in self._debug_pods
+                if pod_namespace != namespace or (session is not None and not pod_name.endswith(f"-{session}"))
+            }
+
+    @property
+    def core_v1(self) -> client.CoreV1Api:
+        with self._debug_pods_lock:
+            if self._core_v1 is None:
+                self._core_v1 = client.CoreV1Api(api_client=self.k8s_client)
+            return self._core_v1
+
+    def _new_exec_core_v1(self) -> client.CoreV1Api:
+        """
+        CoreV1Api on a new api client for a single exec call. kubernetes.stream.stream swaps the request
+        method of the api client while it runs, so an api client can't be shared by concurrent exec calls
+        nor with REST calls.
+        """
+        return client.CoreV1Api(api_client=ApiClient(configuration=self.k8s_client.configuration))
+
+    def execute_command_on_a_node(
+        self,
+        node_name: str,
+        command_to_execute: Union[str, List[str]],
+        namespace: str = "default",
+        output_callback: Optional[Callable[[str, str], None]] = None,
+        timeout: Optional[float] = None,
+        session: Optional[str] = None,
+    ) -> Tuple[Optional[int], bytes, bytes]:
+        """
+        Executes the provided command on the specified node_name. The command runs in the namespaces of the
+        host through the exec stream of a privileged debug pod, which is created once per node and reused.
         :param node_name:  The name of the node on which command gets executed
-        :param command_to_execute:
-        :return:  return code, stdout, stderr of the command executed
-        """
-        # Pod Name
-        pod_name = "execute-on-%s" % node_name
-
-        # Check if pod exists
-        command = "kubectl get pods | grep %s" % pod_name
-        logger.info("Executing command: %s", command)
-        subp = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out, err = subp.communicate()
-        ret = subp.returncode
-        logger.info(
-            "Command - %s - execution status:\n" "RETCODE: %s\nSTDOUT: %s\nSTDERR: %s\n", command, ret, out, err
-        )
-        if ret != 0:
-            # Spin a new container for the node
-            container_definition = (
-                """
-                {
-                  "spec": {
-                    "hostPID": true,
-                    "hostNetwork": true,
-                    "nodeSelector": { "kubernetes.io/hostname": "%s" },
-                    "tolerations": [{
-                      "operator": "Exists"
-                    }],
-                    "containers": [
-                      {
-                        "name": "nsenter",
-                        "image": "alexeiled/nsenter:2.34",
-                        "command": [
-                          "/nsenter", "--all", "--target=1", "--", "su", "-"
-                        ],
-                        "stdin": true,
-                        "tty": true,
-                        "securityContext": {
-                          "privileged": true
-                        },
-                        "resources": {
-                          "requests": {
-                            "cpu": "10m"
-                          }
-                        }
-                      }
-                    ]
-                  }
-                }"""
-                % node_name
-            )
-            command = "kubectl run %s --restart=Never --image " "overriden --overrides '%s'" % (
-                pod_name,
-                container_definition,
-            )
-            logger.info("Executing command : %s", command)
-            subp = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            out, err = subp.communicate()
-            ret = subp.returncode
-            logger.info(
-                "Command - %s - execution status:\n" "RETCODE: %s\nSTDOUT: %s\nSTDERR: %s\n", command, ret, out, err
-            )
-            if ret != 0:
-                return ret, out, err
-        # Execute the command
-        command = f"kubectl exec {pod_name} -- {command_to_execute}"
-        logger.info("Executing command: %s", command)
-        subp = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        out, err = subp.communicate()
-        ret = subp.returncode
+        :param command_to_execute: (str | list) A shell command line or a list of arguments
+        :param namespace: The namespace of the debug pod
+        :param output_callback: (optional | callable) Called with ("stdout" | "stderr", data) as output
+                                of the command is received
+        :param timeout: (optional | float) Time limit in seconds, including the start of a new debug pod
+        :param session: (optional | str) Run the command in a debug pod of this session, see get_debug_pod
+        :return:  return code, stdout, stderr of the command executed. return code is None on failure or
+                  if the command timed out.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if isinstance(command_to_execute, str):
+            command = NSENTER_COMMAND + ["sh", "-c", command_to_execute]
+        else:
+            command = NSENTER_COMMAND + list(command_to_execute)
+        for attempt in range(2):
+            pod_timeout = max(1, math.ceil(deadline - time.monotonic())) if deadline is not None else 300
+            pod_name = self.get_debug_pod(node_name, namespace=namespace, timeout=pod_timeout, session=session)
+            if pod_name is None:
+                return None, b"", b""
+            logger.info("Executing command on node %s: %s", node_name, command_to_execute)
+            try:
+                ws_client = stream(
+                    self._new_exec_core_v1().connect_get_namespaced_pod_exec,
+                    name=pod_name,
+                    namespace=namespace,
+                    command=command,
+                    stderr=True,
+                    stdin=False,
+                    stdout=True,
+                    tty=False,
+                    _preload_content=False,
+                )
+                break
+            except ApiException as e:
+                with self._debug_pods_lock:
+                    self._debug_pods.discard((namespace, pod_name))
+                if e.status != HttpStatusCode.NotFound.value or attempt:
+                    logger.error("Exception encountered while executing command on node %s: %s\n", node_name, e)
+                    return None, b"", b""
+                logger.info("Debug pod %s is gone, creating it again", pod_name)
+
+        out, err = list(), list()
+        is_open = timed_out = True
+        while is_open:
+            if deadline is not None and time.monotonic() > deadline:
+                break
+            # Output received with the last frames is read once more after the stream is closed
+            is_open = ws_client.is_open()
+            ws_client.update(timeout=1)
+            for channel_name, channel, output in (("stdout", STDOUT_CHANNEL, out), ("stderr", STDERR_CHANNEL, err)):
+                data = ws_client.read_channel(channel)
+                if data:
+                    output.append(data)
+                    if output_callback is not None:
+                        output_callback(channel_name, data)
+        else:
+            timed_out = False
+        if timed_out:
+            ws_client.close()
+            logger.error("Command on node %s timed out after %ss: %s", node_name, timeout, command_to_execute)
+            return None, "".join(out).encode(), "".join(err).encode()
+        status = yaml.safe_load(ws_client.read_channel(ERROR_CHANNEL) or "{}") or {}
+        ws_client.close()
+        if status.get("status") == "Success":
+            ret = 0
+        else:
+            causes = (status.get("details") or {}).get("causes") or []
+            exit_codes = [cause["message"] for cause in causes if cause.get("reason") == "ExitCode"]
+            ret = int(exit_codes[0]) if exit_codes else 1
+            if not exit_codes and status.get("message"):
+                err.append(status["message"])
+        out, err = "".join(out).encode(), "".join(err).encode()
         logger.info(
-            "Command - %s - execution status:\n" "RETCODE: %s\nSTDOUT: %s\nSTDERR: %s\n", command, ret, out, err
+            "Command - %s - execution status:\nRETCODE: %s\nSTDOUT: %s\nSTDERR: %s\n", command_to_execute, ret, out, err
         )
         return ret, out, err
 
+    def execute_command_on_nodes(
+        self,
+        command_to_execute: Union[str, List[str]],
+        node_names: Optional[Iterable[str]] = None,
+        label_selector: Optional[str] = None,
+        max_workers: int = 10,
+        timeout: Optional[float] = 300,
+        namespace: str = "default",
+        cleanup: bool = True,
+    ) -> Iterator[NodeCommandResult]:
+        """
+        Executes the provided command on many nodes concurrently and yields the result of every node as it
+        completes. Nodes are selected by name, by label selector or default to all nodes.
+        :param command_to_execute: (str | list) A shell command line or a list of arguments
+        :param node_names: (optional | list) The names of the nodes
+        :param label_selector: (optional | str) Label selector of the nodes, if node_names is not provided
+        :param max_workers: (int) Max number of nodes running the command at once
+        :param timeout: (optional | float) Time limit in seconds for every node
+        :param namespace: The namespace of the debug pods
+        :param cleanup: (bool) Run the command in debug pods of this call, deleted once all nodes completed.
+                        Otherwise the debug pods shared with execute_command_on_a_node are used and kept
+        :return: Iterator of NodeCommandResult in order of completion
+        """
+        if node_names is None:
+            node_list = self.get_all_nodes(label_selector=label_selector)
+            node_names = [node.metadata.name for node in node_list.items] if node_list else []
+        node_names = list(node_names)
+        # Cleanup only deletes the pods of this call, other calls keep running on their own pods
+        session = uuid.uuid4().hex[:8] if cleanup else None
+
+        def execute(node_name: str) -> NodeCommandResult:
+            start_time = time.monotonic()
+            ret, out, err = self.execute_command_on_a_node(
+                node_name, command_to_execute, namespace=namespace, timeout=timeout, session=session
+            )
+            return NodeCommandResult(node_name, ret, out, err, time.monotonic() - start_time)
+
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(node_names) or 1), thread_name_prefix="NodeExec")
+        futures = [executor.submit(execute, node_name) for node_name in node_names]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Nodes not started yet are skipped if the caller stops iterating
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+            if cleanup:
+                self.delete_debug_pods(namespace=namespace, session=session)
+
     def get_master_nodes(self) -> Optional[ResourceList]:
         """
         Method that returns a list of master node objects
@@ -343,41 +596,49 @@ class OcpNodes(OcpBase):
                 logger.error("Exception encountered while marking node unschedulable: %s\n", e)
         return api_response
 
+    def get_nodes_readiness(self, role_label: Optional[str] = None) -> Optional[NodesReadiness]:
+        """
+        Return the readiness of all nodes, or nodes of a role, based on the condition type Ready. Nodes are
+        read from node_informer when it is running, otherwise from a single list request.
+        :param role_label: (optional | str) Only include nodes with this label i.e. MASTER_NODE_ROLE_LABEL
+        :return: NodesReadiness with the aggregate readiness and the readiness of every node keyed by node
+                 name. None on failure.
+        """
+        if self.node_informer is not None and self.node_informer.is_running and self.node_informer.has_synced:
+            nodes = self.node_informer.list()
+            if role_label is not None:
+                nodes = [node for node in nodes if role_label in (node["metadata"].get("labels") or {})]
+        else:
+            node_list = self.get_all_nodes(label_selector=role_label)
+            if node_list is None:
+                return None
+            nodes = node_list.to_dict()["items"]
+        nodes_readiness = {node["metadata"]["name"]: is_node_ready(node) for node in nodes}
+        return NodesReadiness(all(nodes_readiness.values()), nodes_readiness)
+
     def are_all_nodes_ready(self) -> bool:
         """
         Return the status of all node based on the condition type Ready.
         :return: (bool) The status for the condition. Either True or False
         """
-        node_names = self.get_all_node_names()
-        for node in node_names:
-            if self.get_node_status(node) == "False":
-                return False
-        else:
-            return True
+        nodes_readiness = self.get_nodes_readiness()
+        return nodes_readiness is not None and nodes_readiness.ready
 
     def are_master_nodes_ready(self) -> bool:
         """
         Return the status of master nodes based on the condition type Ready.
         :return: (bool) The status for the condition. Either True or False
         """
-        node_names = self.get_all_node_names()
-        for node in node_names:
-            if "master" in node and self.get_node_status(node) == "False":
-                return False
-        else:
-            return True
+        nodes_readiness = self.get_nodes_readiness(role_label=MASTER_NODE_ROLE_LABEL)
+        return nodes_readiness is not None and nodes_readiness.ready
 
     def are_worker_nodes_ready(self) -> bool:
         """
         Return the status of worker nodes based on the condition type Ready.
         :return: (bool) The status for the condition. Either True or False
         """
-        node_names = self.get_all_node_names()
-        for node in node_names:
-            if "worker" in node and self.get_node_status(node) == "False":
-                return False
-        else:
-            return True
+        nodes_readiness = self.get_nodes_readiness(role_label=WORKER_NODE_ROLE_LABEL)
+        return nodes_readiness is not None and nodes_readiness.ready
 
     def get_total_allocatable_mem_cpu(self, node_type=None) -> int:
         """
@@ -393,25 +654,175 @@ class OcpNodes(OcpBase):
         else:
             node_response = self.get_all_nodes()
         if node_response:
+            schedulable_nodes = list()
             for node in node_response.items:
-                schedulable = self.is_node_schedulable(node["metadata"]["name"])
-                if schedulable:
-                    if node["status"]["allocatable"]["memory"][-2:] == "Ki":
-                        total_allocatable_memory_in_bytes += int(node["status"]["allocatable"]["memory"][:-2]) * 1024
-                    if node["status"]["allocatable"]["memory"][-2:] == "Mi":
-                        total_allocatable_memory_in_bytes += int(node["status"]["allocatable"]["memory"][:-2]) * (
-                            1024 * 1024
-                        )
-                    if node["status"]["allocatable"]["memory"][-2:] == "Gi":
-                        total_allocatable_memory_in_bytes += int(node["status"]["allocatable"]["memory"][:-2]) * (
-                            1024 * 1024 * 1024
-                        )
-                    if node["status"]["allocatable"]["cpu"][-1:] == "m":
-                        total_allocatable_cpu_in_m += int(node["status"]["allocatable"]["cpu"][:-1])
-                    if node["status"]["allocatable"]["cpu"][-1:] == "":
-                        total_allocatable_cpu_in_m += int(node["status"]["allocatable"]["cpu"][:-1]) * 1000
-                else:
+                # Schedulable status is part of the listed node, no need to get every node again
+                if node.spec.unschedulable:
                     logger.info("Not counting in resources from %s node as it is unschedulable", node.metadata.name)
+                else:
+                    schedulable_nodes.append(node)
+            total_allocatable_memory_in_bytes = round(
+                sum(parse_quantities(node["status"]["allocatable"]["memory"] for node in schedulable_nodes))
+            )
+            total_allocatable_cpu_in_m = round(
+                sum(parse_quantities(node["status"]["allocatable"]["cpu"] for node in schedulable_nodes)) * 1000
+            )
             logger.info("Total allocatable memory in bytes : %s", total_allocatable_memory_in_bytes)
             logger.info("Total allocatable cpu in m : %s", total_allocatable_cpu_in_m)
         return total_allocatable_memory_in_bytes, total_allocatable_cpu_in_m
+
+    def cordon_nodes(
+        self, node_names: Iterable[str], unschedulable: bool = True, max_workers: int = 10
+    ) -> Dict[str, bool]:
+        """
+        Mark many nodes unschedulable (or schedulable) concurrently. Nodes are patched directly, the patch
+        doesn't change nodes which are already in the requested state.
+        :param node_names: (list) The names of the nodes
+        :param unschedulable: (bool) True to cordon the nodes, False to uncordon them
+        :param max_workers: (int) Max number of concurrent patch requests
+        :return: (dict) True if the node was patched otherwise False, keyed by node name
+        """
+        node_names = list(node_names)
+        body = {"spec": {"unschedulable": unschedulable}}
+
+        def cordon(node_name: str) -> bool:
+            try:
+                self.ocp_nodes.patch(name=node_name, body=body)
+            except ApiException as e:
+                logger.error("Exception encountered while patching node %s unschedulable: %s\n", node_name, e)
+                return False
+            logger.info("Node %s marked %s", node_name, "unschedulable" if unschedulable else "schedulable")
+            return True
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(node_names) or 1)) as executor:
+            return dict(zip(node_names, executor.map(cordon, node_names)))
+
+    def evict_pod(
+        self,
+        name: str,
+        namespace: str,
+        grace_period_seconds: Optional[int] = None,
+        timeout: float = 600,
+        retry_interval: float = 5,
+    ) -> bool:
+        """
+        Evict a pod through the Eviction subresource. Evictions refused because they would violate a
+        PodDisruptionBudget (429 Too Many Requests) are retried until the timeout.
+        :param name: The name of the pod
+        :param namespace: The namespace of the pod
+        :param grace_period_seconds: (optional | int) Grace period of the pod deletion. Defaults to the pod's
+        :param timeout: (float) Time limit in seconds for retries
+        :param retry_interval: (float) Time in seconds between retries
+        :return: (bool) True if the pod was evicted or doesn't exist anymore otherwise False
+        """
+        delete_options = None
+        if grace_period_seconds is not None:
+            delete_options = client.V1DeleteOptions(grace_period_seconds=grace_period_seconds)
+        body = client.V1beta1Eviction(
+            metadata=client.V1ObjectMeta(name=name, namespace=namespace), delete_options=delete_options
+        )
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self.core_v1.create_namespaced_pod_eviction(name=name, namespace=namespace, body=body)
+                logger.debug("Evicted pod %s/%s", namespace, name)
+                return True
+            except ApiException as e:
+                if e.status == HttpStatusCode.NotFound.value:
+                    return True
+                if e.status != HttpStatusCode.TooManyRequests.value:
+                    logger.error("Exception encountered while evicting pod %s/%s: %s\n", namespace, name, e)
+                    return False
+                if time.monotonic() + retry_interval > deadline:
+                    logger.error("Eviction of pod %s/%s is still blocked by a disruption budget", namespace, name)
+                    return False
+                logger.debug("Eviction of pod %s/%s blocked by a disruption budget, retrying", namespace, name)
+            time.sleep(retry_interval)
+
+    def drain_nodes(
+        self,
+        node_names: Iterable[str],
+        max_workers: int = 10,
+        max_evictions: int = 20,
+        timeout: float = 600,
+        grace_period_seconds: Optional[int] = None,
+        retry_interval: float = 5,
+    ) -> Dict[str, DrainResult]:
+        """
+        Cordon nodes and evict their pods, except DaemonSet and mirror pods. Nodes are drained concurrently
+        and their pods are evicted with bounded parallelism. Pods are tracked with a single shared pod
+        watch until they are deleted, pods whose eviction failed are reported as remaining without waiting.
+        :param node_names: (list) The names of the nodes
+        :param max_workers: (int) Max number of nodes drained at once
+        :param max_evictions: (int) Max number of concurrent eviction requests across all nodes
+        :param timeout: (float) Time limit in seconds to drain every node
+        :param grace_period_seconds: (optional | int) Grace period of the evicted pods. Defaults to the pods'
+        :param retry_interval: (float) Time in seconds between evictions blocked by a disruption budget
+        :return: (dict) DrainResult keyed by node name
+        """
+        node_names = list(node_names)
+        cordoned = self.cordon_nodes(node_names, max_workers=max_workers)
+        pod_informer = OcpInformer("v1", "Pod", kube_config_file=self.kube_config_file)
+        pod_informer.add_indexer("node", lambda pod: [(pod.get("spec") or {}).get("nodeName")])
+        pods_deleted = Condition()
+
+        def notify(event_type: str, obj: dict, old_obj: Optional[dict]):
+            if event_type == DELETED:
+                with pods_deleted:
+                    pods_deleted.notify_all()
+
+        pod_informer.add_event_handler(notify)
+        if not pod_informer.start(timeout=60):
+            pod_informer.stop()
+            logger.error("Failed to list pods to drain nodes %s", node_names)
+            return {node_name: DrainResult(node_name, False, 0.0, 0, list()) for node_name in node_names}
+
+        def remaining_pods(node_name: str, pod_uids: Dict[Tuple[str, str], str]) -> List[str]:
+            # Pods recreated with the same name, i.e. by a StatefulSet, have a new uid
+            remaining = list()
+            for (namespace, name), uid in pod_uids.items():
+                pod = pod_informer.get(name, namespace=namespace)
+                if pod is not None and pod["metadata"]["uid"] == uid:
+                    remaining.append(f"{namespace}/{name}")
+            return remaining
+
+        def drain(node_name: str) -> DrainResult:
+            start_time = time.monotonic()
+            if not cordoned[node_name]:
+                return DrainResult(node_name, False, 0.0, 0, list())
+            pods = [pod for pod in pod_informer.by_index("node", node_name) if is_evictable_pod(pod)]
+            pod_uids = {(pod["metadata"]["namespace"], pod["metadata"]["name"]): pod["metadata"]["uid"] for pod in pods}
+            logger.info("Draining node %s, evicting %s pods", node_name, len(pods))
+            evictions = [
+                eviction_executor.submit(self.evict_pod, name, namespace, grace_period_seconds, timeout, retry_interval)
+                for namespace, name in pod_uids
+            ]
+            # Pods whose eviction failed won't be deleted, they're reported right away instead of waited for
+            failed_pods = list()
+            for (namespace, name), eviction in zip(list(pod_uids), evictions):
+                if not eviction.result():
+                    del pod_uids[(namespace, name)]
+                    failed_pods.append(f"{namespace}/{name}")
+            evicted_pods = len(pod_uids)
+            deadline = start_time + timeout
+            with pods_deleted:
+                remaining = remaining_pods(node_name, pod_uids)
+                while remaining and time.monotonic() < deadline:
+                    pods_deleted.wait(timeout=min(5, max(0.0, deadline - time.monotonic())))
+                    remaining = remaining_pods(node_name, pod_uids)
+            remaining = failed_pods + remaining
+            duration = time.monotonic() - start_time
+            if remaining:
+                logger.error("Node %s not drained after %.1fs, remaining pods : %s", node_name, duration, remaining)
+            else:
+                logger.info("Node %s drained in %.1fs", node_name, duration)
+            return DrainResult(node_name, not remaining, duration, evicted_pods, remaining)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_evictions, thread_name_prefix="Eviction") as eviction_executor:
+                with ThreadPoolExecutor(
+                    max_workers=min(max_workers, len(node_names) or 1), thread_name_prefix="Drain"
+                ) as drain_executor:
+                    return dict(zip(node_names, drain_executor.map(drain, node_names)))
+        finally:
+            pod_informer.stop()
@@ -1,5 +1,9 @@
+from collections import namedtuple
+import heapq
 import logging
-from typing import Optional
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from kubernetes import client
 from kubernetes.client.rest import ApiException
@@ -7,9 +11,15 @@ from kubernetes.stream import stream
 
 from piqe_ocp_lib import __loggername__
 from piqe_ocp_lib.api.resources import OcpBase
+from piqe_ocp_lib.api.resources.ocp_informer import OcpInformer
 
 logger = logging.getLogger(__loggername__)
 
+DEPLOYMENT_CONFIG_ANNOTATION = "openshift.io/deployment-config.name"
+
+# A log line of a pod. timestamp is the normalized timestamp of the line, see split_log_timestamp
+LogLine = namedtuple("LogLine", ["timestamp", "pod", "message"])
+
 
 class OcpPods(OcpBase):
     """
@@ -39,7 +49,9 @@ class OcpPods(OcpBase):
             print("Exception while creating pods: %s\n", e)
         return api_response
 
-    def list_pods_in_a_namespace(self, namespace, label_selector: Optional[str] = None):
+    def list_pods_in_a_namespace(
+        self, namespace, label_selector: Optional[str] = None, field_selector: Optional[str] = None
+    ):
         """
         Method to list details for all or a specific type of pod within
         a namespace. If no parameter is given, it defaults to listing
@@ -47,11 +59,14 @@ class OcpPods(OcpBase):
         :param namespace: The namespace containing the targeted pod
         :param label_selector: used to filter the types of pods
                                to be retrieved
+        :param field_selector: (optional | str) used to filter pods on the server i.e. spec.nodeName=<node>
         :return: A V1PodList object on success. None on failure
         """
         api_response = None
         try:
-            api_response = self.ocp_pods.get(namespace=namespace, label_selector=label_selector)
+            api_response = self.ocp_pods.get(
+                namespace=namespace, label_selector=label_selector, field_selector=field_selector
+            )
         except ApiException as e:
             logger.error("Exception while getting pods: %s\n", e)
         return api_response
@@ -82,26 +97,30 @@ class OcpPods(OcpBase):
                 None on failure.
         """
         pods_in_dc = None
-        pods_in_namespace = self.list_pods_in_a_namespace(namespace=namespace, label_selector="deploymentconfig")
+        pods_in_namespace = self.list_pods_in_a_namespace(namespace=namespace, label_selector=f"deploymentconfig={dc}")
         if pods_in_namespace:
             pod_list = pods_in_namespace.items
             pods_in_dc = [
                 pod.metadata.name
                 for pod in pod_list
-                if pod.metadata.annotations["openshift.io/deployment-config.name"] == dc
+                if (pod.metadata.annotations or {}).get(DEPLOYMENT_CONFIG_ANNOTATION) == dc
             ]
         return pods_in_dc
 
-    def list_all_pods_in_all_namespaces(self, label_selector: Optional[str] = None):
+    def list_all_pods_in_all_namespaces(
+        self, label_selector: Optional[str] = None, field_selector: Optional[str] = None
+    ):
         """
         Method that returns a list of All Pods belonging to
         a Deployment Config in all namespaces
+        :param label_selector: (optional | str) used to filter the types of pods to be retrieved
+        :param field_selector: (optional | str) used to filter pods on the server i.e. spec.nodeName=<node>
         :return: The names of all the pods for all namespaces.
                  None on failure.
         """
         api_response = None
         try:
-            api_response = self.ocp_pods.get(label_selector=label_selector)
+            api_response = self.ocp_pods.get(label_selector=label_selector, field_selector=field_selector)
         except ApiException as e:
             logger.error("Exception while getting pods: %s\n", e)
         return api_response
@@ -194,13 +213,325 @@ class OcpPods(OcpBase):
         :return: list of pods
         """
         pod_list = []
+        field_selector = f"spec.nodeName={node_name}"
         if namespace is None:
-            api_response = self.list_all_pods_in_all_namespaces(label_selector=label_selector)
+            api_response = self.list_all_pods_in_all_namespaces(
+                label_selector=label_selector, field_selector=field_selector
+            )
         else:
-            api_response = self.list_pods_in_a_namespace(namespace=namespace, label_selector=label_selector)
+            api_response = self.list_pods_in_a_namespace(
+                namespace=namespace, label_selector=label_selector, field_selector=field_selector
+            )
         if api_response:
             for item in api_response.items:
-                if node_name == item["spec"]["nodeName"]:
-                    pod_name = item["metadata"]["name"]
-                    pod_list.append(pod_name)
+                pod_list.append(item["metadata"]["name"])
         return pod_list
+
+    @staticmethod
+    def _log_params(
+        container: Optional[str] = None,
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
+        since_seconds: Optional[int] = None,
+        timestamps: bool = False,
+    ) -> Dict:
+        params = {
+            "container": container,
+            "tail_lines": tail_lines,
+            "limit_bytes": limit_bytes,
+            "since_seconds": since_seconds,
+        }
+        params = {key: value for key, value in params.items() if value is not None}
+        if timestamps:
+            params["timestamps"] = True
+        return params
+
+    def read_pod_log(
+        self,
+        namespace: str,
+        pod_name: str,
+        container: Optional[str] = None,
+        tail_lines: Optional[int] = None,
+        limit_bytes: Optional[int] = None,
+        since_seconds: Optional[int] = None,
+        timestamps: bool = False,
+    ) -> Optional[List[str]]:
+        """
+        Read the log of a pod. The log is cut on the server by tail_lines, limit_bytes and since_seconds,
+        so only the requested part of the log is transferred.
+        :param namespace: The namespace of the pod
+        :param pod_name: The name of the pod
+        :param container: (optional | str) Container of the pod. Required if the pod has several containers
+        :param tail_lines: (optional | int) Number of lines from the end of the log
+        :param limit_bytes: (optional | int) Max number of bytes of the log
+        :param since_seconds: (optional | int) Only lines written in the last since_seconds seconds
+        :param timestamps: (bool) Prefix every line with its timestamp
+        :return: (list) Lines of the log on success OR None on failure
+        """
+        try:
+            response = self.core_v1.read_namespaced_pod_log(
+                pod_name,
+                namespace,
+                _preload_content=False,
+                **self._log_params(container, tail_lines, limit_bytes, since_seconds, timestamps),
+            )
+        except ApiException as e:
+            logger.error("Exception while reading log of pod %s: %s\n", pod_name, e)
+            return None
+        return list(iter_log_lines(response))
+
+    def stream_pod_log(
+        self,
+        namespace: str,
+        pod_name: str,
+        container: Optional[str] = None,
+        follow: bool = True,
+        tail_lines: Optional[int] = None,
+        since_seconds: Optional[int] = None,
+        timestamps: bool = False,
+        chunk_size: int = 4096,
+    ) -> Iterator[str]:
+        """
+        Yield the lines of the log of a pod as they are received, with memory use bounded by the longest line.
+        With follow the generator keeps yielding new lines until the container terminates or the generator is
+        closed.
+        :param namespace: The namespace of the pod
+        :param pod_name: The name of the pod
+        :param container: (optional | str) Container of the pod. Required if the pod has several containers
+        :param follow: (bool) Keep streaming lines written after the request
+        :param tail_lines: (optional | int) Number of lines from the end of the log to start with
+        :param since_seconds: (optional | int) Only lines written in the last since_seconds seconds
+        :param timestamps: (bool) Prefix every line with its timestamp
+        :param chunk_size: (int) Size in bytes of the chunks read from the response
+        :return: (generator) Lines of the log
+        """
+        try:
+            response = self.core_v1.read_namespaced_pod_log(
+                pod_name,
+                namespace,
+                follow=follow,
+                _preload_content=False,
+                **self._log_params(container, tail_lines, None, since_seconds, timestamps),
+            )
+        except ApiException as e:
+            logger.error("Exception while streaming log of pod %s: %s\n", pod_name, e)
+            return
+        yield from iter_log_lines(response, chunk_size=chunk_size)
+
+    def _iter_pod_log_lines(self, namespace: str, pod_name: str, **kwargs) -> Iterator[LogLine]:
+        for line in self.stream_pod_log(namespace, pod_name, timestamps=True, **kwargs):
+            timestamp, message = split_log_timestamp(line)
+            yield LogLine(timestamp, pod_name, message)
+
+    def stream_pods_logs(
+        self,
+        namespace: str,
+        pod_names: List[str],
+        container: Optional[str] = None,
+        follow: bool = False,
+        tail_lines: Optional[int] = None,
+        since_seconds: Optional[int] = None,
+        buffer_lines: int = 1000,
+    ) -> Iterator[LogLine]:
+        """
+        Yield the log lines of several pods merged by timestamp. Without follow the logs of all pods are
+        streamed together and merged in timestamp order holding one line per pod in memory. With follow lines are
+        yielded as they are received, which is timestamp order within every pod.
+        :param namespace: The namespace of the pods
+        :param pod_names: (list) Names of the pods
+        :param container: (optional | str) Container of the pods
+        :param follow: (bool) Keep streaming lines written after the request
+        :param tail_lines: (optional | int) Number of lines from the end of every log to start with
+        :param since_seconds: (optional | int) Only lines written in the last since_seconds seconds
+        :param buffer_lines: (int) Max number of lines received with follow but not yielded yet
+        :return: (generator) LogLine objects
+        """
+        kwargs = {"container": container, "follow": follow, "tail_lines": tail_lines, "since_seconds": since_seconds}
+        if not follow:
+            yield from heapq.merge(
+                *(self._iter_pod_log_lines(namespace, pod_name, **kwargs) for pod_name in pod_names),
+                key=lambda log_line: log_line.timestamp,
+            )
+            return
+
+        lines: Queue = Queue(maxsize=buffer_lines)
+        stop_event = Event()
+
+        def follow_pod_log(pod_name):
+            try:
+                for log_line in self._iter_pod_log_lines(namespace, pod_name, **kwargs):
+                    while not stop_event.is_set():
+                        try:
+                            lines.put(log_line, timeout=1)
+                            break
+                        except Full:
+                            continue
+                    if stop_event.is_set():
+                        return
+            finally:
+                # None marks the end of the log of a pod
+                while not stop_event.is_set():
+                    try:
+                        lines.put(None, timeout=1)
+                        break
+                    except Full:
+                        continue
+
+        for pod_name in pod_names:
+            Thread(target=follow_pod_log, args=(pod_name,), name=f"Log_{pod_name}", daemon=True).start()
+        running = len(pod_names)
+        try:
+            while running:
+                try:
+                    log_line = lines.get(timeout=1)
+                except Empty:
+                    continue
+                if log_line is None:
+                    running -= 1
+                else:
+                    yield log_line
+        finally:
+            stop_event.set()
+
+
+def iter_log_lines(response, chunk_size: int = 4096) -> Iterator[str]:
+    """
+    Yield the lines of a log response as they are received. Only the incomplete last line is buffered,
+    so memory use doesn't depend on the size of the log.
+    :param response: A urllib3 response requested with _preload_content=False
+    :param chunk_size: (int) Size in bytes of the chunks read from the response
+    :return: (generator) Lines of the log without line separators
+    """
+    buffer = b""
+    try:
+        for chunk in response.stream(chunk_size, decode_content=True):
+            buffer += chunk
+            *complete_lines, buffer = buffer.split(b"\n")
+            for line in complete_lines:
+                yield line.decode("utf-8", errors="replace")
+        if buffer:
+            yield buffer.decode("utf-8", errors="replace")
+    finally:
+        response.release_conn()
+
+
+def split_log_timestamp(line: str) -> Tuple[str, str]:
+    """
+    Split a log line requested with timestamps into its timestamp and message. Timestamps are RFC 3339
+    with trailing zeros of the fractional seconds trimmed, so the fraction is padded to nanoseconds to
+    make timestamps of different lines comparable as strings.
+    :param line: (str) Log line i.e. 2021-03-01T10:00:00.12Z message
+    :return: (tuple) Normalized timestamp i.e. 2021-03-01T10:00:00.120000000Z and message
+    """
+    timestamp, _, message = line.partition(" ")
+    if not timestamp.endswith("Z"):
+        return "", line
+    seconds, _, fraction = timestamp[:-1].partition(".")
+    return f"{seconds}.{fraction:0<9}Z", message
+
+
+def pod_node_keys(pod: dict) -> List[str]:
+    """
+    Index function of pods by the name of their node. Pods not scheduled yet are not indexed.
+    :param pod: (dict) Pod in dict form
+    :return: (list) Node name of the pod
+    """
+    node_name = (pod.get("spec") or {}).get("nodeName")
+    return [node_name] if node_name else []
+
+
+def owner_key(namespace: Optional[str], kind: str, name: str) -> str:
+    """
+    Key of an owner in the owner index of OcpPodIndex
+    """
+    return f"{namespace}/{kind}/{name}"
+
+
+def pod_owner_keys(pod: dict) -> List[str]:
+    """
+    Index function of pods by their owners. Pods of a deployment config are owned by a replication controller
+    of each deployment, so they are also indexed by the deployment config of their annotation.
+    :param pod: (dict) Pod in dict form
+    :return: (list) Owner keys of the pod
+    """
+    metadata = pod["metadata"]
+    namespace = metadata.get("namespace")
+    keys = [owner_key(namespace, owner["kind"], owner["name"]) for owner in metadata.get("ownerReferences") or []]
+    deployment_config = (metadata.get("annotations") or {}).get(DEPLOYMENT_CONFIG_ANNOTATION)
+    if deployment_config:
+        keys.append(owner_key(namespace, "DeploymentConfig", deployment_config))
+    return keys
+
+
+class OcpPodIndex(OcpBase):
+    """
+    OcpPodIndex Class extends OcpBase and indexes pods by node and by owner in memory, so repeated lookups
+    don't make any API request. The index is either built from a single list of pods, updated with
+    refresh(), or kept up to date by a running pod informer.
+    :param namespace: (optional | str) Only index pods of this namespace. Defaults to all namespaces
+    :param label_selector: (optional | str) Only index pods matching the label selector
+    :param pod_informer: (optional | OcpInformer) A running Pod informer to index instead of listing pods
+    :param kube_config_file: A kubernetes config file.
+    :return: None
+    """
+
+    def __init__(
+        self,
+        namespace: Optional[str] = None,
+        label_selector: Optional[str] = None,
+        pod_informer: Optional[OcpInformer] = None,
+        kube_config_file=None,
+    ):
+        super().__init__(kube_config_file=kube_config_file)
+        if pod_informer is None:
+            # The informer is only used as an indexed store, refresh() lists pods without watching them
+            pod_informer = OcpInformer(
+                "v1", "Pod", namespace=namespace, label_selector=label_selector, kube_config_file=kube_config_file
+            )
+        self.pod_informer = pod_informer
+        self.pod_informer.add_indexer("node", pod_node_keys)
+        self.pod_informer.add_indexer("owner", pod_owner_keys)
+
+    def refresh(self) -> Optional["OcpPodIndex"]:
+        """
+        List pods once and rebuild the index. Not needed when indexing a running pod informer.
+        :return: self on success OR None on failure
+        """
+        try:
+            self.pod_informer.relist()
+        except ApiException as e:
+            logger.error("Exception while listing pods to index: %s\n", e)
+            return None
+        return self
+
+    def _by_index(self, index_name: str, index_key: str) -> List[dict]:
+        # Pods are listed on first lookup if the index wasn't built yet
+        if not self.pod_informer.has_synced:
+            self.refresh()
+        return self.pod_informer.by_index(index_name, index_key)
+
+    def get_pods_on_node(self, node_name: str) -> List[dict]:
+        """
+        Get the pods of a node
+        :param node_name: The name of the node
+        :return: (list) Pods in dict form
+        """
+        return self._by_index("node", node_name)
+
+    def get_pods_of_owner(self, kind: str, name: str, namespace: str) -> List[dict]:
+        """
+        Get the pods of an owner i.e. a ReplicaSet, a StatefulSet or a DeploymentConfig
+        :param kind: Kind of the owner
+        :param name: The name of the owner
+        :param namespace: The namespace of the owner
+        :return: (list) Pods in dict form
+        """
+        return self._by_index("owner", owner_key(namespace, kind, name))
+
+    def get_pod_names_on_node(self, node_name: str) -> List[str]:
+        """
+        Get the names of the pods of a node
+        :param node_name: The name of the node
+        :return: (list) Pod names
+        """
+        return [pod["metadata"]["name"] for pod in self.get_pods_on_node(node_name)]
@@ -1,16 +1,120 @@
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import logging
-from typing import Optional
+from queue import Empty, Queue
+from threading import Condition
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional, Union
 
-from openshift.dynamic.resource import ResourceInstance
+from kubernetes.client.rest import ApiException
+from openshift.dynamic.resource import Resource, ResourceInstance, ResourceList
 
 from piqe_ocp_lib import __loggername__
 from piqe_ocp_lib.api import ocp_exceptions
+from piqe_ocp_lib.api.constants import HttpStatusCode
+from piqe_ocp_lib.api.ocp_concurrency import RateLimiter
 from piqe_ocp_lib.api.ocp_exception_handler import handle_exception
 
 from .ocp_base import OcpBase
+from .ocp_informer import ADDED, DELETED, MODIFIED, OcpInformer
 
 logger = logging.getLogger(__loggername__)
 
+# Result of a bulk project operation. latency is the time in seconds from the request until the watch
+# reported the project Active (create) or gone (delete). error is None on success.
+ProjectOperationResult = namedtuple("ProjectOperationResult", ["name", "success", "latency", "error"])
+
+# Status of a namespace being deleted. conditions maps condition type i.e. NamespaceContentRemaining to
+# (status, reason, message). remaining maps resource i.e. pods or deploymentconfigs.apps.openshift.io to the
+# number of objects left in the namespace, it is None when objects were not counted for this status.
+NamespaceDeletionStatus = namedtuple(
+    "NamespaceDeletionStatus", ["name", "elapsed", "phase", "conditions", "remaining", "deleted"]
+)
+
+# Accept header of list requests returning only the metadata of objects
+METADATA_LIST_ACCEPT = "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json"
+
+
+def resource_plural_name(resource) -> str:
+    """
+    Name of a resource qualified by its API group, as in namespace conditions i.e. deploymentconfigs.apps.openshift.io
+    :param resource: A Resource of the dynamic client
+    :return: (str) Qualified resource name
+    """
+    return f"{resource.name}.{resource.group}" if resource.group else resource.name
+
+
+class _ProjectOperationTracker:
+    """
+    Tracks the projects of a bulk operation. A project completes once its request succeeded and the
+    Namespace watch observed the expected state, in any order.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        operation: str,
+        progress_callback: Optional[Callable[[ProjectOperationResult, int, int], None]] = None,
+    ):
+        self.operation = operation
+        self.progress_callback = progress_callback
+        self.results: Dict[str, ProjectOperationResult] = dict()
+        self._pending = set(names)
+        self.total = len(self._pending)
+        self._started: Dict[str, float] = dict()
+        self._requested = set()
+        self._observed = set()
+        self._condition = Condition()
+
+    def started(self, name: str):
+        with self._condition:
+            self._started[name] = time.monotonic()
+
+    def requested(self, name: str):
+        with self._condition:
+            self._requested.add(name)
+            complete = name in self._observed
+        if complete:
+            self._complete(name, True, None)
+
+    def observed(self, name: str):
+        with self._condition:
+            if name not in self._pending:
+                return
+            self._observed.add(name)
+            complete = name in self._requested
+        if complete:
+            self._complete(name, True, None)
+
+    def failed(self, name: str, error: str):
+        self._complete(name, False, error)
+
+    def _complete(self, name: str, success: bool, error: Optional[str]):
+        with self._condition:
+            if name not in self._pending:
+                return
+            self._pending.discard(name)
+            latency = time.monotonic() - self._started.get(name, time.monotonic())
+            result = self.results[name] = ProjectOperationResult(name, success, latency, error)
+            done = len(self.results)
+            self._condition.notify_all()
+        if not success:
+            logger.error("Failed to %s project %s: %s", self.operation, name, error)
+        if done == self.total or done % max(1, self.total // 10) == 0:
+            logger.info("%s %s/%s projects", self.operation.capitalize(), done, self.total)
+        if self.progress_callback is not None:
+            self.progress_callback(result, done, self.total)
+
+    def wait(self, timeout: float) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending, timeout=timeout)
+
+    def expire(self):
+        with self._condition:
+            pending = list(self._pending)
+        for name in pending:
+            self._complete(name, False, "Timed out")
+
 
 class OcpProjects(OcpBase):
     """
@@ -30,6 +134,7 @@ class OcpProjects(OcpBase):
         self.api_version = "v1"
         self.ocp_projects = self.dyn_client.resources.get(api_version=self.api_version, kind="Namespace")
         self.create_ocp_projects = self.dyn_client.resources.get(api_version=self.api_version, kind="ProjectRequest")
+        self._namespaced_resources: Optional[list] = None
 
     @handle_exception
     def create_a_project(self, project_name: str, labels_dict: Optional[dict] = None) -> Optional[ResourceInstance]:
@@ -117,13 +222,10 @@ class OcpProjects(OcpBase):
         :param label_name: (required | str) label of the projects to be deleted.
         :return: A list containing objects of type V1Namespace
         """
-        deleted_projects = []
         labelled_projects = self.get_labelled_projects(label_selector=label_name)
-        for project in labelled_projects.items:
-            api_response = self.ocp_projects.delete(name=project.metadata.name)
-            if self._watch_is_project_deleted(project.metadata.name):
-                deleted_projects.append(api_response)
-        return deleted_projects
+        projects = {project.metadata.name: project for project in labelled_projects.items}
+        results = self.delete_projects(list(projects))
+        return [projects[name] for name, result in results.items() if result.success]
 
     @handle_exception
     def get_labelled_projects(self, label_selector: str) -> Optional[ResourceInstance]:
@@ -157,6 +259,132 @@ class OcpProjects(OcpBase):
             return False
         return bool(has_project)
 
+    def _run_bulk_operation(
+        self,
+        operation: str,
+        names: list,
+        request: Callable[[str], None],
+        is_observed: Callable[[str, Optional[dict]], bool],
+        max_workers: int,
+        rate_limit: Optional[float],
+        timeout: float,
+        progress_callback: Optional[Callable[[ProjectOperationResult, int, int], None]],
+    ) -> Dict[str, ProjectOperationResult]:
+        """
+        Issue the requests of a bulk operation concurrently under a rate limit and track completion of
+        all projects through one Namespace watch
+        """
+        deadline = time.monotonic() + timeout
+        tracker = _ProjectOperationTracker(names, operation, progress_callback=progress_callback)
+        namespace_informer = OcpInformer("v1", "Namespace", kube_config_file=self.kube_config_file)
+
+        def on_event(event_type, obj, old_obj):
+            name = obj["metadata"]["name"]
+            if name in tracker.results:
+                return
+            if is_observed(event_type, obj):
+                tracker.observed(name)
+
+        namespace_informer.add_event_handler(on_event)
+        if not namespace_informer.start(timeout=timeout):
+            namespace_informer.stop()
+            for name in names:
+                tracker.failed(name, "Namespace watch not synced")
+            return tracker.results
+        # Deleted projects which were already gone when the watch started don't get any event
+        if operation == "delete":
+            for name in names:
+                if namespace_informer.get(name) is None:
+                    tracker.observed(name)
+
+        rate_limiter = RateLimiter(rate=rate_limit)
+
+        def run_request(name):
+            rate_limiter.acquire()
+            tracker.started(name)
+            try:
+                request(name)
+            except ApiException as e:
+                if operation == "delete" and e.status == HttpStatusCode.NotFound.value:
+                    tracker.observed(name)
+                else:
+                    tracker.failed(name, f"{e.status} {e.reason}")
+                    return
+            tracker.requested(name)
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(names) or 1)) as executor:
+                list(executor.map(run_request, names))
+            if not tracker.wait(timeout=max(0.0, deadline - time.monotonic())):
+                tracker.expire()
+        finally:
+            namespace_informer.stop()
+        return tracker.results
+
+    def create_projects(
+        self,
+        projects: Union[Iterable[str], Dict[str, Optional[dict]]],
+        max_workers: int = 20,
+        rate_limit: Optional[float] = 20.0,
+        timeout: float = 600,
+        progress_callback: Optional[Callable[[ProjectOperationResult, int, int], None]] = None,
+    ) -> Dict[str, ProjectOperationResult]:
+        """
+        Create many projects concurrently. Requests are issued by max_workers threads under a rate limit and
+        projects are complete when one shared Namespace watch sees them Active.
+        :param projects: (list | dict) Names of the projects, or a dict of project names to labels
+        :param max_workers: (int) Max number of concurrent requests
+        :param rate_limit: (optional | float) Max number of projects created per second. None for no limit
+        :param timeout: (float) Time limit in seconds for all projects to be created
+        :param progress_callback: (optional | callable) Called with (ProjectOperationResult, done, total) every
+                                  time a project completes
+        :return: (dict) ProjectOperationResult by project name
+        """
+        labels = projects if isinstance(projects, dict) else dict.fromkeys(projects)
+
+        def create(project_name):
+            self.create_ocp_projects.create(body={"metadata": {"name": project_name}})
+            if labels[project_name]:
+                self.ocp_projects.patch(body={"metadata": {"labels": labels[project_name]}}, name=project_name)
+
+        def is_active(event_type, obj):
+            return event_type in (ADDED, MODIFIED) and (obj.get("status") or {}).get("phase") == "Active"
+
+        return self._run_bulk_operation(
+            "create", list(labels), create, is_active, max_workers, rate_limit, timeout, progress_callback
+        )
+
+    def delete_projects(
+        self,
+        project_names: Iterable[str],
+        max_workers: int = 20,
+        rate_limit: Optional[float] = 20.0,
+        timeout: float = 1200,
+        progress_callback: Optional[Callable[[ProjectOperationResult, int, int], None]] = None,
+    ) -> Dict[str, ProjectOperationResult]:
+        """
+        Delete many projects concurrently. Requests are issued by max_workers threads under a rate limit and
+        projects are complete when one shared Namespace watch sees them deleted. Projects which don't exist
+        are reported as deleted.
+        :param project_names: (list) Names of the projects
+        :param max_workers: (int) Max number of concurrent requests
+        :param rate_limit: (optional | float) Max number of projects deleted per second. None for no limit
+        :param timeout: (float) Time limit in seconds for all projects to be deleted
+        :param progress_callback: (optional | callable) Called with (ProjectOperationResult, done, total) every
+                                  time a project completes
+        :return: (dict) ProjectOperationResult by project name
+        """
+
+        def delete(project_name):
+            self.ocp_projects.delete(name=project_name)
+
+        def is_deleted(event_type, obj):
+            return event_type == DELETED
+
+        return self._run_bulk_operation(
+            "delete", list(project_names), delete, is_deleted, max_workers, rate_limit, timeout, progress_callback
+        )
+
     def _watch_is_project_created(self, project_name: str) -> bool:
         """
         Provide a watch mechanism to follow project create operations.
@@ -172,16 +400,151 @@ class OcpProjects(OcpBase):
                 return True
         return False
 
-    def _watch_is_project_deleted(self, project_name: str) -> bool:
+    def _get_namespaced_resources(self) -> list:
+        """
+        Discover the namespaced resources of preferred API versions which can be listed, once per OcpProjects
+        object. Discovery is iterated rather than searched, search matches any of its terms and returns list kinds.
+        """
+        if self._namespaced_resources is None:
+            self._namespaced_resources = list()
+            for resources in self.dyn_client.resources:
+                # Discoverers yield the resources of a kind, a Resource and its ResourceList
+                for resource in resources if isinstance(resources, list) else [resources]:
+                    if (
+                        isinstance(resource, Resource)
+                        and not isinstance(resource, ResourceList)
+                        and resource.namespaced is True
+                        and resource.preferred is True
+                        and "list" in (resource.verbs or [])
+                    ):
+                        self._namespaced_resources.append(resource)
+        return self._namespaced_resources
+
+    def count_namespace_objects(self, namespace: str, resources: Optional[list] = None) -> Dict[str, int]:
+        """
+        Count the objects of every namespaced resource in a namespace. Objects are counted with metadata-only
+        list requests of a single item, using the remaining item count of the list, so object contents are
+        not transferred.
+        :param namespace: (str) The namespace
+        :param resources: (optional | list) Resources to count. Defaults to all namespaced resources
+        :return: (dict) Number of objects by resource i.e. pods or deploymentconfigs.apps.openshift.io.
+                 Resources without objects are not included.
+        """
+        counts = dict()
+        for resource in self._get_namespaced_resources() if resources is None else resources:
+            resource_name = resource_plural_name(resource)
+            try:
+                count = 0
+                _continue = None
+                while True:
+                    api_response = resource.get(
+                        namespace=namespace,
+                        limit=1 if _continue is None else 500,
+                        _continue=_continue,
+                        header_params={"Accept": METADATA_LIST_ACCEPT},
+                    )
+                    count += len(api_response.items or [])
+                    _continue = api_response.metadata["continue"]
+                    remaining_item_count = api_response.metadata["remainingItemCount"]
+                    if remaining_item_count is not None:
+                        count += remaining_item_count
+                        break
+                    # The remaining count isn't returned for every list, page through the metadata instead
+                    if not _continue:
+                        break
+            except ApiException as e:
+                logger.debug("Could not count %s in namespace %s: %s", resource_name, namespace, e.reason)
+                continue
+            if count:
+                counts[resource_name] = count
+        return counts
+
+    def track_project_deletion(
+        self, project_name: str, timeout: float = 600, count_interval: Optional[float] = 30
+    ) -> Iterator[NamespaceDeletionStatus]:
+        """
+        Follow the deletion of a project through a watch on its namespace. A status is yielded every time the
+        phase or the conditions of the namespace change i.e. NamespaceContentRemaining or
+        NamespaceFinalizersRemaining, and every count_interval seconds with the number of objects left per
+        resource, starting count_interval seconds after the start. Only resources with objects left are counted
+        again. The last status has deleted set to True,
+        the generator ends without it on timeout.
+        :param project_name: (str) Name of the project being deleted
+        :param timeout: (float) Time limit in seconds
+        :param count_interval: (optional | float) Time in seconds between counts of objects left. None to not
+                               count objects
+        :return: (generator) NamespaceDeletionStatus objects
+        """
+        start_time = time.monotonic()
+        events: Queue = Queue()
+        namespace_informer = OcpInformer(
+            "v1", "Namespace", field_selector=f"metadata.name={project_name}", kube_config_file=self.kube_config_file
+        )
+        namespace_informer.add_event_handler(lambda event_type, obj, old_obj: events.put((event_type, obj)))
+        resources = None
+        # Namespaces deleted within count_interval are never counted
+        next_count = start_time + (count_interval or 0)
+        namespace: Optional[dict] = None
+        last_state = None
+        if not namespace_informer.start(timeout=timeout):
+            logger.error("Failed to watch namespace %s", project_name)
+            return
+        try:
+            # An empty store after the initial list means the namespace is already gone
+            namespace = namespace_informer.get(project_name)
+            deleted = namespace is None
+            while not deleted and time.monotonic() - start_time < timeout:
+                try:
+                    event_type, obj = events.get(timeout=max(0.1, min(1.0, next_count - time.monotonic())))
+                    deleted = event_type == DELETED
+                    namespace = obj
+                except Empty:
+                    pass
+                status = namespace.get("status") or {}
+                conditions = {
+                    condition["type"]: (condition.get("status"), condition.get("reason"), condition.get("message"))
+                    for condition in status.get("conditions") or []
+                }
+                remaining = None
+                if not deleted and count_interval is not None and time.monotonic() >= next_count:
+                    remaining = self.count_namespace_objects(project_name, resources=resources)
+                    # Objects can't be created in a terminating namespace, resources without objects are done
+                    resources = [
+                        resource
+                        for resource in (self._get_namespaced_resources() if resources is None else resources)
+                        if resource_plural_name(resource) in remaining
+                    ]
+                    next_count = time.monotonic() + count_interval
+                state = (status.get("phase"), conditions)
+                if deleted or remaining is not None or state != last_state:
+                    last_state = state
+                    yield NamespaceDeletionStatus(
+                        project_name, time.monotonic() - start_time, state[0], conditions, remaining, deleted
+                    )
+            if deleted and namespace is None:
+                yield NamespaceDeletionStatus(project_name, time.monotonic() - start_time, None, {}, {}, True)
+        finally:
+            namespace_informer.stop()
+
+    def _watch_is_project_deleted(self, project_name: str, timeout: float = 600) -> bool:
         """
-        Provide a watch mechanism to follow project delete operations.
+        Provide a watch mechanism to follow project delete operations. Conditions of the terminating namespace
+        are logged while the project is deleted, and the objects left in it when the deletion is slow.
 
         :param: project_name: (required | str) Name of project to be checked.
-        :return: True if the project has been deleted, False if the project is not found.
+        :param: timeout: (float) Time limit in seconds
+        :return: True if the project has been deleted, False if it still exists after the timeout.
         """
-        field_selector = "status.phase=Terminating"
-        for event in self.ocp_projects.watch(namespace=project_name, field_selector=field_selector, timeout=600):
-            logger.info("Project : {}, Deletion phase : {}".format(project_name, event["object"]["status"]["phase"]))
-            if not self.does_project_exist(project_name):
+        last_status = None
+        for status in self.track_project_deletion(project_name, timeout=timeout):
+            if status.deleted:
+                logger.info("Project : %s, deleted in %s s", project_name, round(status.elapsed, 2))
                 return True
+            last_status = status
+            for condition_type, (condition_status, reason, message) in status.conditions.items():
+                if condition_status == "True":
+                    logger.info("Project : %s, %s : %s", project_name, condition_type, message or reason)
+            if status.remaining:
+                logger.info("Project : %s, objects remaining : %s", project_name, status.remaining)
+        logger.error("Project : %s, not deleted after %s s, last status : %s", project_name, timeout, last_status)
         return False
@@ -14,6 +14,7 @@ from kubernetes.client.rest import ApiException
 from openshift.dynamic.resource import ResourceInstance, ResourceList
 
 from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.ocp_quantity import parse_quantity, ratio
 from piqe_ocp_lib.api.resources.ocp_base import OcpBase
 
 logger = logging.getLogger(__loggername__)
@@ -206,6 +207,25 @@ class OcpResourceQuota(OcpBase):
         status = resp.status
         return V1ResourceQuotaStatus(**status)
 
+    def get_a_resource_quota_usage(self, name: str, namespace: str) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Query a ResourceQuota in specific namespace for usage of every resource
+        :param name: (str) name of ResourceQuota
+        :param namespace: (str) namespace where ResourceQuota is created
+        :return: (dict) {resource: {"used": float, "hard": float, "ratio": used/hard or None}}
+        """
+        status = self.get_a_resource_quota_status(name=name, namespace=namespace)
+        hard = status.hard or {}
+        used = status.used or {}
+        return {
+            resource: {
+                "used": parse_quantity(used.get(resource)),
+                "hard": parse_quantity(hard_value),
+                "ratio": ratio(used.get(resource), hard_value),
+            }
+            for resource, hard_value in hard.items()
+        }
+
     def resource_scope_selector_expression(
         self,
     ) -> Union["OcpScopeSelectorExpression", V1ScopedResourceSelectorRequirement]:
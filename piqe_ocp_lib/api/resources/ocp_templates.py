@@ -1,4 +1,12 @@
+import copy
+import json
 import logging
+import random
+import re
+import string
+from threading import RLock
+import time
+from typing import Any, Dict, Optional, Tuple
 
 from kubernetes.client.rest import ApiException
 
@@ -8,6 +16,24 @@ from .ocp_base import OcpBase
 
 logger = logging.getLogger(__loggername__)
 
+# Character classes of template parameter generator expressions i.e. [\w]{10}
+GENERATOR_CHARACTER_CLASSES = {
+    "\\w": string.ascii_letters + string.digits + "_",
+    "\\d": string.digits,
+    "\\a": string.ascii_letters + string.digits,
+    "\\A": "~!@#$%^&*()-_+={}[]\\|<,>.?/\"';:`",
+}
+GENERATOR_EXPRESSION = re.compile(r"\[([a-zA-Z0-9\-\\]+)\]\{(\d+)\}")
+GENERATOR_RANGE = re.compile(r"\\[wdaA]|[a-zA-Z0-9]-[a-zA-Z0-9]|[a-zA-Z0-9]")
+# Generated values are limited to 255 characters per expression like on the server
+GENERATOR_MAX_LENGTH = 255
+
+# ${{PARAM}} is replaced by the JSON value of the parameter if it's the whole string, ${PARAM} by its string value
+NON_STRING_PARAMETER = re.compile(r"\$\{\{([a-zA-Z0-9_]+)\}\}")
+STRING_PARAMETER = re.compile(r"\$\{([a-zA-Z0-9_]+)\}")
+
+_random = random.SystemRandom()
+
 
 class OcpTemplates(OcpBase):
     """
@@ -144,3 +170,136 @@ class OcpTemplates(OcpBase):
         except ApiException as e:
             logger.error("Exception when calling method create_project_request: %s\n" % e)
         return api_response
+
+
+def generate_expression_value(expression: str) -> str:
+    """
+    Generate a value from a template parameter expression, i.e. [a-zA-Z0-9]{16} or admin[A-Z]{4}. Every
+    [characters]{length} group is replaced by length random characters of the group, other characters are
+    kept as they are. Groups can hold ranges like a-z and the classes \\w, \\d, \\a and \\A.
+    :param expression: (str) The expression of the parameter
+    :return: (str) Generated value
+    """
+
+    def generate(match):
+        characters = ""
+        for character_range in GENERATOR_RANGE.findall(match.group(1)):
+            if character_range in GENERATOR_CHARACTER_CLASSES:
+                characters += GENERATOR_CHARACTER_CLASSES[character_range]
+            elif len(character_range) == 3:
+                characters += "".join(chr(c) for c in range(ord(character_range[0]), ord(character_range[2]) + 1))
+            else:
+                characters += character_range
+        length = int(match.group(2))
+        if not characters or length > GENERATOR_MAX_LENGTH:
+            raise ValueError(f"Invalid template parameter expression {expression}")
+        return "".join(_random.choice(characters) for _ in range(length))
+
+    return GENERATOR_EXPRESSION.sub(generate, expression)
+
+
+def _substitute_parameters(value: Any, parameters: Dict[str, str]) -> Any:
+    if isinstance(value, dict):
+        return {key: _substitute_parameters(item, parameters) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_substitute_parameters(item, parameters) for item in value]
+    if not isinstance(value, str) or "${" not in value:
+        return value
+    match = NON_STRING_PARAMETER.fullmatch(value)
+    if match and match.group(1) in parameters:
+        try:
+            return json.loads(parameters[match.group(1)])
+        except ValueError:
+            return parameters[match.group(1)]
+    value = NON_STRING_PARAMETER.sub(lambda m: parameters.get(m.group(1), m.group(0)), value)
+    return STRING_PARAMETER.sub(lambda m: parameters.get(m.group(1), m.group(0)), value)
+
+
+def process_template(template: dict) -> Optional[dict]:
+    """
+    Process a template locally the way the processedtemplates API does. Parameters without a value and with
+    generate: expression get a generated value, ${PARAM} and ${{PARAM}} references in the objects are replaced
+    by parameter values and the labels of the template are added to every object.
+    :param template: (required | dict) A raw/unprocessed template. It is not modified
+    :return: A processed template of type dict. None if a required parameter has no value or an expression
+             is invalid.
+    """
+    processed_template = copy.deepcopy(template)
+    parameters = dict()
+    for parameter in processed_template.get("parameters") or []:
+        value = parameter.get("value")
+        if not value and parameter.get("generate") == "expression":
+            try:
+                value = parameter["value"] = generate_expression_value(parameter.get("from") or "")
+            except ValueError as e:
+                logger.error("Failed to process template %s: %s", template["metadata"]["name"], e)
+                return None
+        if not value and parameter.get("required"):
+            logger.error(
+                "Failed to process template %s: parameter %s is required",
+                template["metadata"]["name"],
+                parameter["name"],
+            )
+            return None
+        parameters[parameter["name"]] = value or ""
+    objects = _substitute_parameters(processed_template.get("objects") or [], parameters)
+    labels = _substitute_parameters(processed_template.get("labels") or {}, parameters)
+    for obj in objects:
+        if labels:
+            metadata = obj.setdefault("metadata", {})
+            metadata["labels"] = dict(labels, **(metadata.get("labels") or {}))
+    processed_template["objects"] = objects
+    return processed_template
+
+
+class OcpTemplateCache(OcpTemplates):
+    """
+    OcpTemplateCache Class extends OcpTemplates and caches raw templates by (namespace, name, resourceVersion),
+    so deploying many instances of an app fetches its template once. The resourceVersion of a cached template
+    is checked again with a GET after ttl seconds, and the cached template is reused if it didn't change.
+    Templates are returned as copies since enumerating a template modifies it.
+    :param ttl: (optional | float) Time in seconds a template is used without checking it. None to never check
+    :param kube_config_file: A kubernetes config file.
+    :return: None
+    """
+
+    def __init__(self, ttl: Optional[float] = 300, kube_config_file=None):
+        super().__init__(kube_config_file=kube_config_file)
+        self.ttl = ttl
+        self._lock = RLock()
+        # (namespace, name, resourceVersion) -> template
+        self._templates: Dict[Tuple[str, str, str], dict] = dict()
+        # (namespace, name) -> (resourceVersion, time of the last GET)
+        self._latest: Dict[Tuple[str, str], Tuple[str, float]] = dict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_a_template_in_a_namespace(self, template_name, project="openshift"):
+        """
+        Get a raw template from the cache, fetching it if it's not cached or its ttl expired
+        :param template_name: (required | str) The template name.
+        :param project: (optional | str) The project where the template resides. Defaults to 'openshift'
+        :return: A copy of the unprocessed template of type dict. None on failure
+        """
+        with self._lock:
+            latest = self._latest.get((project, template_name))
+            if latest is not None and (self.ttl is None or time.monotonic() - latest[1] < self.ttl):
+                self.hits += 1
+                return copy.deepcopy(self._templates[(project, template_name, latest[0])])
+            self.misses += 1
+        template = super().get_a_template_in_a_namespace(template_name, project=project)
+        if template is None:
+            return None
+        resource_version = template["metadata"].get("resourceVersion", "")
+        with self._lock:
+            # Templates replaced by a newer version are dropped
+            if latest is not None and latest[0] != resource_version:
+                self._templates.pop((project, template_name, latest[0]), None)
+            self._templates.setdefault((project, template_name, resource_version), template)
+            self._latest[(project, template_name)] = (resource_version, time.monotonic())
+            return copy.deepcopy(self._templates[(project, template_name, resource_version)])
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+            self._latest.clear()
@@ -0,0 +1,130 @@
+from collections import namedtuple
+import logging
+from threading import RLock
+import time
+from typing import Dict, Optional, Tuple
+
+from kubernetes import client
+from kubernetes.client import V1ObjectMeta, V1TokenRequest, V1TokenRequestSpec
+from kubernetes.client.rest import ApiException
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+from piqe_ocp_lib.api.resources.ocp_secrets import OcpSecret
+
+logger = logging.getLogger(__loggername__)
+
+# Shortest token lifetime accepted by the TokenRequest API
+MIN_TOKEN_EXPIRATION_SECONDS = 600
+
+CachedToken = namedtuple("CachedToken", ["token", "expires_at", "source"])
+
+
+class OcpTokenProvider(OcpBase):
+    """
+    OcpTokenProvider Class extends OcpBase and provides bearer tokens of service accounts.
+    Tokens are requested with the TokenRequest API and cached until shortly before they expire, so
+    authentication costs one request per token lifetime. Clusters or service accounts where the
+    TokenRequest API can't be used fall back to the long lived token secret of the service account.
+
+    The cache is shared by all instances using the same kubeconfig.
+    :param kube_config_file: A kubernetes config file.
+    :param expiration_seconds: (int) Requested token lifetime in seconds. Fallback secret tokens are
+                               cached for the same duration.
+    :param refresh_before_expiry: (int) Tokens are refreshed this many seconds before they expire
+    :return: None
+    """
+
+    _token_cache: Dict[Tuple[str, str, str], CachedToken] = dict()
+    _token_cache_lock: RLock = RLock()
+
+    def __init__(self, kube_config_file=None, expiration_seconds: int = 3600, refresh_before_expiry: int = 120):
+        super().__init__(kube_config_file=kube_config_file)
+        self.expiration_seconds = max(expiration_seconds, MIN_TOKEN_EXPIRATION_SECONDS)
+        self.refresh_before_expiry = refresh_before_expiry
+        self.core_v1 = client.CoreV1Api(api_client=self.k8s_client)
+        self.ocp_secret = OcpSecret(kube_config_file=self.kube_config_file)
+
+    def _request_token(self, service_account: str, namespace: str) -> Optional[CachedToken]:
+        """
+        Request a bound token for a service account with the TokenRequest API
+        :return: CachedToken on success OR None on failure
+        """
+        # An empty audience list defaults to the audience of the API server
+        body = V1TokenRequest(
+            metadata=V1ObjectMeta(name=service_account, namespace=namespace),
+            spec=V1TokenRequestSpec(audiences=[], expiration_seconds=self.expiration_seconds),
+        )
+        try:
+            api_response = self.core_v1.create_namespaced_service_account_token(
+                name=service_account, namespace=namespace, body=body
+            )
+        except ApiException as e:
+            logger.warning(
+                "TokenRequest for service account %s in %s namespace failed, status %s",
+                service_account,
+                namespace,
+                e.status,
+            )
+            return None
+        expiration_timestamp = api_response.status.expiration_timestamp
+        expires_at = expiration_timestamp.timestamp() if expiration_timestamp else time.time() + self.expiration_seconds
+        return CachedToken(api_response.status.token, expires_at, "TokenRequest")
+
+    def _get_secret_token(self, namespace: str, secret_sub_string: str) -> Optional[CachedToken]:
+        """
+        Get the long lived token of a service account from its token secret
+        :return: CachedToken on success OR None on failure
+        """
+        try:
+            bearer_token = self.ocp_secret.get_long_live_bearer_token(sub_string=secret_sub_string, namespace=namespace)
+        except Exception as e:
+            logger.exception("Failed to get token secret %s in %s namespace : %s", secret_sub_string, namespace, e)
+            return None
+        if not bearer_token:
+            return None
+        return CachedToken(bearer_token, time.time() + self.expiration_seconds, "Secret")
+
+    def get_token(
+        self, service_account: str = "default", namespace: str = "default", secret_sub_string: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Get a bearer token of a service account
+        :param service_account: (str) Name of the service account
+        :param namespace: (str) Namespace of the service account
+        :param secret_sub_string: (optional | str) substring of the token secret name used as fallback.
+                                  Defaults to "<service_account>-token"
+        :return: (str) bearer token on success OR None on failure
+        """
+        cache_key = (self.kube_config_file, namespace, service_account)
+        with OcpTokenProvider._token_cache_lock:
+            cached_token = OcpTokenProvider._token_cache.get(cache_key)
+            if cached_token and time.time() < cached_token.expires_at - self.refresh_before_expiry:
+                return cached_token.token
+
+            cached_token = self._request_token(service_account, namespace) or self._get_secret_token(
+                namespace, secret_sub_string or f"{service_account}-token"
+            )
+            if cached_token is None:
+                logger.error("Failed to get a token for service account %s in %s namespace", service_account, namespace)
+                OcpTokenProvider._token_cache.pop(cache_key, None)
+                return None
+            logger.debug(
+                "Cached %s token of service account %s in %s namespace until %s",
+                cached_token.source,
+                service_account,
+                namespace,
+                time.ctime(cached_token.expires_at),
+            )
+            OcpTokenProvider._token_cache[cache_key] = cached_token
+            return cached_token.token
+
+    def invalidate(self, service_account: str = "default", namespace: str = "default"):
+        """
+        Drop the cached token of a service account, i.e. after it was rejected with 401 Unauthorized
+        :param service_account: (str) Name of the service account
+        :param namespace: (str) Namespace of the service account
+        :return: None
+        """
+        with OcpTokenProvider._token_cache_lock:
+            OcpTokenProvider._token_cache.pop((self.kube_config_file, namespace, service_account), None)
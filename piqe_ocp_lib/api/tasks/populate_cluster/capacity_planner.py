@@ -0,0 +1,225 @@
+from array import array
+from collections import namedtuple
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources import OcpBase
+from piqe_ocp_lib.api.resources.ocp_cluster_capacity import OcpClusterCapacity, get_pod_resources
+from piqe_ocp_lib.api.resources.ocp_templates import OcpTemplates
+
+logger = logging.getLogger(__loggername__)
+
+# Kinds of template objects which create pods
+WORKLOAD_KINDS = ("DeploymentConfig", "Deployment", "StatefulSet", "ReplicaSet", "ReplicationController", "Pod")
+
+# Taints which keep pods without tolerations off a node
+NO_SCHEDULE_TAINT_EFFECTS = ("NoSchedule", "NoExecute")
+
+# Requests of the pods of one workload of an app. count is the number of pods of all instances of the app.
+PodRequest = namedtuple("PodRequest", ["project", "app", "workload", "cpu", "memory", "count"])
+
+# Result of a capacity plan. unschedulable_by_app is keyed by "<project>/<app template>" and node_requests
+# by node name with the cpu (cores), memory (bytes) and pods which would be placed on every node.
+CapacityPlan = namedtuple(
+    "CapacityPlan", ["total_pods", "unschedulable_pods", "unschedulable_by_app", "node_requests", "duration"]
+)
+
+
+def first_fit_decreasing(
+    cpu_free: Sequence[float],
+    memory_free: Sequence[float],
+    pods_free: Sequence[float],
+    pod_requests: Sequence[PodRequest],
+) -> Tuple[List[int], array, array, array]:
+    """
+    Place pods on nodes with the first fit decreasing heuristic. Pods of a workload are identical, so every
+    workload is placed with a single pass over the nodes, largest workloads first. Size of a pod is its
+    dominant share, i.e. the largest fraction of the total free cpu or memory it requests.
+    :param cpu_free: Free cpu (cores) of every node
+    :param memory_free: Free memory (bytes) of every node
+    :param pods_free: Free pod slots of every node
+    :param pod_requests: List of PodRequest
+    :return: (tuple) Number of unschedulable pods of every PodRequest, and arrays of cpu, memory and pods
+             placed on every node
+    """
+    cpu_free, memory_free, pods_free = array("d", cpu_free), array("d", memory_free), array("d", pods_free)
+    cpu_placed, memory_placed, pods_placed = (array("d", [0.0]) * len(cpu_free) for _ in range(3))
+    total_cpu, total_memory = sum(cpu_free) or 1.0, sum(memory_free) or 1.0
+    unschedulable = [0] * len(pod_requests)
+
+    order = sorted(
+        range(len(pod_requests)),
+        key=lambda i: max(pod_requests[i].cpu / total_cpu, pod_requests[i].memory / total_memory),
+        reverse=True,
+    )
+    for i in order:
+        cpu, memory, remaining = pod_requests[i].cpu, pod_requests[i].memory, pod_requests[i].count
+        for node in range(len(cpu_free)):
+            if not remaining:
+                break
+            fits = min(
+                remaining,
+                int(pods_free[node]),
+                math.floor(cpu_free[node] / cpu) if cpu > 0 else remaining,
+                math.floor(memory_free[node] / memory) if memory > 0 else remaining,
+            )
+            if fits <= 0:
+                continue
+            cpu_free[node] -= fits * cpu
+            memory_free[node] -= fits * memory
+            pods_free[node] -= fits
+            cpu_placed[node] += fits * cpu
+            memory_placed[node] += fits * memory
+            pods_placed[node] += fits
+            remaining -= fits
+        unschedulable[i] = remaining
+    return unschedulable, cpu_placed, memory_placed, pods_placed
+
+
+def get_template_pod_requests(
+    processed_template: dict, replicas: Optional[int] = None
+) -> List[Tuple[str, float, float, int]]:
+    """
+    Get the requests of the pods of every workload of a processed template
+    :param processed_template: (dict) A processed template
+    :param replicas: (optional | int) Replicas of deployment configs. Defaults to the replicas of the template
+    :return: (list) Tuples of workload name, cpu (cores), memory (bytes) and number of pods
+    """
+    workload_requests = list()
+    for resource in processed_template.get("objects") or []:
+        kind = resource.get("kind")
+        if kind not in WORKLOAD_KINDS:
+            continue
+        if kind == "Pod":
+            pod, pod_count = resource, 1
+        else:
+            spec = resource.get("spec") or {}
+            pod = spec.get("template") or {}
+            pod_count = spec.get("replicas", 1)
+            if kind == "DeploymentConfig" and replicas is not None:
+                pod_count = replicas
+        cpu_requests, memory_requests, _, _ = get_pod_resources(pod)
+        workload_requests.append((resource["metadata"]["name"], cpu_requests, memory_requests, int(pod_count)))
+    return workload_requests
+
+
+class OcpCapacityPlanner(OcpBase):
+    """
+    OcpCapacityPlanner Class extends OcpBase and estimates whether the apps of a populate_cluster config fit
+    in the cluster before any object is created. Pod requests are read from the processed app templates and
+    placed on the free capacity of schedulable nodes, i.e. allocatable minus requests of running pods.
+    :param kube_config_file: A kubernetes config file.
+    :return: None
+    """
+
+    def __init__(self, kube_config_file=None):
+        super().__init__(kube_config_file=kube_config_file)
+        self.template_obj = OcpTemplates(kube_config_file=self.kube_config_file)
+        self.cluster_capacity = OcpClusterCapacity(kube_config_file=self.kube_config_file)
+        # (template name, frozen app params, replicas) -> workload requests of one app instance
+        self._template_requests: Dict[Tuple, Optional[List[Tuple[str, float, float, int]]]] = dict()
+
+    def get_app_pod_requests(self, project, app) -> Optional[List[PodRequest]]:
+        """
+        Get the pod requests of all instances of an app of a populate_cluster config
+        :param project: ocp_project object of the config
+        :param app: ocp_app object of the config
+        :return: (list) List of PodRequest OR None if the template could not be processed
+        """
+        key = (app.app_template, frozenset((app.app_params or {}).items()), app.app_replicas)
+        if key not in self._template_requests:
+            workload_requests = None
+            template = self.template_obj.get_a_template_in_a_namespace(app.app_template)
+            if template:
+                template = self.template_obj.enumerate_unprocessed_template(template, 0, app.app_params)
+            if template:
+                processed_template = self.template_obj.create_a_processed_template(template)
+                if processed_template:
+                    workload_requests = get_template_pod_requests(processed_template, replicas=app.app_replicas)
+            self._template_requests[key] = workload_requests
+        workload_requests = self._template_requests[key]
+        if workload_requests is None:
+            return None
+        return [
+            PodRequest(project.project_name, app.app_template, workload, cpu, memory, count * app.app_count)
+            for workload, cpu, memory, count in workload_requests
+        ]
+
+    def get_free_node_capacity(self) -> Optional[Dict[str, Dict[str, float]]]:
+        """
+        Get the capacity left on nodes which accept pods without tolerations
+        :return: (dict) {node_name: {"cpu", "memory", "pods"}} OR None on failure
+        """
+        if self.cluster_capacity.capture() is None:
+            return None
+        node_capacity = self.cluster_capacity.get_node_capacity()
+        free_capacity = dict()
+        for node in self.cluster_capacity.nodes:
+            name = node["metadata"]["name"]
+            taints = (node.get("spec") or {}).get("taints") or []
+            if not node_capacity[name]["schedulable"] or any(
+                taint.get("effect") in NO_SCHEDULE_TAINT_EFFECTS for taint in taints
+            ):
+                logger.info("Not planning pods on node %s as it is unschedulable or tainted", name)
+                continue
+            capacity = node_capacity[name]
+            free_capacity[name] = {
+                "cpu": max(0.0, capacity["cpu_allocatable"] - capacity["cpu_requests"]),
+                "memory": max(0.0, capacity["memory_allocatable"] - capacity["memory_requests"]),
+                "pods": max(0.0, capacity["pods_allocatable"] - capacity["pods"]),
+            }
+        return free_capacity
+
+    def plan(self, projects: list, free_capacity: Optional[Dict[str, Dict[str, float]]] = None) -> CapacityPlan:
+        """
+        Simulate placement of the pods of all apps of the projects
+        :param projects: (list) ocp_project objects of a populate_cluster config
+        :param free_capacity: (optional | dict) Free capacity of nodes as returned by get_free_node_capacity.
+                              Read from the cluster if not provided
+        :return: CapacityPlan object
+        """
+        start_time = time.monotonic()
+        if free_capacity is None:
+            free_capacity = self.get_free_node_capacity() or dict()
+        pod_requests: List[PodRequest] = list()
+        for project in projects:
+            for app in project.apps:
+                app_pod_requests = self.get_app_pod_requests(project, app)
+                if app_pod_requests is None:
+                    logger.warning("Could not read pod requests of app template %s, skipping it", app.app_template)
+                    continue
+                pod_requests.extend(app_pod_requests)
+
+        node_names = list(free_capacity)
+        unschedulable, cpu_placed, memory_placed, pods_placed = first_fit_decreasing(
+            [free_capacity[name]["cpu"] for name in node_names],
+            [free_capacity[name]["memory"] for name in node_names],
+            [free_capacity[name]["pods"] for name in node_names],
+            pod_requests,
+        )
+        unschedulable_by_app: Dict[str, int] = dict()
+        for pod_request, unschedulable_count in zip(pod_requests, unschedulable):
+            if unschedulable_count:
+                app_key = f"{pod_request.project}/{pod_request.app}"
+                unschedulable_by_app[app_key] = unschedulable_by_app.get(app_key, 0) + unschedulable_count
+        node_requests = {
+            name: {"cpu": cpu_placed[i], "memory": memory_placed[i], "pods": int(pods_placed[i])}
+            for i, name in enumerate(node_names)
+        }
+        capacity_plan = CapacityPlan(
+            total_pods=sum(pod_request.count for pod_request in pod_requests),
+            unschedulable_pods=sum(unschedulable),
+            unschedulable_by_app=unschedulable_by_app,
+            node_requests=node_requests,
+            duration=time.monotonic() - start_time,
+        )
+        logger.info(
+            "Capacity plan : %s of %s pods unschedulable on %s nodes",
+            capacity_plan.unschedulable_pods,
+            capacity_plan.total_pods,
+            len(node_names),
+        )
+        return capacity_plan
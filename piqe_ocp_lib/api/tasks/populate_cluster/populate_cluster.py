@@ -1,6 +1,6 @@
 #!/usr/bin/python
 import argparse
-from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
 import os
 import random
 from random import randint
@@ -12,31 +12,53 @@ from time import sleep
 
 from piqe_ocp_lib import __loggername__
 from piqe_ocp_lib.api import ocp_exceptions
+from piqe_ocp_lib.api.ocp_concurrency import AdaptiveConcurrencyLimiter, StagedPipeline
 from piqe_ocp_lib.api.resources import OcpApps, OcpDeploymentconfigs, OcpEvents, OcpNodes, OcpPods, OcpProjects
+from piqe_ocp_lib.api.resources.ocp_deploymentconfigs import OcpDcReadinessTracker
+from piqe_ocp_lib.api.resources.ocp_events import OcpEventStore
+from piqe_ocp_lib.api.tasks.populate_cluster.capacity_planner import OcpCapacityPlanner
 from piqe_ocp_lib.api.tasks.populate_cluster.config_schemas import populate_ocp_cluster_config
 from piqe_ocp_lib.piqe_api_logger import piqe_api_logger
 
 # logger = logging.getLogger(__loggername__)
 logger = piqe_api_logger(__loggername__)
 
+# Stages of the populate pipeline and their default number of worker threads. The readiness stage only
+# registers deployment configs with a shared watch, so it needs few workers.
+POPULATE_STAGE_WORKERS = {"project": 10, "app": 20, "readiness": 2, "configure": 10}
+
+# An instance of an app of a project, item of the app stage of the populate pipeline
+AppDeployment = namedtuple("AppDeployment", ["project", "app", "ident"])
+# A deployment config of an app instance, item of the readiness and configure stages of the populate pipeline
+DcDeployment = namedtuple("DcDeployment", ["project", "app", "ident", "dc"])
+
 
 class PopulateOcpCluster:
     cleanup_project_list = []
 
-    def __init__(self, ocp_cluster_config, k8=None):
+    def __init__(self, ocp_cluster_config, k8=None, stage_workers=None, dc_ready_timeout=1800, max_concurrency=64):
         self.is_populate_successful = False
         self.total_app_count = 0
         self.ocp_cluster_config = ocp_cluster_config
+        self.kube_config_file = k8
         # Create objects
         self.project_obj = OcpProjects(kube_config_file=k8)
-        self.app_obj = OcpApps(kube_config_file=k8)
+        # Object creates of all apps share a concurrency limit adapted to the API latency and errors
+        self.concurrency_limiter = AdaptiveConcurrencyLimiter(max_limit=max_concurrency)
+        self.app_obj = OcpApps(kube_config_file=k8, concurrency_limiter=self.concurrency_limiter)
         self.dc_obj = OcpDeploymentconfigs(kube_config_file=k8)
         self.pod_obj = OcpPods(kube_config_file=k8)
         self.events_obj = OcpEvents(kube_config_file=k8)
         self.node_obj = OcpNodes(kube_config_file=k8)
+        self.capacity_planner = OcpCapacityPlanner(kube_config_file=k8)
         self.ocp_cluster_obj = PopulateOcpCluster.get_ocp_cluster_objects_from_template(self.ocp_cluster_config)
-        self.python_version = tuple(sys.version[:5].split(".")[:2])
+        self.stage_workers = dict(POPULATE_STAGE_WORKERS, **(stage_workers or {}))
+        self.dc_ready_timeout = dc_ready_timeout
+        self.failed_dcs = []
         self.lock = Lock()
+        self._pipeline = None
+        self._readiness_tracker = None
+        self._event_store = None
 
     @staticmethod
     def get_ocp_cluster_objects_from_template(ocp_cluster_config):
@@ -52,13 +74,156 @@ class PopulateOcpCluster:
             logger.exception("Failed to create ocp_cluster object: %s", e)
             sys.exit(1)
 
+    def plan_capacity(self, filter="all"):
+        """
+        Estimate whether the pods of the apps of the selected projects fit in the cluster
+        before any object is created.
+        :param filter: A list of strings used to filter which projects to plan for.
+        :return: CapacityPlan object
+        """
+        if "all" in filter:
+            filtered_projects = self.ocp_cluster_obj.projects
+        else:
+            filtered_projects = [
+                p for p in self.ocp_cluster_obj.projects if bool(set(filter) & set(p.project_labels.values()))
+            ]
+        capacity_plan = self.capacity_planner.plan(filtered_projects)
+        for app, unschedulable_pods in capacity_plan.unschedulable_by_app.items():
+            logger.warning("%s pods of app %s are not expected to be schedulable", unschedulable_pods, app)
+        logger.info(
+            "Planned %s pods of %s projects in %s ms, %s pods are expected to be unschedulable",
+            capacity_plan.total_pods,
+            len(filtered_projects),
+            round(capacity_plan.duration * 1000, 2),
+            capacity_plan.unschedulable_pods,
+        )
+        return capacity_plan
+
+    def _create_project_stage(self, project):
+        """
+        Project stage of the populate pipeline. Create a project
+        :param project: ocp_project object of the config
+        :return: (list) AppDeployment of every instance of every app of the project
+        """
+        current_project = project.project_name
+        logger.info("-" * 60)
+        logger.info("%s - Current project is: %s", threading.currentThread().getName(), current_project)
+        logger.info("-" * 60)
+        self.project_obj.create_a_project(current_project, labels_dict=project.project_labels)
+        deployments = []
+        for app in project.apps:
+            with self.lock:
+                self.total_app_count += app.app_count
+            logger.debug("App Labels : %s", app.app_labels)
+            logger.debug("APP_PARAM : %s", app.app_params)
+            deployments.extend(AppDeployment(project, app, i) for i in range(app.app_count))
+        return deployments
+
+    def _create_app_stage(self, deployment):
+        """
+        App stage of the populate pipeline. Deploy an instance of an app
+        :param deployment: (AppDeployment) The app instance
+        :return: (list) DcDeployment of every deployment config of the app
+        """
+        app_name = deployment.app.app_template + "-" + str(deployment.ident)
+        logger.info("----> %s - Now deploying: %s", threading.currentThread().getName(), app_name)
+        _, dc_names = self.app_obj.create_app_from_template(
+            deployment.project.project_name, deployment.app.app_template, deployment.ident, deployment.app.app_params
+        )
+        if dc_names is None:
+            logger.error(" %s -Failed to deploy template: %s", threading.currentThread().getName(), app_name)
+            return []
+        return [DcDeployment(deployment.project, deployment.app, deployment.ident, dc) for dc in dc_names]
+
+    def _wait_for_dc_stage(self, deployment):
+        """
+        Readiness stage of the populate pipeline. Register a deployment config with the shared
+        deploymentconfig watch, which passes it to the configure stage once it's ready
+        :param deployment: (DcDeployment) The deployment config
+        :return: None
+        """
+        pipeline = self._pipeline
+
+        def on_ready(namespace, dc, ready):
+            try:
+                if ready:
+                    pipeline.put("configure", deployment)
+                else:
+                    logger.error("Timed out waiting for the deploymentconfig %s to become ready.", dc)
+                    with self.lock:
+                        self.failed_dcs.append((namespace, dc))
+            finally:
+                pipeline.release()
+
+        pipeline.hold()
+        try:
+            self._readiness_tracker.notify_when_ready(
+                deployment.project.project_name, deployment.dc, on_ready, timeout=self.dc_ready_timeout
+            )
+        except Exception:
+            pipeline.release()
+            raise
+
+    def _configure_dc_stage(self, deployment):
+        """
+        Configure stage of the populate pipeline. Show the events of a ready deployment config and
+        its pods, then update its replicas and label it as specified in the config file
+        :param deployment: (DcDeployment) The deployment config
+        :return: None
+        """
+        current_project = deployment.project.project_name
+        dc = deployment.dc
+        # Show any deploymentconfig events
+        dc_events = self.events_obj.list_dc_events_in_a_namespace(current_project, dc, event_store=self._event_store)
+        if dc_events:
+            logger.debug("%s - Deploymentconfig events for %s:\n", threading.currentThread().getName(), dc)
+            for event in dc_events:
+                logger.debug(
+                    " %s - \n\tProject: %s\n\tResource: %s\n\tFirstTimestamp: %s\n\tMessage: %s\n"
+                    % (
+                        threading.currentThread().getName(),
+                        event.involvedObject.namespace,
+                        event.involvedObject.name,
+                        event.firstTimestamp,
+                        event.message,
+                    )
+                )
+        # Show any events from pods associated with this deploymentconfig
+        pod_events = self.events_obj.list_pod_events_in_a_namespace(current_project, dc, event_store=self._event_store)
+        if pod_events is not None:
+            logger.debug("Pod events for %s:\n" % dc)
+            for event in pod_events:
+                logger.debug(
+                    "\tProject: %s\n\tResource: %s\n\tFirstTimestamp: %s\n\tMessage: %s\n"
+                    % (
+                        event.involvedObject.namespace,
+                        event.involvedObject.name,
+                        event.firstTimestamp,
+                        event.message,
+                    )
+                )
+        # Check for currently existing pods associated with this deploymentconfig
+        dc_pod = self.pod_obj.list_pods_in_a_deployment(current_project, dc)
+        if len(dc_pod) == 0:
+            logger.error(
+                " %s - No pods for deploymentconfig %s were found in the cluster.",
+                threading.currentThread().getName(),
+                dc,
+            )
+        # Update replicas as specified in config file
+        logger.info("%s - Now updating replicas for app %s", threading.currentThread().getName(), dc)
+        self.dc_obj.update_deployment_replicas(current_project, dc, deployment.app.app_replicas)
+        # Label the deployment configs of this app
+        logger.info("%s - Now labeling deploymentconfig %s", threading.currentThread().getName(), dc)
+        self.dc_obj.label_dc(current_project, dc, deployment.app.app_labels)
+
     def populate_cluster(self, filter="all"):
         """
         filters can be used to select subsets of projects to be deployed
         for any specific run.
         :param filter: A list of strings used to filter which projects
                        to deploy.
-        :return: True
+        :return: True if all deployment configs became ready, otherwise False
         """
         start = time.time()
         if "all" in filter:
@@ -80,166 +245,42 @@ class PopulateOcpCluster:
             )
 
         else:
-
-            def populate(project):
-                logger.info("Starting thread - %s", threading.currentThread().getName())
-                current_project = project.project_name
-                current_project_labels = project.project_labels
-                logger.info("-" * 60)
-                logger.info("%s - Current project is: %s", threading.currentThread().getName(), current_project)
-                logger.info("-" * 60)
-
-                self.project_obj.create_a_project(current_project, labels_dict=current_project_labels)
-
-                # For every project in the outer loop,
-                # loop through the apps to be deployed
-                for app in project.apps:
-                    with self.lock:
-                        self.total_app_count += app.app_count
-
-                    logger.info(
-                        "****** %s - Current app template used is: %s",
-                        threading.currentThread().getName(),
-                        app.app_template,
-                    )
-                    logger.debug("App Labels : %s", app.app_labels)
-                    logger.debug("APP_PARAM : %s", app.app_params)
-                    # For every app, deploy the desired count
-                    for i in range(app.app_count):
-                        logger.info(
-                            "----> %s - Now deploying: %s",
-                            threading.currentThread().getName(),
-                            app.app_template + "-" + str(i),
-                        )
-                        _, dc_names = self.app_obj.create_app_from_template(
-                            current_project, app.app_template, i, app.app_params
-                        )
-
-                        if dc_names is None:
-                            logger.error(
-                                " %s -Failed to deploy template: %s",
-                                threading.currentThread().getName(),
-                                app.app_template + "-" + str(i),
-                            )
-                            continue
-
-                        for dc in dc_names:
-                            # For every Deployment Config (dc) in an app,
-                            # Poll for readiness and list its Pod events
-                            dc_available = self.dc_obj.check_dc_status_conditions_availability(
-                                current_project, dc, timeout=600
-                            )
-                            if not dc_available:
-                                logger.error(
-                                    " %s - Timed out waiting for expected status conditions for " "deploymentconfig %s",
-                                    threading.currentThread().getName(),
-                                    dc,
-                                )
-                                sys.exit(1)
-
-                            dc_ready = self.dc_obj.is_dc_ready(current_project, dc, timeout=1200)
-
-                            if dc_ready:
-                                # Show any deploymentconfig events
-                                dc_events = self.events_obj.list_dc_events_in_a_namespace(current_project, dc)
-                                if dc_events:
-                                    logger.debug(
-                                        "%s - Deploymentconfig events for %s:\n",
-                                        threading.currentThread().getName(),
-                                        dc,
-                                    )
-                                    for event in dc_events:
-                                        logger.debug(
-                                            " %s - \n\tProject: %s\n\tResource: %s\n\tFirstTimestamp: %s"
-                                            "\n\tMessage: %s\n"
-                                            % (
-                                                threading.currentThread().getName(),
-                                                event.involvedObject.namespace,
-                                                event.involvedObject.name,
-                                                event.firstTimestamp,
-                                                event.message,
-                                            )
-                                        )
-                                # Show any events from pods associated with this deploymentconfig
-                                pod_events = self.events_obj.list_pod_events_in_a_namespace(current_project, dc)
-                                if pod_events is not None:
-                                    logger.debug("Pod events for %s:\n" % dc)
-                                    for event in pod_events:
-                                        logger.debug(
-                                            "\tProject: %s\n\tResource: %s\n\tFirstTimestamp: %s\n\tMessage: %s\n"
-                                            % (
-                                                event.involvedObject.namespace,
-                                                event.involvedObject.name,
-                                                event.firstTimestamp,
-                                                event.message,
-                                            )
-                                        )
-                                # Check for currently existing pods associated with this deploymentconfig
-                                dc_pod = self.pod_obj.list_pods_in_a_deployment(current_project, dc)
-                                if len(dc_pod) == 0:
-                                    logger.error(
-                                        " %s - No pods for deploymentconfig %s were found in the cluster.",
-                                        threading.currentThread().getName(),
-                                        dc,
-                                    )
-                            else:
-                                logger.error(
-                                    "%s - Timed out waiting for the deploymentconfig %s to become ready."
-                                    "Exiting now ...",
-                                    threading.currentThread().getName(),
-                                    dc,
-                                )
-                                raise ocp_exceptions.ExecutionError(
-                                    "Timed out waiting for the deploymentconfig %s to become ready. Exiting now ..."
-                                    % dc
-                                )
-                            # Update replicas as specified in config file
-                            logger.info(
-                                "%s - Now updating replicas for app %s", threading.currentThread().getName(), dc
-                            )
-                            self.dc_obj.update_deployment_replicas(current_project, dc, app.app_replicas)
-                            # Label the deployment configs of this app
-                            logger.info(
-                                "%s - Now labeling deploymentconfig %s", threading.currentThread().getName(), dc
-                            )
-                            app_labels = app.app_labels
-                            self.dc_obj.label_dc(current_project, dc, app_labels)
-
-                    self.is_populate_successful = True
-
             """
-            ThreadPoolExecutor with ContextManager is the recommended way to handle thread in Python3 but it's not
-            supported in Python2. Hence we have to use traditional threading module. We have also used threading.Lock()
-            class to implement primitive lock objects. Once a thread has acquired a lock, subsequent attempts
-            to acquire it block, until it is released.
-
-            For Python2 : We have used threading.Thread to create thread with thread_name and function as args.We will
-            loop over all projects from config yaml specified in with --cluster-config option and creates a thread.
-            Store all thread in lists and use join() method to complete all threads before it switch to main_thread.
-
-            For Python3 : We have used ThreadPoolExecutor with thread_name_prefix and default process counts. Based on
-            python3 doc, default number of thread created by ThreadPoolExecutor will be number processor on server * 5.
-            if server has 8 processor, Total number of concurrent thread will be 40. If we have 100 projects, It will
-            create 40 thread for first 40 projects and remaining 60 project will be in pool. As any of active thread is
-            completed, It will pick next projects from pool. ThreadPoolExecutor with ContextManager will handle all
-            threads before switching to main_thread.
+            Projects are populated by a pipeline of four stages: project creation, app creation, readiness
+            wait and scale and label. Every stage has its own queue and pool of worker threads, sized by
+            stage_workers, so apps of all projects are deployed concurrently instead of one app at a time
+            per project. The readiness stage doesn't block any thread, deployment configs are passed to the
+            scale and label stage by a single deploymentconfig watch shared by all projects once they are ready.
+            DC and pod events are looked up in a single event store watching the events of all namespaces.
             """
-
-            if self.python_version <= ("2", "7"):
-                logger.info("Python version is %s", self.python_version)
-                threads = list()
-                for project in filtered_projects:
-                    thread = threading.Thread(target=populate, name=f"Thread_{project.project_name}", args=(project,))
-                    threads.append(thread)
-                    thread.start()
-                for thread in threads:
-                    thread.join()
-            else:
-                logger.info("Python version is %s", self.python_version)
-                with ThreadPoolExecutor(thread_name_prefix="Thread") as executor:
-                    executor.map(populate, filtered_projects)
-                    # result_futures = list(map(lambda x: executor.submit(populate, x), filtered_projects))
-                    # results = [f.result() for f in futures.as_completed(result_futures)]
+            self.failed_dcs = []
+            self._pipeline = StagedPipeline(name="Populate")
+            self._pipeline.add_stage("project", self._create_project_stage, self.stage_workers["project"])
+            self._pipeline.add_stage("app", self._create_app_stage, self.stage_workers["app"])
+            self._pipeline.add_stage("readiness", self._wait_for_dc_stage, self.stage_workers["readiness"])
+            self._pipeline.add_stage("configure", self._configure_dc_stage, self.stage_workers["configure"])
+            self._readiness_tracker = OcpDcReadinessTracker(kube_config_file=self.kube_config_file)
+            self._event_store = OcpEventStore(kube_config_file=self.kube_config_file)
+            with self._readiness_tracker, self._event_store:
+                with self._pipeline as pipeline:
+                    for project in filtered_projects:
+                        pipeline.put("project", project)
+                    pipeline.join()
+
+            stage_failures = 0
+            for stats in self._pipeline.stats:
+                stage_failures += stats.failed
+                logger.info(
+                    "Stage %s: %s workers, %s items processed, %s failed, busy %s s, max %s items queued",
+                    stats.name,
+                    stats.workers,
+                    stats.processed,
+                    stats.failed,
+                    round(stats.busy, 2),
+                    stats.max_queued,
+                )
+            self.is_populate_successful = not self.failed_dcs and not stage_failures
+            self._report_concurrency(start)
 
             end = time.time()
             logger.info(
@@ -251,6 +292,33 @@ class PopulateOcpCluster:
 
         return self.is_populate_successful
 
+    def _report_concurrency(self, start):
+        """
+        Log the concurrency limit of object creates over time
+        :param start: (float) Start time of the populate in seconds since the epoch
+        :return: None
+        """
+        # The limit the populate started with
+        limits = [sample.limit for sample in self.concurrency_limiter.history if sample.timestamp < start][-1:]
+        for sample in self.concurrency_limiter.history:
+            if sample.timestamp < start:
+                continue
+            limits.append(sample.limit)
+            logger.info(
+                "Concurrency limit %s at %s s, latency %s s, error rate %s%s",
+                sample.limit,
+                round(sample.timestamp - start, 2),
+                round(sample.latency, 3) if sample.latency is not None else None,
+                round(sample.error_rate, 2),
+                ", throttled" if sample.throttled else "",
+            )
+        logger.info(
+            "Concurrency limit of object creates: final %s, min %s, max %s",
+            self.concurrency_limiter.limit,
+            min(limits),
+            max(limits),
+        )
+
     def longevity(self, duration, scale_replicas=5):
         """
         This method scans all namespaces for deployments labeled 'scalable=True',
@@ -295,7 +363,7 @@ class PopulateOcpCluster:
                         )
 
                         dc_log = self.dc_obj.read_dc_log(current_namespace, current_dc)
-                        for line in dc_log:
+                        for line in dc_log or []:
                             logger.error(line)
 
                     raise ocp_exceptions.OcpDeploymentConfigInvalidStateError(
@@ -352,12 +420,15 @@ class PopulateOcpCluster:
             )
         else:
             logger.info("Starting cleanup ... now deleting" " specified projects")
-            # TODO : Use watch() instead
             PopulateOcpCluster.cleanup_project_list = filtered_projects[:]
-            for project in filtered_projects:
-                logger.info("Now deleting Project %s", project.project_name)
-                self.project_obj.delete_a_project(project.project_name)
-                PopulateOcpCluster.cleanup_project_list.remove(project)
+            # Projects are deleted concurrently and tracked through a single Namespace watch
+            results = self.project_obj.delete_projects([project.project_name for project in filtered_projects])
+            PopulateOcpCluster.cleanup_project_list = [
+                project for project in filtered_projects if not results[project.project_name].success
+            ]
+            deleted = [result.latency for result in results.values() if result.success]
+            if deleted:
+                logger.info("Deleted %s projects, max deletion latency %s s", len(deleted), round(max(deleted), 2))
             return PopulateOcpCluster.cleanup_project_list
 
 
@@ -376,7 +447,7 @@ def argument_parser():
                                [-l LOGS_DIR] [-m MASTER] [-u USER]
                                [-k8 KUBECONFIG] [-p PASSWORD] [-n LOG_FILE]
                                [-s SPAN] [-r REPLICAS]
-                               [-t {populate,longevity,cleanup,all} [{populate,longevity,cleanup,all} ...]]
+                               [-t {plan,populate,longevity,cleanup,all} [{plan,populate,longevity,cleanup,all} ...]]
                                [-f FILTER [FILTER ...]] [--log-to-stdout]
 
     Process inputs for populate_ocp_cluster
@@ -403,10 +474,10 @@ def argument_parser():
       -r REPLICAS, --replicas REPLICAS
                             The max number of replicas to scale apps in the
                             longevity test
-      -t {populate,longevity,cleanup,all} [{populate,longevity,cleanup,all} ...],
-        --tests {populate,longevity,cleanup,all} [{populate,longevity,cleanup,all} ...]
+      -t {plan,populate,longevity,cleanup,all} [{plan,populate,longevity,cleanup,all} ...],
+        --tests {plan,populate,longevity,cleanup,all} [{plan,populate,longevity,cleanup,all} ...]
                             The specific tests to be run. Valid values
-                            are:populate_cluster, longevity, cleanup or all.
+                            are:plan, populate_cluster, longevity, cleanup or all.
       -f FILTER [FILTER ...], --filter FILTER [FILTER ...]
                             A filter to select which projects to deploy.These
                             values need to be passed as space separatedstrings
@@ -421,6 +492,9 @@ def argument_parser():
     Runs the populate test
       $ python -m populate_ocp_cluster --config ocp_config.yaml \
       --master ocp_master.lab.com --tests populate
+    Estimates whether the apps fit in the cluster before running the populate test
+      $ python -m populate_ocp_cluster --config ocp_config.yaml \
+      --master ocp_master.lab.com --tests plan populate
     Runs the populate test and filtering projects by label
       $ python -m populate_ocp_cluster --config ocp_config.yaml \
       --master ocp_master.lab.com --tests populate --filter label1 label2
@@ -477,9 +551,9 @@ def argument_parser():
         "-t",
         "--tests",
         nargs="+",
-        choices=["populate", "longevity", "cleanup", "all"],
+        choices=["plan", "populate", "longevity", "cleanup", "all"],
         default="all",
-        help="The specific tests to be run. Valid values are:" "populate_cluster, longevity, cleanup or all.",
+        help="The specific tests to be run. Valid values are:" "plan, populate_cluster, longevity, cleanup or all.",
     )
     parser.add_argument(
         "-f",
@@ -527,6 +601,8 @@ if __name__ == "__main__":
 
     populate_cluster.get_ocp_cluster_objects_from_template(args.config)
 
+    if "plan" in args.tests:
+        populate_cluster.plan_capacity(args.filter)
     if "populate" in args.tests or "all" in args.tests:
         populate_cluster.populate_cluster(args.filter)
     if "longevity" in args.tests or "all" in args.tests:
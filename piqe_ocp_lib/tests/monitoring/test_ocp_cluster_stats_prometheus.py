@@ -1,4 +1,5 @@
 import logging
+import time
 
 import pytest
 
@@ -35,3 +36,33 @@ class TestOcpClusterStatsPrometheus:
         assert isinstance(cluster_stats_dict, dict)
         if not cluster_stats_dict and len(cluster_stats_dict["result"]) == 0:
             assert False, f"Failed to get cluster stats for label {label}"
+
+    def test_get_cluster_stats_using_range_query(self, ocp_cluster_stats_prom):
+        logger.info("Get openshift cluster stats over the last hour from prometheus")
+        query = "namespace:container_cpu_usage:sum"
+        end = time.time()
+        matrix = ocp_cluster_stats_prom.get_cluster_stats_using_range_query(query, start=end - 3600, end=end, step=15)
+        assert matrix is not None, f"Failed to get cluster stats for query {query}"
+        assert len(matrix) > 0
+        for series in matrix:
+            assert len(series.timestamps) == len(series.values)
+        assert "openshift-monitoring" in matrix.label_values("namespace")
+
+    def test_get_cluster_stats_using_query_params(self, ocp_cluster_stats_prom):
+        logger.info("Get openshift cluster stats of many labels from prometheus")
+        labels = ["namespace:container_cpu_usage:sum", "namespace:container_memory_usage_bytes:sum"]
+        query_results = ocp_cluster_stats_prom.get_cluster_stats_using_query_params(labels)
+        assert set(query_results.keys()) == set(labels)
+        for label in labels:
+            assert isinstance(query_results[label].data, dict), f"Failed to get cluster stats for label {label}"
+
+    def test_iter_prometheus_series(self, ocp_cluster_stats_prom):
+        logger.info("Stream prometheus series labels")
+        series_count = 0
+        for series_labels in ocp_cluster_stats_prom.iter_prometheus_series(match=['up{job="kubelet"}']):
+            assert series_labels["__name__"] == "up"
+            assert series_labels["job"] == "kubelet"
+            series_count += 1
+        assert series_count > 0
+        prometheus_labels = ocp_cluster_stats_prom.iter_prometheus_ocp_labels()
+        assert "up" in prometheus_labels
@@ -0,0 +1,96 @@
+import logging
+
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.monitoring.ocp_prometheus_cache import PrometheusRangeCache
+
+logger = logging.getLogger(__loggername__)
+
+STEP = 15
+CHUNK_POINTS = 4
+# Start of a chunk, long enough ago for all chunks to be cached
+START = 1600000020
+
+
+class _Fetcher:
+    """
+    Fake range query returning one sample per step for two series
+    """
+
+    def __init__(self):
+        self.calls = list()
+
+    def __call__(self, query, start, end, step):
+        self.calls.append((start, end))
+        timestamps = range(int(start), int(end) + 1, int(step))
+        return [
+            {"metric": {"pod": pod}, "values": [[timestamp, str(timestamp % 100)] for timestamp in timestamps]}
+            for pod in ("pod-0", "pod-1")
+        ]
+
+
+class TestPrometheusRangeCache:
+    @pytest.mark.unit
+    def test_get_range_fetches_missing_chunks_only(self):
+        """
+        Verify that sub ranges are served from cached chunks and only missing chunks are fetched
+        :return: None
+        """
+        cache = PrometheusRangeCache(chunk_points=CHUNK_POINTS)
+        fetch = _Fetcher()
+        span = STEP * CHUNK_POINTS
+        matrix = cache.get_range("up", START, START + 2 * span - STEP, STEP, fetch)
+        assert fetch.calls == [(START, START + 2 * span - STEP)]
+        assert len(matrix) == 2
+        assert len(matrix.select(pod="pod-0")[0]) == 2 * CHUNK_POINTS
+        assert len(cache) == 2
+
+        # Sub range of cached chunks, start and end are aligned down to a multiple of step
+        matrix = cache.get_range("up", START + 22, START + span + 20, STEP, fetch)
+        assert len(fetch.calls) == 1
+        assert list(matrix.select(pod="pod-1")[0].timestamps) == [
+            START + 15,
+            START + 30,
+            START + 45,
+            START + 60,
+            START + 75,
+        ]
+
+        # Range extending past the cached chunks only fetches the new chunk
+        cache.get_range("up", START, START + 3 * span - STEP, STEP, fetch)
+        assert fetch.calls[1:] == [(START + 2 * span, START + 3 * span - STEP)]
+        assert cache.hits == 4
+        assert cache.misses == 3
+
+    @pytest.mark.unit
+    def test_recent_chunks_are_not_cached(self):
+        """
+        Verify that chunks which may still receive samples are fetched every time
+        :return: None
+        """
+        cache = PrometheusRangeCache(chunk_points=CHUNK_POINTS, min_chunk_age=10**10)
+        fetch = _Fetcher()
+        cache.get_range("up", START, START + 30, STEP, fetch)
+        cache.get_range("up", START, START + 30, STEP, fetch)
+        assert len(fetch.calls) == 2
+        assert len(cache) == 0
+
+    @pytest.mark.unit
+    def test_save_and_load(self, tmp_path):
+        """
+        Verify that cached chunks are reused after saving and loading the cache
+        :return: None
+        """
+        cache_file = str(tmp_path / "prometheus_cache.json.gz")
+        cache = PrometheusRangeCache(chunk_points=CHUNK_POINTS)
+        fetch = _Fetcher()
+        expected = cache.get_range("up", START, START + 100, STEP, fetch)
+        cache.save(cache_file)
+
+        loaded_cache = PrometheusRangeCache(chunk_points=CHUNK_POINTS)
+        assert loaded_cache.load(cache_file) == len(cache)
+        matrix = loaded_cache.get_range("up", START, START + 100, STEP, fetch)
+        assert len(fetch.calls) == 1
+        assert [list(series.values) for series in matrix] == [list(series.values) for series in expected]
+        assert PrometheusRangeCache(chunk_points=CHUNK_POINTS * 2).load(cache_file) == 0
@@ -1,9 +1,14 @@
+import json
 import logging
+import time
+from unittest import mock
 
 import pytest
+from requests.exceptions import ConnectionError, RequestException
 
 from piqe_ocp_lib import __loggername__
-from piqe_ocp_lib.api.monitoring.ocp_prometheus_client import OcpPrometheusClient
+from piqe_ocp_lib.api.monitoring.ocp_prometheus_client import OcpPrometheusClient, iter_json_array
+from piqe_ocp_lib.api.resources import OcpBase
 
 logger = logging.getLogger(__loggername__)
 
@@ -35,3 +40,62 @@ class TestOcpPrometheusClient:
         assert isinstance(prom_response, dict)
         if not prom_response and len(prom_response["data"]["result"]) == 0:
             assert False, f"Failed to retrieve the response for {api_path} api"
+
+    def test_batch_query(self, ocp_prometheus_client):
+        logger.info("Run a batch of queries concurrently against openshift prometheus")
+        queries = ["instance:node_cpu_utilisation:rate1m", "namespace:container_cpu_usage:sum", "up", "invalid query("]
+        query_results = ocp_prometheus_client.batch_query(queries, max_workers=4)
+        assert list(query_results.keys()) == queries
+        for query in queries[:3]:
+            assert query_results[query].error is None
+            assert query_results[query].data["resultType"] == "vector"
+            assert query_results[query].latency > 0
+        assert query_results["invalid query("].data is None
+        assert query_results["invalid query("].error
+
+    def test_query_range_uses_cache(self, ocp_prometheus_client):
+        logger.info("Run a range query twice and serve the second one from the range cache")
+        end = time.time() - 3600
+        query = "namespace:container_cpu_usage:sum"
+        matrix = ocp_prometheus_client.query_range(query, start=end - 3600, end=end, step=15)
+        assert matrix is not None and len(matrix) > 0
+        misses = ocp_prometheus_client.range_cache.misses
+        cached_matrix = ocp_prometheus_client.query_range(query, start=end - 1800, end=end, step=15)
+        assert ocp_prometheus_client.range_cache.misses == misses
+        assert 0 < cached_matrix.sample_count <= matrix.sample_count
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("use_cache", [True, False])
+    def test_query_range_failure(self, use_cache):
+        """
+        Verify that a refused connection or a response which isn't JSON makes the range query return None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock), mock.patch.object(
+            OcpBase, "k8s_client", new_callable=mock.PropertyMock
+        ):
+            prometheus_client = OcpPrometheusClient(kube_config_file="kubeconfig")
+        prometheus_client._prometheus_cache["prometheus_url"] = "https://prometheus:443/api"
+        prometheus_client.token_provider = mock.Mock()
+        prometheus_client.token_provider.get_token.return_value = "token"
+        not_json = mock.Mock(status_code=502)
+        not_json.json.side_effect = ValueError("Expecting value: line 1 column 1 (char 0)")
+        prometheus_client.session = mock.Mock()
+        prometheus_client.session.get.side_effect = [ConnectionError("Connection refused"), not_json]
+        assert prometheus_client.query_range("up", 0, 600, use_cache=use_cache) is None
+        assert prometheus_client.query_range("up", 0, 600, use_cache=use_cache) is None
+        assert prometheus_client.session.get.call_args[1]["params"]["query"] == "up"
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("chunk_size", [1, 3, 64, 65536])
+    def test_iter_json_array(self, chunk_size):
+        data = ["up", {"__name__": "up", "job": "a,]b"}, 12345, 1.5e3, True, None]
+        document = json.dumps({"status": "success", "data": data})
+        chunks = [document[i : i + chunk_size] for i in range(0, len(document), chunk_size)]
+        assert list(iter_json_array(chunks)) == data
+
+    @pytest.mark.unit
+    def test_iter_json_array_errors(self):
+        with pytest.raises(RequestException, match="parse error"):
+            list(iter_json_array(['{"status":"error","errorType":"bad_data","error":"parse error"}']))
+        with pytest.raises(ValueError):
+            list(iter_json_array(['{"status":"success","data":["up",1.5']))
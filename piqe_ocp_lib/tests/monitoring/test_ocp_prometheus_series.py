@@ -0,0 +1,79 @@
+import logging
+import math
+
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.monitoring.ocp_prometheus_series import (
+    MAX_POINTS_PER_SERIES,
+    PrometheusMatrix,
+    decode_matrix,
+    split_time_range,
+)
+
+logger = logging.getLogger(__loggername__)
+
+
+def _matrix_data(start, namespaces=("default", "openshift-monitoring"), samples=3):
+    return {
+        "resultType": "matrix",
+        "result": [
+            {
+                "metric": {"namespace": namespace, "job": "kubelet"},
+                "values": [[start + 15 * i, str(i) if i else "NaN"] for i in range(samples)],
+            }
+            for namespace in namespaces
+        ],
+    }
+
+
+class TestPrometheusSeries:
+    @pytest.mark.unit
+    def test_decode_matrix(self):
+        """
+        Verify that matrix results are decoded into typed arrays and indexed by label
+        :return: None
+        """
+        matrix = decode_matrix(_matrix_data(1600000000))
+        assert len(matrix) == 2
+        assert matrix.sample_count == 6
+        series = matrix.select(namespace="default")[0]
+        assert series.timestamps.typecode == "d"
+        assert list(series.timestamps) == [1600000000, 1600000015, 1600000030]
+        assert math.isnan(series.values[0])
+        assert list(series.values[1:]) == [1.0, 2.0]
+        assert matrix.label_values("namespace") == ["default", "openshift-monitoring"]
+        assert len(matrix.select(job="kubelet")) == 2
+        assert matrix.select(job="kubelet", namespace="missing") == []
+
+    @pytest.mark.unit
+    def test_decode_matrix_merges_series(self):
+        """
+        Verify that samples of consecutive range queries are appended to the same series
+        :return: None
+        """
+        matrix = PrometheusMatrix()
+        decode_matrix(_matrix_data(1600000000), matrix=matrix)
+        decode_matrix(_matrix_data(1600000045, namespaces=("default",)), matrix=matrix)
+        assert len(matrix) == 2
+        assert len(matrix.select(namespace="default")[0]) == 6
+        with pytest.raises(ValueError):
+            decode_matrix({"resultType": "vector", "result": []})
+
+    @pytest.mark.unit
+    def test_split_time_range(self):
+        """
+        Verify that long time ranges are split without overlapping samples
+        :return: None
+        """
+        assert split_time_range(0, 3600, 15) == [(0, 3600)]
+        step = 15
+        end = step * MAX_POINTS_PER_SERIES * 2
+        time_ranges = split_time_range(0, end, step)
+        assert len(time_ranges) == 3
+        for (_, previous_end), (next_start, _) in zip(time_ranges, time_ranges[1:]):
+            assert next_start == previous_end + step
+        assert all(
+            (range_end - range_start) / step + 1 <= MAX_POINTS_PER_SERIES for range_start, range_end in time_ranges
+        )
+        assert time_ranges[-1][1] == end
@@ -1,10 +1,14 @@
 import json
 from random import randint
+from unittest import mock
 
+from kubernetes.client.rest import ApiException
 from openshift.dynamic.client import ResourceInstance
 import pytest
 
+from piqe_ocp_lib.api.ocp_concurrency import AdaptiveConcurrencyLimiter
 from piqe_ocp_lib.api.resources import OcpApps, OcpBase, OcpProjects, OcpTemplates
+from piqe_ocp_lib.api.resources.ocp_apps import OcpBulkApply
 
 
 @pytest.fixture(scope="class")
@@ -78,3 +82,68 @@ class TestOcpApps:
         api_response = project_api_obj.delete_a_project(setup_params["test_project"])
         assert api_response.kind == "Namespace"
         assert api_response.status.phase == "Terminating"
+
+    @pytest.mark.unit
+    def test_bulk_apply_stages(self):
+        """
+        Verify objects are created in dependency stages with one resource lookup per kind
+        :return: None
+        """
+        objects = [
+            {"apiVersion": "v1", "kind": kind, "metadata": {"name": name}}
+            for kind, name in [
+                ("DeploymentConfig", "web"),
+                ("Service", "web"),
+                ("Secret", "web-1"),
+                ("DeploymentConfig", "db"),
+                ("PersistentVolumeClaim", "db"),
+                ("Secret", "web-2"),
+            ]
+        ]
+        created = list()
+
+        def create(body, namespace):
+            created.append(body["kind"])
+            if body["metadata"]["name"] == "db" and body["kind"] == "DeploymentConfig":
+                raise ApiException(status=409, reason="Conflict")
+            return body["metadata"]["name"]
+
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock) as mock_dyn_client:
+            mock_dyn_client.return_value.resources.get.return_value.create.side_effect = create
+            bulk_apply = OcpBulkApply(max_workers=4, kube_config_file="kubeconfig")
+            results = bulk_apply.create_objects(objects, "project")
+            assert mock_dyn_client.return_value.resources.get.call_count == 4
+
+        assert sorted(created[:3]) == ["PersistentVolumeClaim", "Secret", "Secret"]
+        assert created[3] == "Service"
+        assert created[4:] == ["DeploymentConfig", "DeploymentConfig"]
+        assert [(result.kind, result.stage) for result in results] == [
+            ("DeploymentConfig", 2),
+            ("Service", 1),
+            ("Secret", 0),
+            ("DeploymentConfig", 2),
+            ("PersistentVolumeClaim", 0),
+            ("Secret", 0),
+        ]
+        assert [result.response for result in results] == ["web", "web", "web-1", None, "db", "web-2"]
+        assert results[3].error == "409 Conflict"
+        assert all(result.latency >= 0 for result in results)
+
+    @pytest.mark.unit
+    def test_bulk_apply_concurrency_limiter(self):
+        """
+        Verify OcpBulkApply releases operations to the concurrency limiter and HTTP 429 responses decrease the limit
+        :return: None
+        """
+        limiter = AdaptiveConcurrencyLimiter(initial=4, window=2)
+        objects = [{"apiVersion": "v1", "kind": "Secret", "metadata": {"name": f"secret-{i}"}} for i in range(2)]
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock) as mock_dyn_client:
+            mock_dyn_client.return_value.resources.get.return_value.create.side_effect = [
+                "secret-0",
+                ApiException(status=429, reason="Too Many Requests"),
+            ]
+            bulk_apply = OcpBulkApply(max_workers=1, concurrency_limiter=limiter, kube_config_file="kubeconfig")
+            results = bulk_apply.create_objects(objects, "project")
+        assert [result.error for result in results] == [None, "429 Too Many Requests"]
+        assert (limiter.limit, limiter.in_flight) == (2, 0)
+        assert [(sample.limit, sample.throttled) for sample in limiter.history] == [(4, False), (2, True)]
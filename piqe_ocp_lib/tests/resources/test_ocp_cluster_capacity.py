@@ -0,0 +1,123 @@
+import logging
+from unittest import mock
+
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.ocp_quantity import parse_quantities, parse_quantity, ratio, to_millicores
+from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+from piqe_ocp_lib.api.resources.ocp_cluster_capacity import OcpClusterCapacity, get_pod_resources
+
+logger = logging.getLogger(__loggername__)
+
+
+def _container(cpu=None, memory=None):
+    requests = dict()
+    if cpu:
+        requests["cpu"] = cpu
+    if memory:
+        requests["memory"] = memory
+    return {"resources": {"requests": requests, "limits": dict(requests)}}
+
+
+def _pod(namespace, name, node_name, containers, init_containers=None):
+    return {
+        "metadata": {"namespace": namespace, "name": name},
+        "spec": {"nodeName": node_name, "containers": containers, "initContainers": init_containers or []},
+    }
+
+
+def _node(name, cpu, memory, unschedulable=False):
+    return {
+        "metadata": {"name": name},
+        "spec": {"unschedulable": unschedulable} if unschedulable else {},
+        "status": {"allocatable": {"cpu": cpu, "memory": memory, "pods": "250"}},
+    }
+
+
+@pytest.fixture(scope="session")
+def ocp_cluster_capacity(get_kubeconfig):
+    return OcpClusterCapacity(kube_config_file=get_kubeconfig)
+
+
+class TestOcpClusterCapacity:
+    def test_get_node_capacity(self, ocp_cluster_capacity):
+        """
+        Verify that capacity of all nodes is summarized
+        :param ocp_cluster_capacity: OcpClusterCapacity class object
+        :return: None
+        """
+        assert ocp_cluster_capacity.capture() is ocp_cluster_capacity
+        node_capacity = ocp_cluster_capacity.get_node_capacity()
+        logger.info("Node capacity : %s", node_capacity)
+        assert len(node_capacity) > 0
+        for capacity in node_capacity.values():
+            assert capacity["cpu_allocatable"] > 0
+            assert capacity["memory_allocatable"] > 0
+        assert len(ocp_cluster_capacity.get_namespace_capacity()) > 0
+
+    @pytest.mark.unit
+    def test_parse_quantity(self):
+        """
+        Verify binary, decimal and exponent quantities are converted to base units
+        :return: None
+        """
+        assert parse_quantity("16Gi") == 16 * 2**30
+        assert parse_quantity("3500m") == 3.5
+        assert parse_quantity("1e3") == 1000
+        assert parse_quantity("2k") == 2000
+        assert parse_quantity(None) == 0
+        assert parse_quantity(4) == 4
+        assert to_millicores("2") == 2000
+        assert list(parse_quantities(["1Ki", "1Mi", None])) == [1024, 2**20, 0]
+        assert ratio("500m", "2") == 0.25
+        assert ratio("1", "0") is None
+        with pytest.raises(ValueError):
+            parse_quantity("12 apples")
+
+    @pytest.mark.unit
+    def test_get_pod_resources(self):
+        """
+        Verify that pod resources are the max of the sum of containers and of any init container
+        :return: None
+        """
+        pod = _pod("ns", "pod", "node", [_container("250m", "128Mi"), _container("250m")], [_container("1", "64Mi")])
+        assert get_pod_resources(pod) == (1.0, 128 * 2**20, 1.0, 128 * 2**20)
+        pod["spec"]["overhead"] = {"cpu": "100m"}
+        assert get_pod_resources(pod)[0] == 1.1
+
+    @pytest.mark.unit
+    def test_capacity_summary(self):
+        """
+        Verify node, namespace and cluster summaries from captured nodes and pods
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            cluster_capacity = OcpClusterCapacity(kube_config_file="kubeconfig")
+        nodes = [_node("node-0", "4", "8Gi"), _node("node-1", "3500m", "4Gi", unschedulable=True)]
+        pods = [
+            _pod("ns-a", "pod-0", "node-0", [_container("500m", "1Gi")]),
+            _pod("ns-a", "pod-1", "node-1", [_container("1", "1Gi")]),
+            _pod("ns-b", "pod-2", "node-0", [_container("250m")]),
+            _pod("ns-b", "pending", None, [_container("2", "2Gi")]),
+        ]
+        cluster_capacity.capture(nodes=nodes, pods=pods)
+        node_capacity = cluster_capacity.get_node_capacity()
+        assert node_capacity["node-0"]["cpu_requests"] == 0.75
+        assert node_capacity["node-0"]["pods"] == 2
+        assert node_capacity["node-1"]["schedulable"] is False
+        assert node_capacity["node-1"]["cpu_allocatable"] == 3.5
+        namespace_capacity = cluster_capacity.get_namespace_capacity()
+        assert namespace_capacity["ns-b"]["cpu_requests"] == 2.25
+        assert namespace_capacity["ns-b"]["memory_limits"] == 2 * 2**30
+        assert cluster_capacity.get_cluster_capacity() == {
+            "cpu_allocatable": 4.0,
+            "memory_allocatable": 8 * 2**30,
+            "pods_allocatable": 250.0,
+            "cpu_requests": 0.75,
+            "memory_requests": 2**30,
+            "cpu_limits": 0.75,
+            "memory_limits": 2**30,
+            "pods": 2,
+        }
+        assert cluster_capacity.get_cluster_capacity(schedulable_only=False)["cpu_allocatable"] == 7.5
@@ -0,0 +1,114 @@
+import logging
+
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_cluster_snapshot import (
+    IMAGE_REGISTRY_NAMESPACE,
+    ROUTER_NAMESPACE,
+    OcpClusterSnapshot,
+    evaluate_component_health,
+    evaluate_nodes_health,
+)
+
+logger = logging.getLogger(__loggername__)
+
+
+def _node(name, ready="True", memory_pressure="False"):
+    return {
+        "metadata": {"name": name, "labels": {"node-role.kubernetes.io/worker": ""}},
+        "status": {
+            "conditions": [
+                {"type": "MemoryPressure", "status": memory_pressure},
+                {"type": "Ready", "status": ready},
+            ]
+        },
+    }
+
+
+@pytest.fixture(scope="session")
+def ocp_snapshot(get_kubeconfig):
+    return OcpClusterSnapshot(kube_config_file=get_kubeconfig).capture()
+
+
+class TestOcpClusterSnapshot:
+    def test_capture(self, ocp_snapshot):
+        """
+        Verify that all snapshot components are gathered
+        :param ocp_snapshot: OcpClusterSnapshot class object
+        :return: None
+        """
+        assert len(ocp_snapshot.nodes) > 0
+        assert ROUTER_NAMESPACE in ocp_snapshot.pods
+        assert IMAGE_REGISTRY_NAMESPACE in ocp_snapshot.deployments
+        assert len(ocp_snapshot.cluster_operators) > 0
+        assert ocp_snapshot.cluster_version["metadata"]["name"] == "version"
+        assert ocp_snapshot.capture_duration is not None
+
+    def test_get_nodes_by_role(self, ocp_snapshot):
+        """
+        Verify that master and worker nodes are filtered out of the snapshot nodes
+        :param ocp_snapshot: OcpClusterSnapshot class object
+        :return: None
+        """
+        master_nodes = ocp_snapshot.get_nodes(role="master")
+        worker_nodes = ocp_snapshot.get_nodes(role="worker")
+        logger.info("Snapshot has %s master and %s worker nodes", len(master_nodes), len(worker_nodes))
+        assert len(master_nodes) > 0
+        assert len(master_nodes) <= len(ocp_snapshot.nodes)
+        assert len(worker_nodes) <= len(ocp_snapshot.nodes)
+
+    def test_check_router_health(self, ocp_snapshot):
+        """
+        Verify the router health status (bool) and failure (dict) are returned from snapshot
+        :param ocp_snapshot: OcpClusterSnapshot class object
+        :return: None
+        """
+        is_router_healthy, unhealthy_router_info = ocp_snapshot.check_router_health()
+        assert isinstance(is_router_healthy, bool)
+        assert isinstance(unhealthy_router_info["router_pod"], list)
+
+    @pytest.mark.unit
+    def test_evaluate_nodes_health(self):
+        """
+        Verify that node conditions are evaluated without any API request
+        :return: None
+        """
+        all_nodes_healthy, node_health_info = evaluate_nodes_health([_node("node-0"), _node("node-1")])
+        assert all_nodes_healthy is True
+        assert node_health_info == {"node-0": [], "node-1": []}
+
+        all_nodes_healthy, node_health_info = evaluate_nodes_health(
+            [_node("node-0"), _node("node-1", ready="Unknown", memory_pressure="True")]
+        )
+        assert all_nodes_healthy is False
+        assert node_health_info["node-1"] == [
+            {"MemoryPressure": "The node memory is low"},
+            {"NodeReadyStatus": "Unknown"},
+        ]
+
+    @pytest.mark.unit
+    def test_evaluate_component_health(self):
+        """
+        Verify that pods readiness and deployment replicas are evaluated without any API request
+        :return: None
+        """
+        pods = [
+            {"metadata": {"name": "router-default-1"}, "status": {"conditions": [{"type": "Ready", "status": "True"}]}},
+            {
+                "metadata": {"name": "router-default-2"},
+                "status": {"conditions": [{"type": "Ready", "status": "False"}]},
+            },
+        ]
+        deployments = [
+            {
+                "metadata": {"name": "router-default"},
+                "status": {"replicas": 2, "availableReplicas": 1, "readyReplicas": 1},
+            }
+        ]
+        is_healthy, unhealthy_pod_names, replicas_matching = evaluate_component_health(
+            pods, deployments, ("router-default",)
+        )
+        assert is_healthy is False
+        assert unhealthy_pod_names == ["router-default-2"]
+        assert replicas_matching == {"router-default": False}
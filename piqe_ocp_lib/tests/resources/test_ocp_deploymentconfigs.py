@@ -0,0 +1,129 @@
+import logging
+from unittest import mock
+
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.ocp_concurrency import StagedPipeline
+from piqe_ocp_lib.api.resources import OcpBase, OcpDeploymentconfigs
+from piqe_ocp_lib.api.resources.ocp_deploymentconfigs import OcpDcReadinessTracker
+from piqe_ocp_lib.api.resources.ocp_informer import MODIFIED
+
+logger = logging.getLogger(__loggername__)
+
+
+def _dc(name, available):
+    return {
+        "kind": "DeploymentConfig",
+        "metadata": {"namespace": "project", "name": name, "resourceVersion": "1"},
+        "status": {
+            "conditions": [
+                {"type": "Available", "status": str(available)},
+                {"type": "Progressing", "status": "True"},
+            ]
+        },
+    }
+
+
+class TestOcpDeploymentconfigs:
+    @pytest.mark.unit
+    def test_read_dc_log(self):
+        """
+        Verify the dc log is cut on the server and streamed line by line
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            dc_api_obj = OcpDeploymentconfigs(kube_config_file="kubeconfig")
+        response = mock.Mock()
+        response.stream.return_value = iter([b"--> Scaling up\n--> Suc", b"cess\n"])
+        dc_api_obj.ocp_dcs.log.get.return_value = response
+
+        assert dc_api_obj.read_dc_log("project", "web", tail_lines=2) == ["--> Scaling up", "--> Success"]
+        dc_api_obj.ocp_dcs.log.get.assert_called_with(
+            namespace="project", name="web", query_params=[("tailLines", "2")], serialize=False
+        )
+        response.release_conn.assert_called_once()
+
+        response.stream.return_value = iter([b"2021-03-01T10:00:00Z --> Success\n"])
+        assert list(dc_api_obj.stream_dc_log("project", "web", since_seconds=60, timestamps=True)) == [
+            "2021-03-01T10:00:00Z --> Success"
+        ]
+        dc_api_obj.ocp_dcs.log.get.assert_called_with(
+            namespace="project",
+            name="web",
+            query_params=[("sinceSeconds", "60"), ("follow", "true"), ("timestamps", "true")],
+            serialize=False,
+        )
+
+    @pytest.mark.unit
+    def test_dc_readiness_pipeline(self):
+        """
+        Verify deployment configs pass a readiness stage through a shared watch without blocking stage workers
+        :return: None
+        """
+        dc_list = mock.Mock()
+        dc_list.to_dict.return_value = {"items": [_dc("web", True), _dc("db", False), _dc("cache", False)]}
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock) as mock_dyn_client:
+            mock_dyn_client.return_value.resources.get.return_value.get.return_value = dc_list
+            readiness_tracker = OcpDcReadinessTracker(kube_config_file="kubeconfig")
+        readiness_tracker.dc_informer.relist()
+        configured = list()
+        timed_out = list()
+        pipeline = StagedPipeline(name="Test")
+
+        def wait_for_dc(dc):
+            def on_ready(namespace, name, ready):
+                if ready:
+                    pipeline.put("configure", name)
+                else:
+                    timed_out.append(name)
+                pipeline.release()
+
+            pipeline.hold()
+            readiness_tracker.notify_when_ready("project", dc, on_ready, timeout=0.5 if dc == "cache" else 10)
+
+        pipeline.add_stage("app", lambda app: [app, app + "-db"] if app == "web" else ["cache"])
+        pipeline.add_stage("readiness", lambda dc: wait_for_dc(dc if dc != "web-db" else "db"))
+        pipeline.add_stage("configure", configured.append, workers=2)
+        with mock.patch.object(readiness_tracker.dc_informer, "start", return_value=True), readiness_tracker:
+            with pipeline:
+                pipeline.put("app", "web")
+                pipeline.put("app", "cache")
+                assert not pipeline.join(timeout=0.2)
+                assert configured == ["web"]
+                readiness_tracker.dc_informer._apply(MODIFIED, _dc("db", True))
+                assert pipeline.join(timeout=5)
+        assert configured == ["web", "db"]
+        assert timed_out == ["cache"]
+        assert readiness_tracker.pending == 0
+
+    @pytest.mark.unit
+    def test_dc_readiness_tracker_timeouts(self):
+        """
+        Verify waits time out without a running tracker, failing callbacks don't stop the expiry thread
+        and waiting callbacks are called as not ready on stop
+        :return: None
+        """
+        dc_list = mock.Mock()
+        dc_list.to_dict.return_value = {"items": [_dc("web", False)]}
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock) as mock_dyn_client:
+            mock_dyn_client.return_value.resources.get.return_value.get.return_value = dc_list
+            readiness_tracker = OcpDcReadinessTracker(kube_config_file="kubeconfig")
+        readiness_tracker.dc_informer.relist()
+        assert readiness_tracker.wait_for_ready("project", "web", timeout=0.1) is False
+        assert readiness_tracker.pending == 0
+
+        def failing_callback(namespace, dc, ready):
+            raise RuntimeError("callback failed")
+
+        results = list()
+        with mock.patch.object(readiness_tracker.dc_informer, "start", return_value=True):
+            readiness_tracker.start()
+            readiness_tracker.notify_when_ready("project", "web", failing_callback, timeout=0.05)
+            readiness_tracker.notify_when_ready("project", "web", lambda *args: results.append(args), timeout=0.1)
+            readiness_tracker.notify_when_ready("project", "db", lambda *args: results.append(args), timeout=60)
+            assert readiness_tracker.wait_for_ready("project", "web", timeout=0.3) is False
+            assert results == [("project", "web", False)]
+            readiness_tracker.stop()
+        assert results == [("project", "web", False), ("project", "db", False)]
+        assert readiness_tracker.pending == 0
@@ -0,0 +1,112 @@
+import gzip
+import logging
+import time
+from unittest import mock
+
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+from piqe_ocp_lib.api.resources.ocp_event_recorder import OcpEventLog, OcpEventRecorder, parse_event_timestamp
+from piqe_ocp_lib.api.resources.ocp_informer import ADDED, DELETED, MODIFIED
+
+logger = logging.getLogger(__loggername__)
+
+
+def _event(uid, namespace, reason, count, last_timestamp):
+    return {
+        "metadata": {"namespace": namespace, "name": f"{uid}.event", "uid": uid, "resourceVersion": str(count)},
+        "involvedObject": {"kind": "Pod", "name": f"{uid}-pod", "namespace": namespace},
+        "reason": reason,
+        "type": "Warning",
+        "count": count,
+        "message": f"{reason} {count}",
+        "source": {"component": "kubelet"},
+        "lastTimestamp": last_timestamp,
+    }
+
+
+class TestOcpEventRecorder:
+    @pytest.mark.unit
+    def test_parse_event_timestamp(self):
+        """
+        Verify event timestamps with and without fractional seconds are converted to epoch seconds
+        :return: None
+        """
+        assert parse_event_timestamp("1970-01-01T00:01:00Z") == 60
+        assert parse_event_timestamp("1970-01-01T00:01:00.500000Z") == 60.5
+        assert parse_event_timestamp(None) is None
+
+    @pytest.mark.unit
+    def test_record_and_query_events(self, tmp_path):
+        """
+        Verify events are deduplicated on (uid, count), written in indexed blocks and queried by time range,
+        namespace and reason
+        :return: None
+        """
+        log_path = str(tmp_path / "events.log.gz")
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            recorder = OcpEventRecorder(log_path, block_records=2, kube_config_file="kubeconfig")
+        recorder._on_event(ADDED, _event("a", "ns-a", "BackOff", 1, "1970-01-01T00:01:00Z"), None)
+        # Same count again i.e. after a relist
+        recorder._on_event(ADDED, _event("a", "ns-a", "BackOff", 1, "1970-01-01T00:01:00Z"), None)
+        recorder._on_event(MODIFIED, _event("a", "ns-a", "BackOff", 2, "1970-01-01T00:02:00Z"), None)
+        recorder._on_event(ADDED, _event("b", "ns-b", "FailedScheduling", 1, "1970-01-01T00:03:00Z"), None)
+        recorder._on_event(DELETED, _event("a", "ns-a", "BackOff", 2, "1970-01-01T00:02:00Z"), None)
+        assert recorder.recorded == 3
+        assert recorder.duplicates == 1
+
+        event_log = OcpEventLog(log_path)
+        # Only the full block is written until records are flushed
+        assert [entry["records"] for entry in event_log.iter_index()] == [2]
+        assert [record["count"] for record in recorder.query(namespace="ns-a")] == [1, 2]
+        assert [entry["records"] for entry in event_log.iter_index()] == [2, 1]
+        assert [record["uid"] for record in event_log.query(reason="FailedScheduling")] == ["b"]
+        assert [record["message"] for record in event_log.query(start=90, end=150)] == ["BackOff 2"]
+        assert list(event_log.query(namespace="ns-c")) == []
+        # Blocks are gzip members, so the whole log is readable as one gzip file
+        with gzip.open(log_path, "rt") as f:
+            assert len(f.readlines()) == 3
+
+    @pytest.mark.unit
+    def test_restart_and_checkpoint(self, tmp_path):
+        """
+        Verify a recorder restarted on an existing log doesn't record events already in the log again and
+        writes buffered records every checkpoint_interval without waiting for the next event
+        :return: None
+        """
+        log_path = str(tmp_path / "events.log.gz")
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            recorder = OcpEventRecorder(log_path, kube_config_file="kubeconfig")
+        recorder._on_event(ADDED, _event("a", "ns-a", "BackOff", 1, "1970-01-01T00:01:00Z"), None)
+        recorder._on_event(MODIFIED, _event("a", "ns-a", "BackOff", 2, "1970-01-01T00:02:00Z"), None)
+        recorder._on_event(ADDED, _event("b", "ns-b", "FailedScheduling", 1, "1970-01-01T00:03:00Z"), None)
+        recorder.flush()
+
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            recorder = OcpEventRecorder(log_path, checkpoint_interval=0.1, kube_config_file="kubeconfig")
+        assert recorder._recorded_counts == {"a": 2, "b": 1}
+        cluster_events = [_event("a", "ns-a", "BackOff", 2, "1970-01-01T00:02:00Z")]
+
+        def start(timeout=None):
+            for event in cluster_events:
+                recorder._on_event(ADDED, event, None)
+            return True
+
+        recorder.event_informer = mock.Mock()
+        recorder.event_informer.start.side_effect = start
+        recorder.event_informer.list.return_value = cluster_events
+        assert recorder.start()
+        try:
+            assert recorder.duplicates == 1 and recorder.recorded == 0
+            # Expired events of the log are forgotten once the initial list is received
+            assert recorder._recorded_counts == {"a": 2}
+            recorder._on_event(MODIFIED, _event("a", "ns-a", "BackOff", 3, "1970-01-01T00:04:00Z"), None)
+            deadline = time.monotonic() + 5
+            while len(list(recorder.event_log.iter_index())) < 2 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert [entry["records"] for entry in recorder.event_log.iter_index()] == [3, 1]
+        finally:
+            recorder.stop(timeout=5)
+        assert not recorder._checkpoint_thread.is_alive()
+        assert [record["count"] for record in recorder.event_log.query(namespace="ns-a")] == [1, 2, 3]
@@ -0,0 +1,86 @@
+import logging
+from unittest import mock
+
+from openshift.dynamic.resource import ResourceInstance
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources import OcpBase, OcpEvents
+from piqe_ocp_lib.api.resources.ocp_events import OcpEventStore
+
+logger = logging.getLogger(__loggername__)
+
+
+def _event(name, kind, involved_object_name, message):
+    return {
+        "kind": "Event",
+        "metadata": {"namespace": "project", "name": name, "resourceVersion": "1"},
+        "involvedObject": {"kind": kind, "name": involved_object_name, "namespace": "project"},
+        "message": message,
+    }
+
+
+class TestOcpEvents:
+    @pytest.mark.unit
+    def test_list_dc_events_field_selector(self):
+        """
+        Verify DC and pod events are filtered on the server by involved object
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock), mock.patch.object(
+            OcpBase, "k8s_client", new_callable=mock.PropertyMock
+        ):
+            events_obj = OcpEvents(kube_config_file="kubeconfig")
+        events_obj.ocp_pod_obj = mock.Mock()
+        events_obj.ocp_pod_obj.list_pods_in_a_deployment.return_value = ["web-1-a", "web-1-b"]
+        events_obj.ocp_events = mock.Mock()
+        events_obj.ocp_events.get.return_value.items = ["event"]
+
+        assert events_obj.list_dc_events_in_a_namespace("project", "web") == ["event"]
+        events_obj.ocp_events.get.assert_called_with(
+            namespace="project", field_selector="involvedObject.kind=DeploymentConfig,involvedObject.name=web"
+        )
+        pod_events = [
+            ResourceInstance(None, _event(f"{pod}.1", "Pod", pod, "Pulled")).attributes
+            for pod in ("web-1-a", "db-1-a", "web-1-b")
+        ]
+        events_obj.ocp_events.get.reset_mock()
+        events_obj.ocp_events.get.return_value.items = pod_events
+        assert events_obj.list_pod_events_in_a_namespace("project", "web") == [pod_events[0], pod_events[2]]
+        events_obj.ocp_events.get.assert_called_once_with(namespace="project", field_selector="involvedObject.kind=Pod")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("namespace", ["project", None])
+    def test_ocp_event_store(self, namespace):
+        """
+        Verify events are looked up in a synced event store of a namespace or of all namespaces by
+        involved object without listing them
+        :param namespace: Namespace watched by the event store
+        :return: None
+        """
+        event_list = mock.Mock()
+        event_list.to_dict.return_value = {
+            "items": [
+                _event("web.1", "DeploymentConfig", "web", "Created"),
+                _event("web-1-a.1", "Pod", "web-1-a", "Pulled"),
+                _event("db-1-a.1", "Pod", "db-1-a", "Pulled"),
+            ]
+        }
+        with mock.patch.object(
+            OcpBase, "dyn_client", new_callable=mock.PropertyMock
+        ) as mock_dyn_client, mock.patch.object(OcpBase, "k8s_client", new_callable=mock.PropertyMock):
+            mock_dyn_client.return_value.resources.get.return_value.get.return_value = event_list
+            events_obj = OcpEvents(kube_config_file="kubeconfig")
+            event_store = OcpEventStore(namespace, kube_config_file="kubeconfig")
+        events_obj.ocp_pod_obj = mock.Mock()
+        events_obj.ocp_pod_obj.list_pods_in_a_deployment.return_value = ["web-1-a"]
+        events_obj.ocp_events = mock.Mock()
+        event_store.event_informer.relist()
+
+        with mock.patch.object(OcpEventStore, "is_ready", new_callable=mock.PropertyMock, return_value=True):
+            dc_events = events_obj.list_dc_events_in_a_namespace("project", "web", event_store=event_store)
+            pod_events = events_obj.list_pod_events_in_a_namespace("project", "web", event_store=event_store)
+            assert event_store.is_watching("other") is (namespace is None)
+        assert [event.message for event in dc_events] == ["Created"]
+        assert [event.involvedObject.name for event in pod_events] == ["web-1-a"]
+        events_obj.ocp_events.get.assert_not_called()
@@ -173,3 +173,50 @@ class TestOcpHealthChecker:
             assert len(unhealthy_operators_list) == 0
         else:
             assert len(unhealthy_operators_list) > 0
+
+    def test_check_cluster_health(self, ocp_health):
+        """
+        Verify that all health checks are evaluated against a single cluster snapshot
+        :param ocp_health: OcpHealthChecker class object
+        :return: None
+        """
+        logger.info("Check health of openshift cluster using a single snapshot")
+        snapshot = ocp_health.take_snapshot()
+        cluster_health = ocp_health.check_cluster_health(snapshot=snapshot)
+        assert set(cluster_health.keys()) == {
+            "node_health",
+            "master_nodes_health",
+            "worker_nodes_health",
+            "router_health",
+            "image_registry_health",
+            "cluster_version_operator_health",
+            "cluster_operators_health",
+        }
+        all_nodes_healthy, node_health_info = cluster_health["node_health"]
+        assert isinstance(all_nodes_healthy, bool)
+        assert len(node_health_info) == len(snapshot.nodes)
+        all_cluster_operators_healthy, unhealthy_operators_list = cluster_health["cluster_operators_health"]
+        assert all_cluster_operators_healthy == (len(unhealthy_operators_list) == 0)
+
+    def test_run_health_report(self, ocp_health):
+        """
+        Verify that a health report is collected with duration and request count of every check
+        :param ocp_health: OcpHealthChecker class object
+        :return: None
+        """
+        logger.info("Collect health report of openshift cluster")
+        health_report = ocp_health.run_health_report(checks=["node_health", "cluster_operators_health"])
+        assert [result.name for result in health_report.results] == [
+            "cluster_snapshot",
+            "node_health",
+            "cluster_operators_health",
+        ]
+        snapshot_result = health_report.get_result("cluster_snapshot")
+        assert snapshot_result.request_count > 0
+        assert snapshot_result.response_bytes > 0
+        assert health_report.get_result("node_health").request_count == 0
+        logger.info("Health report : %s", health_report.to_json())
+
+        health_report = ocp_health.run_health_report(checks=["node_health"], use_snapshot=False)
+        assert health_report.get_result("node_health").request_count > 0
+        assert health_report.to_junit_xml().startswith("<testsuites>")
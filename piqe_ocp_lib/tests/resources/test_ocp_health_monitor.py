@@ -0,0 +1,44 @@
+import logging
+
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_health_monitor import HEALTH_MONITOR_COMPONENTS, OcpHealthMonitor
+
+logger = logging.getLogger(__loggername__)
+
+
+@pytest.fixture(scope="class")
+def ocp_health_monitor(get_kubeconfig):
+    health_monitor = OcpHealthMonitor(kube_config_file=get_kubeconfig, watch_timeout=10)
+    assert health_monitor.start(timeout=60)
+    yield health_monitor
+    health_monitor.stop()
+
+
+class TestOcpHealthMonitor:
+    def test_get_health_state(self, ocp_health_monitor):
+        """
+        Verify that health of every monitored component is returned from in-memory state
+        :param ocp_health_monitor: OcpHealthMonitor class object
+        :return: None
+        """
+        health_state = ocp_health_monitor.get_health_state()
+        logger.info("Health state : %s", health_state)
+        assert set(health_state.keys()) == set(HEALTH_MONITOR_COMPONENTS)
+        for component, (is_healthy, unhealthy) in health_state.items():
+            assert isinstance(is_healthy, bool)
+            if is_healthy:
+                assert len(unhealthy) == 0
+
+    def test_get_transitions(self, ocp_health_monitor):
+        """
+        Verify that initial state of the watched objects is recorded in the transitions timeline
+        :param ocp_health_monitor: OcpHealthMonitor class object
+        :return: None
+        """
+        node_transitions = ocp_health_monitor.get_transitions(component="nodes")
+        assert len(node_transitions) >= len(ocp_health_monitor.node_informer.list())
+        assert all(transition.component == "nodes" for transition in node_transitions)
+        timestamps = [transition.timestamp for transition in ocp_health_monitor.get_transitions()]
+        assert timestamps == sorted(timestamps)
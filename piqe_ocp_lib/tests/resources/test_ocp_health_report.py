@@ -0,0 +1,100 @@
+import json
+import logging
+from xml.etree import ElementTree
+
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_health_report import ApiRequestTracker, HealthCheckResult, HealthReport
+
+logger = logging.getLogger(__loggername__)
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+    def tell(self):
+        return len(self.data)
+
+
+class _RestClient:
+    def request(self, method, url, **kwargs):
+        return _Response(b"x" * 10)
+
+
+class _ApiClient:
+    def __init__(self):
+        self.rest_client = _RestClient()
+
+
+def _report():
+    report = HealthReport(cluster="https://api.example.com:6443")
+    report.add_result(HealthCheckResult("node_health", True, {"node-0": []}, 0.5, 1, 2048, None))
+    report.add_result(HealthCheckResult("router_health", False, {"router_pod": ["router-1"]}, 0.25, 2, 1024, None))
+    report.add_result(HealthCheckResult("web_console_health", False, None, 0.1, 0, 0, "ConnectionError: refused"))
+    return report
+
+
+class TestHealthReport:
+    @pytest.mark.unit
+    def test_report_summary(self):
+        """
+        Verify that the report aggregates health, duration, requests and bytes of all checks
+        :return: None
+        """
+        report = _report()
+        assert report.is_healthy is False
+        assert report.duration == pytest.approx(0.85)
+        assert report.request_count == 3
+        assert report.response_bytes == 3072
+        assert report.get_result("router_health").unhealthy_components == {"router_pod": ["router-1"]}
+        assert report.get_result("api_server_health") is None
+
+    @pytest.mark.unit
+    def test_to_json(self):
+        """
+        Verify that the report is serialized to JSON
+        :return: None
+        """
+        report_dict = json.loads(_report().to_json())
+        assert report_dict["healthy"] is False
+        assert [check["name"] for check in report_dict["checks"]] == [
+            "node_health",
+            "router_health",
+            "web_console_health",
+        ]
+        assert report_dict["checks"][0]["response_bytes"] == 2048
+
+    @pytest.mark.unit
+    def test_to_junit_xml(self):
+        """
+        Verify that unhealthy checks are reported as failures and failed checks as errors
+        :return: None
+        """
+        testsuite = ElementTree.fromstring(_report().to_junit_xml()).find("testsuite")
+        assert testsuite.get("tests") == "3"
+        assert testsuite.get("failures") == "1"
+        assert testsuite.get("errors") == "1"
+        testcases = {testcase.get("name"): testcase for testcase in testsuite.findall("testcase")}
+        assert testcases["node_health"].get("time") == "0.500"
+        assert testcases["router_health"].find("failure") is not None
+        assert testcases["web_console_health"].find("error").get("message") == "ConnectionError: refused"
+        properties = {prop.get("name"): prop.get("value") for prop in testcases["node_health"].find("properties")}
+        assert properties == {"request_count": "1", "response_bytes": "2048"}
+
+    @pytest.mark.unit
+    def test_api_request_tracker(self):
+        """
+        Verify that requests are only counted while the tracker is active
+        :return: None
+        """
+        api_client = _ApiClient()
+        with ApiRequestTracker(api_client) as tracker:
+            api_client.rest_client.request("GET", "/api/v1/nodes")
+            with ApiRequestTracker(api_client) as nested_tracker:
+                api_client.rest_client.request("GET", "/api/v1/pods")
+        api_client.rest_client.request("GET", "/api/v1/namespaces")
+        assert tracker.request_count == 2
+        assert tracker.response_bytes == 20
+        assert nested_tracker.request_count == 1
@@ -0,0 +1,45 @@
+import logging
+
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_informer import OcpInformer
+from piqe_ocp_lib.api.resources.ocp_nodes import OcpNodes
+
+logger = logging.getLogger(__loggername__)
+
+
+@pytest.fixture(scope="class")
+def node_informer(get_kubeconfig):
+    informer = OcpInformer(api_version="v1", kind="Node", watch_timeout=10, kube_config_file=get_kubeconfig)
+    informer.add_indexer("hostname", lambda node: [node["metadata"]["labels"].get("kubernetes.io/hostname")])
+    assert informer.start(timeout=60)
+    yield informer
+    informer.stop()
+
+
+class TestOcpInformer:
+    def test_list(self, node_informer, get_kubeconfig):
+        """
+        Verify that the informer store holds the same nodes as a list request
+        :param node_informer: OcpInformer class object watching nodes
+        :return: None
+        """
+        node_names = OcpNodes(kube_config_file=get_kubeconfig).get_all_node_names()
+        informer_node_names = [node["metadata"]["name"] for node in node_informer.list()]
+        logger.info("Informer store holds %s nodes", len(informer_node_names))
+        assert sorted(informer_node_names) == sorted(node_names)
+        assert node_informer.is_running
+
+    def test_get_and_by_index(self, node_informer):
+        """
+        Verify that nodes are returned from the store by name and by index
+        :param node_informer: OcpInformer class object watching nodes
+        :return: None
+        """
+        node = node_informer.list()[0]
+        node_name = node["metadata"]["name"]
+        assert node_informer.get(node_name)["metadata"]["name"] == node_name
+        hostname = node["metadata"]["labels"]["kubernetes.io/hostname"]
+        assert node_name in [n["metadata"]["name"] for n in node_informer.by_index("hostname", hostname)]
+        assert node_informer.get("not-a-node") is None
@@ -0,0 +1,119 @@
+import logging
+import time
+from unittest import mock
+
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+from piqe_ocp_lib.api.resources.ocp_metrics_sampler import OcpMetricsSampler, RingBuffer, load_samples, percentile
+
+logger = logging.getLogger(__loggername__)
+
+
+def _metrics_list(items):
+    metrics_list = mock.Mock()
+    metrics_list.to_dict.return_value = {"items": items}
+    return metrics_list
+
+
+@pytest.fixture(scope="session")
+def ocp_metrics_sampler(get_kubeconfig):
+    return OcpMetricsSampler(interval=1, capacity=10, kube_config_file=get_kubeconfig)
+
+
+class TestOcpMetricsSampler:
+    def test_sampler(self, ocp_metrics_sampler):
+        """
+        Verify that node and pod metrics are sampled in background
+        :param ocp_metrics_sampler: OcpMetricsSampler class object
+        :return: None
+        """
+        ocp_metrics_sampler.start()
+        time.sleep(3.5)
+        ocp_metrics_sampler.stop(timeout=10)
+        assert ocp_metrics_sampler.sample_count >= 3
+        node_names = ocp_metrics_sampler.get_names("node")
+        assert len(node_names) > 0
+        assert len(ocp_metrics_sampler.get_names("pod")) > 0
+        node_summary = ocp_metrics_sampler.summary("node")
+        logger.info("Node usage summary : %s", node_summary)
+        assert node_summary[node_names[0]]["samples"] == ocp_metrics_sampler.sample_count
+        assert node_summary[node_names[0]]["memory"]["max"] > 0
+
+    @pytest.mark.unit
+    def test_ring_buffer(self):
+        """
+        Verify that the oldest samples are overwritten once the buffer is full
+        :return: None
+        """
+        buffer = RingBuffer(capacity=3)
+        for i in range(5):
+            buffer.append(i, i * 10, i * 100)
+        assert len(buffer) == 3
+        assert list(buffer.column("timestamp")) == [2, 3, 4]
+        assert list(buffer.column("memory")) == [200, 300, 400]
+
+    @pytest.mark.unit
+    def test_percentile(self):
+        """
+        Verify percentiles are interpolated between closest ranks
+        :return: None
+        """
+        assert percentile([], 50) is None
+        assert percentile([3, 1, 2], 50) == 2
+        assert percentile([1, 2, 3, 4], 50) == 2.5
+        assert percentile(range(101), 95) == 95
+
+    @pytest.mark.unit
+    def test_sample_summary_and_export(self, tmp_path):
+        """
+        Verify quantities are converted, pod containers are summed and samples are exported
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            sampler = OcpMetricsSampler(capacity=2, kube_config_file="kubeconfig")
+        sampler.node_metrics, sampler.pod_metrics = mock.Mock(), mock.Mock()
+        sampler.node_metrics.get.side_effect = [
+            _metrics_list([{"metadata": {"name": "node-0"}, "usage": {"cpu": cpu, "memory": "1Gi"}}])
+            for cpu in ("500m", "1", "1500m")
+        ]
+        pod = {"metadata": {"namespace": "default", "name": "pod-0"}}
+        container = {"usage": {"cpu": "250m", "memory": "512Ki"}}
+        sampler.pod_metrics.get.return_value = _metrics_list([dict(pod, containers=[container, container])])
+        for _ in range(3):
+            sampler.sample()
+        node_summary = sampler.summary("node")["node-0"]
+        assert node_summary["samples"] == 2
+        assert node_summary["cpu"] == {"p50": 1.25, "p95": 1.475, "max": 1.5}
+        assert node_summary["memory"]["max"] == 1024**3
+        assert sampler.summary("pod")["default/pod-0"]["cpu"]["max"] == 0.5
+
+        samples_file = str(tmp_path / "samples.json.gz")
+        sampler.export(samples_file)
+        samples = load_samples(samples_file)
+        assert set(samples) == {"node:node-0", "pod:default/pod-0"}
+        assert list(samples["node:node-0"]["cpu"]) == [1.0, 1.5]
+
+    @pytest.mark.unit
+    def test_sampler_survives_errors_and_drops_gone_pods(self):
+        """
+        Verify unexpected errors don't stop the sampling thread and samples of pods which are gone are dropped
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            sampler = OcpMetricsSampler(interval=0.01, kube_config_file="kubeconfig")
+        sampler.node_metrics, sampler.pod_metrics = mock.Mock(), mock.Mock()
+        sampler.node_metrics.get.side_effect = [ConnectionResetError("reset")] + [_metrics_list([])] * 1000
+        container = {"usage": {"cpu": "250m", "memory": "512Ki"}}
+        pods = [{"metadata": {"namespace": "default", "name": f"pod-{i}"}, "containers": [container]} for i in range(2)]
+        sampler.pod_metrics.get.side_effect = [_metrics_list(pods)] + [_metrics_list(pods[1:])] * 1000
+        sampler.start()
+        for _ in range(500):
+            if sampler.sample_count >= 2:
+                break
+            time.sleep(0.01)
+        assert sampler.is_running
+        sampler.stop(timeout=5)
+        assert sampler.sample_count >= 2
+        assert sampler.get_names("pod") == ["default/pod-1"]
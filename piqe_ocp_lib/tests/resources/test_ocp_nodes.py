@@ -1,9 +1,15 @@
 import logging
+import time
+from unittest import mock
 
+from kubernetes.client.rest import ApiException
+from kubernetes.stream.ws_client import ERROR_CHANNEL, STDERR_CHANNEL, STDOUT_CHANNEL
 import pytest
+import yaml
 
 from piqe_ocp_lib import __loggername__
-from piqe_ocp_lib.api.resources import OcpNodes
+from piqe_ocp_lib.api.resources import OcpBase, OcpNodes
+from piqe_ocp_lib.api.resources.ocp_nodes import NSENTER_COMMAND
 
 logger = logging.getLogger(__loggername__)
 
@@ -175,7 +181,6 @@ class TestOcpNodes:
             assert False, "Failed to get total memory from cluster"
         assert isinstance(total_memory, int)
 
-    @pytest.mark.skip(reason="MPQEENABLE-396 expected_retcode assertion fails")
     def test_execute_command_on_a_node(self, setup_params):
         """
         On each node perform the following:
@@ -216,14 +221,238 @@ class TestOcpNodes:
             command_api_response = node_api_obj.execute_command_on_a_node(
                 node_name=node_name, command_to_execute="bogus"
             )
-            expected_retcode = 1
+            # Exit code of the shell for a command which is not found
+            expected_retcode = 127
             expected_stdout = b""
             assert command_api_response[0] == expected_retcode
             assert command_api_response[1] == expected_stdout
             assert type(command_api_response[2]) is bytes
             decoded_str = command_api_response[2].decode("utf-8")
             logger.info(f"Decoded stderr string {decoded_str}")
-            assert decoded_str.find("executable file not found in $PATH") >= 1
+            assert decoded_str.find("not found") >= 1
+        node_api_obj.delete_debug_pods()
+
+    @pytest.mark.unit
+    def test_execute_command_on_a_node_streams_output(self):
+        """
+        Verify that output is streamed from the exec stream of a reused debug pod and the exit code is read
+        from the status channel
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            node_api_obj = OcpNodes(kube_config_file="kubeconfig")
+        node_api_obj.ocp_pods = mock.Mock()
+        node_api_obj.ocp_pods.get.return_value.status.phase = "Running"
+        frames = [
+            {STDOUT_CHANNEL: "line 1\n"},
+            {STDERR_CHANNEL: "warning\n", STDOUT_CHANNEL: "line 2\n"},
+            {
+                ERROR_CHANNEL: yaml.safe_dump(
+                    {"status": "Failure", "details": {"causes": [{"reason": "ExitCode", "message": "3"}]}}
+                )
+            },
+        ]
+
+        def exec_stream(*args, **kwargs):
+            ws_client = mock.Mock()
+            channels = dict()
+            ws_client.is_open.side_effect = lambda: bool(remaining_frames)
+            ws_client.update.side_effect = lambda timeout=0: channels.update(
+                remaining_frames.pop(0) if remaining_frames else {}
+            )
+            ws_client.read_channel.side_effect = lambda channel: channels.pop(channel, "")
+            return ws_client
+
+        received = list()
+        with mock.patch(
+            "piqe_ocp_lib.api.resources.ocp_nodes.stream", side_effect=exec_stream
+        ) as mock_stream, mock.patch(
+            "piqe_ocp_lib.api.resources.ocp_nodes.ApiClient"
+        ) as mock_api_client, mock.patch.object(
+            OcpBase, "k8s_client", new_callable=mock.PropertyMock
+        ):
+            for _ in range(2):
+                remaining_frames = list(frames)
+                ret, out, err = node_api_obj.execute_command_on_a_node(
+                    "node-0", "uptime", output_callback=lambda channel, data: received.append((channel, data))
+                )
+                assert (ret, out, err) == (3, b"line 1\nline 2\n", b"warning\n")
+        assert received[:3] == [("stdout", "line 1\n"), ("stdout", "line 2\n"), ("stderr", "warning\n")]
+        assert mock_stream.call_args[1]["command"] == NSENTER_COMMAND + ["sh", "-c", "uptime"]
+        # Every exec call gets its own api client, stream swaps the request method of the client it uses
+        assert mock_api_client.call_count == 2
+        # The debug pod is looked up once and reused
+        assert node_api_obj.ocp_pods.get.call_count == 1
+        node_api_obj.ocp_pods.create.assert_not_called()
+
+    @pytest.mark.unit
+    def test_get_debug_pod_creates_missing_pod(self):
+        """
+        Verify that a debug pod is created when it does not exist and waited for until it is running
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            node_api_obj = OcpNodes(kube_config_file="kubeconfig")
+        node_api_obj.ocp_pods = mock.Mock()
+        node_api_obj.ocp_pods.get.side_effect = ApiException(status=404)
+        node_api_obj.ocp_pods.watch.return_value = iter(
+            [{"object": {"status": {"phase": "Pending"}}}, {"object": {"status": {"phase": "Running"}}}]
+        )
+        assert node_api_obj.get_debug_pod("node-0") == "execute-on-node-0"
+        assert node_api_obj.get_debug_pod("node-0") == "execute-on-node-0"
+        node_api_obj.ocp_pods.create.assert_called_once()
+        assert node_api_obj.ocp_pods.create.call_args[1]["body"]["spec"]["nodeSelector"] == {
+            "kubernetes.io/hostname": "node-0"
+        }
+
+    def test_execute_command_on_nodes(self, setup_params):
+        """
+        Verify that a command runs on all nodes and results are yielded for every node
+        :param setup_params:
+        :return:
+        """
+        node_api_obj = setup_params["node_api_obj"]
+        node_names = node_api_obj.get_all_node_names()
+        results = list(node_api_obj.execute_command_on_nodes("df -h /", max_workers=5, timeout=300))
+        assert sorted(result.node_name for result in results) == sorted(node_names)
+        for result in results:
+            logger.info("Node %s completed in %.2fs", result.node_name, result.duration)
+            assert result.returncode == 0
+            assert b"/" in result.stdout
+
+    @pytest.mark.unit
+    def test_execute_command_on_nodes_yields_as_completed(self):
+        """
+        Verify results are yielded in order of completion and debug pods are cleaned up
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            node_api_obj = OcpNodes(kube_config_file="kubeconfig")
+
+        sessions = set()
+
+        def execute(node_name, command, namespace, timeout, session):
+            sessions.add(session)
+            time.sleep(0.2 if node_name == "slow" else 0)
+            return 0, node_name.encode(), b""
+
+        with mock.patch.object(node_api_obj, "execute_command_on_a_node", side_effect=execute), mock.patch.object(
+            node_api_obj, "delete_debug_pods"
+        ) as mock_delete_debug_pods:
+            results = list(node_api_obj.execute_command_on_nodes("uptime", node_names=["slow", "fast"], max_workers=2))
+        assert [result.node_name for result in results] == ["fast", "slow"]
+        assert results[0].stdout == b"fast"
+        # Both nodes ran in the debug pods of the call, which are the only ones deleted
+        (session,) = sessions
+        assert session is not None
+        mock_delete_debug_pods.assert_called_once_with(namespace="default", session=session)
+
+    @pytest.mark.unit
+    def test_delete_debug_pods_of_a_session(self):
+        """
+        Verify that deleting the debug pods of a session keeps the pods shared with other calls
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            node_api_obj = OcpNodes(kube_config_file="kubeconfig")
+        node_api_obj.ocp_pods = mock.Mock()
+        node_api_obj.ocp_pods.get.return_value.status.phase = "Running"
+        assert node_api_obj.get_debug_pod("node-0") == "execute-on-node-0"
+        assert node_api_obj.get_debug_pod("node-0", session="a1b2") == "execute-on-node-0-a1b2"
+        node_api_obj.delete_debug_pods(session="a1b2")
+        assert node_api_obj.ocp_pods.delete.call_args[1]["label_selector"] == (
+            "app=piqe-node-debug,piqe-node-debug-session=a1b2"
+        )
+        assert node_api_obj._debug_pods == {("default", "execute-on-node-0")}
+        node_api_obj.delete_debug_pods()
+        assert node_api_obj.ocp_pods.delete.call_args[1]["label_selector"] == "app=piqe-node-debug"
+        assert node_api_obj._debug_pods == set()
+
+    @pytest.mark.unit
+    def test_drain_nodes(self):
+        """
+        Verify that nodes are cordoned, DaemonSet pods are skipped and evictions blocked by a disruption
+        budget are retried until pods are deleted
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            node_api_obj = OcpNodes(kube_config_file="kubeconfig")
+        node_api_obj.ocp_nodes = mock.Mock()
+        node_api_obj._core_v1 = mock.Mock()
+
+        def pod(name, node_name, owner_kind="ReplicaSet"):
+            metadata = {"namespace": "default", "name": name, "uid": name, "ownerReferences": [{"kind": owner_kind}]}
+            return {"metadata": metadata, "spec": {"nodeName": node_name}}
+
+        pods = {
+            ("default", "web-0"): pod("web-0", "node-0"),
+            ("default", "web-1"): pod("web-1", "node-1"),
+            ("default", "dns-0"): pod("dns-0", "node-0", owner_kind="DaemonSet"),
+        }
+        pod_informer = mock.Mock()
+        pod_informer.start.return_value = True
+        pod_informer.get.side_effect = lambda name, namespace: pods.get((namespace, name))
+        pod_informer.by_index.side_effect = lambda index_name, node_name: [
+            obj for obj in list(pods.values()) if obj["spec"]["nodeName"] == node_name
+        ]
+        blocked_evictions = [ApiException(status=429)]
+
+        def evict(name, namespace, body):
+            if name == "web-1" and blocked_evictions:
+                raise blocked_evictions.pop()
+            obj = pods.pop((namespace, name))
+            handler = pod_informer.add_event_handler.call_args[0][0]
+            handler("DELETED", obj, obj)
+
+        node_api_obj.core_v1.create_namespaced_pod_eviction.side_effect = evict
+        with mock.patch("piqe_ocp_lib.api.resources.ocp_nodes.OcpInformer", return_value=pod_informer):
+            drain_results = node_api_obj.drain_nodes(["node-0", "node-1"], timeout=10, retry_interval=0.01)
+        assert node_api_obj.ocp_nodes.patch.call_count == 2
+        assert drain_results["node-0"].drained and drain_results["node-0"].evicted_pods == 1
+        assert drain_results["node-1"].drained and drain_results["node-1"].remaining_pods == []
+        assert node_api_obj.core_v1.create_namespaced_pod_eviction.call_count == 3
+        assert list(pods) == [("default", "dns-0")]
+        pod_informer.stop.assert_called_once()
+
+    @pytest.mark.unit
+    def test_drain_nodes_failed_eviction(self):
+        """
+        Verify that pods whose eviction failed with a non retryable error are reported right away
+        instead of being waited for until the timeout
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            node_api_obj = OcpNodes(kube_config_file="kubeconfig")
+        node_api_obj.ocp_nodes = mock.Mock()
+        node_api_obj._core_v1 = mock.Mock()
+        pods = {
+            ("default", name): {
+                "metadata": {"namespace": "default", "name": name, "uid": name, "ownerReferences": []},
+                "spec": {"nodeName": "node-0"},
+            }
+            for name in ("web-0", "web-1")
+        }
+        pod_informer = mock.Mock()
+        pod_informer.start.return_value = True
+        pod_informer.get.side_effect = lambda name, namespace: pods.get((namespace, name))
+        pod_informer.by_index.return_value = list(pods.values())
+
+        def evict(name, namespace, body):
+            if name == "web-1":
+                raise ApiException(status=403)
+            obj = pods.pop((namespace, name))
+            handler = pod_informer.add_event_handler.call_args[0][0]
+            handler("DELETED", obj, obj)
+
+        node_api_obj.core_v1.create_namespaced_pod_eviction.side_effect = evict
+        start_time = time.monotonic()
+        with mock.patch("piqe_ocp_lib.api.resources.ocp_nodes.OcpInformer", return_value=pod_informer):
+            drain_results = node_api_obj.drain_nodes(["node-0"], timeout=30, retry_interval=0.01)
+        assert time.monotonic() - start_time < 5
+        assert not drain_results["node-0"].drained
+        assert drain_results["node-0"].evicted_pods == 1
+        assert drain_results["node-0"].remaining_pods == ["default/web-1"]
+        assert node_api_obj.core_v1.create_namespaced_pod_eviction.call_count == 2
 
     def test_get_all_master_nodes(self, setup_params):
         """
@@ -370,6 +599,46 @@ class TestOcpNodes:
         api_response_node_status = node_api_obj.are_worker_nodes_ready()
         assert api_response_node_status is True
 
+    def test_get_nodes_readiness(self, setup_params):
+        """
+        Verify that readiness of all nodes is returned from a single list
+        :param setup_params:
+        :return:
+        """
+        node_api_obj = setup_params["node_api_obj"]
+        nodes_readiness = node_api_obj.get_nodes_readiness()
+        logger.info("Nodes readiness : %s", nodes_readiness)
+        assert sorted(nodes_readiness.nodes) == sorted(node_api_obj.get_all_node_names())
+        assert nodes_readiness.ready == all(nodes_readiness.nodes.values())
+
+    @pytest.mark.unit
+    def test_get_nodes_readiness_from_informer(self):
+        """
+        Verify that readiness is read from a running node informer without any request
+        :return: None
+        """
+
+        def node(name, role, ready):
+            return {
+                "metadata": {"name": name, "labels": {f"node-role.kubernetes.io/{role}": ""}},
+                "status": {"conditions": [{"type": "Ready", "status": ready}]},
+            }
+
+        node_informer = mock.Mock(is_running=True, has_synced=True)
+        node_informer.list.return_value = [
+            node("master-0", "master", "True"),
+            node("worker-0", "worker", "True"),
+            node("worker-1", "worker", "Unknown"),
+        ]
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            node_api_obj = OcpNodes(kube_config_file="kubeconfig", node_informer=node_informer)
+        node_api_obj.ocp_nodes = mock.Mock()
+        assert node_api_obj.get_nodes_readiness().nodes == {"master-0": True, "worker-0": True, "worker-1": False}
+        assert node_api_obj.are_master_nodes_ready() is True
+        assert node_api_obj.are_worker_nodes_ready() is False
+        assert node_api_obj.are_all_nodes_ready() is False
+        node_api_obj.ocp_nodes.get.assert_not_called()
+
     def test_get_total_allocatable_mem_cpu(self, setup_params):
         """
         Verify that method returns total allocatable memory/cpu
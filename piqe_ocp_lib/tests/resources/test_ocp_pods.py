@@ -1,13 +1,24 @@
 import logging
+from unittest import mock
 
 import pytest
 
 from piqe_ocp_lib import __loggername__
-from piqe_ocp_lib.api.resources import OcpNodes, OcpPods
+from piqe_ocp_lib.api.resources import OcpBase, OcpNodes, OcpPods
+from piqe_ocp_lib.api.resources.ocp_pods import LogLine, OcpPodIndex, iter_log_lines, split_log_timestamp
 
 logger = logging.getLogger(__loggername__)
 
 
+def _log_response(data, chunk_size=7):
+    """
+    Mock of a urllib3 response streaming data in chunks of chunk_size bytes
+    """
+    response = mock.Mock()
+    response.stream.return_value = iter([data[i : i + chunk_size] for i in range(0, len(data), chunk_size)])
+    return response
+
+
 @pytest.fixture(scope="class")
 def setup_params(get_kubeconfig):
     params_dict = {}
@@ -37,3 +48,98 @@ class TestOcpPods:
             if len(pods_list) > 0:
                 pod_exists = True
         assert pod_exists is True
+
+    def test_ocp_pod_index(self, setup_params, get_kubeconfig):
+        """
+        Verify that pods indexed by node match pods listed with a node field selector
+        :param setup_params:
+        :return:
+        """
+        pods_api_obj = setup_params["pods_api_obj"]
+        nodes_api_obj = setup_params["nodes_api_obj"]
+        pod_index = OcpPodIndex(kube_config_file=get_kubeconfig)
+        for node_name in nodes_api_obj.get_all_node_names():
+            assert sorted(pod_index.get_pod_names_on_node(node_name)) == sorted(
+                pods_api_obj.list_of_pods_in_a_node(node_name)
+            )
+
+    @pytest.mark.unit
+    def test_ocp_pod_index_lookups(self):
+        """
+        Verify pods are indexed by node and by owner, including the deployment config of their annotation
+        :return: None
+        """
+
+        def pod(name, node_name, owner):
+            return {
+                "metadata": {
+                    "namespace": "project",
+                    "name": name,
+                    "resourceVersion": "1",
+                    "ownerReferences": [{"kind": "ReplicationController", "name": owner}],
+                    "annotations": {"openshift.io/deployment-config.name": owner.rsplit("-", 1)[0]},
+                },
+                "spec": {"nodeName": node_name},
+            }
+
+        pod_list = mock.Mock()
+        pod_list.to_dict.return_value = {
+            "items": [
+                pod("web-1-a", "node-0", "web-1"),
+                pod("web-2-b", "node-1", "web-2"),
+                pod("db-1-c", "node-0", "db-1"),
+            ]
+        }
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock) as mock_dyn_client:
+            mock_dyn_client.return_value.resources.get.return_value.get.return_value = pod_list
+            pod_index = OcpPodIndex(namespace="project", kube_config_file="kubeconfig")
+            assert sorted(pod_index.get_pod_names_on_node("node-0")) == ["db-1-c", "web-1-a"]
+            assert pod_index.get_pod_names_on_node("node-2") == []
+            web_pods = pod_index.get_pods_of_owner("DeploymentConfig", "web", "project")
+            assert sorted(p["metadata"]["name"] for p in web_pods) == ["web-1-a", "web-2-b"]
+            assert len(pod_index.get_pods_of_owner("ReplicationController", "db-1", "project")) == 1
+            # Pods are listed once for all lookups
+            assert pod_list.to_dict.call_count == 1
+
+    @pytest.mark.unit
+    def test_iter_log_lines(self):
+        """
+        Verify log lines split across chunks are reassembled and the connection is released
+        :return: None
+        """
+        response = _log_response(b"first line\nsecond line\nlast line without newline")
+        assert list(iter_log_lines(response)) == ["first line", "second line", "last line without newline"]
+        response.release_conn.assert_called_once()
+        assert split_log_timestamp("2021-03-01T10:00:00.12Z GET /") == ("2021-03-01T10:00:00.120000000Z", "GET /")
+        assert split_log_timestamp("2021-03-01T10:00:00Z ready")[0] == "2021-03-01T10:00:00.000000000Z"
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("follow", [False, True])
+    def test_stream_pods_logs(self, follow):
+        """
+        Verify logs of several pods are merged by timestamp and requested with server side options
+        :return: None
+        """
+        logs = {
+            "web-a": b"2021-03-01T10:00:00.1Z a1\n2021-03-01T10:00:00.3Z a2\n",
+            "web-b": b"2021-03-01T10:00:00.25Z b1\n2021-03-01T10:00:01Z b2\n",
+        }
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock), mock.patch.object(
+            OcpBase, "k8s_client", new_callable=mock.PropertyMock
+        ):
+            pods_api_obj = OcpPods(kube_config_file="kubeconfig")
+        pods_api_obj.core_v1 = mock.Mock()
+        pods_api_obj.core_v1.read_namespaced_pod_log.side_effect = lambda name, namespace, **kwargs: _log_response(
+            logs[name]
+        )
+        log_lines = list(pods_api_obj.stream_pods_logs("project", ["web-a", "web-b"], follow=follow, tail_lines=10))
+        if follow:
+            # Lines are yielded as received, in order within every pod
+            assert [line.message for line in log_lines if line.pod == "web-a"] == ["a1", "a2"]
+            assert len(log_lines) == 4
+        else:
+            assert [line.message for line in log_lines] == ["a1", "b1", "a2", "b2"]
+            assert log_lines[0] == LogLine("2021-03-01T10:00:00.100000000Z", "web-a", "a1")
+        pods_api_obj.core_v1.read_namespaced_pod_log.assert_called_with(
+            "web-b", "project", follow=follow, _preload_content=False, tail_lines=10, timestamps=True
+        )
@@ -1,11 +1,15 @@
+import copy
 import logging
+from unittest import mock
 
 from kubernetes.client.rest import ApiException
+from openshift.dynamic.discovery import LazyDiscoverer, ResourceGroup
 import pytest
 
 from piqe_ocp_lib import __loggername__
 from piqe_ocp_lib.api import ocp_exceptions
-from piqe_ocp_lib.api.resources import OcpProjects
+from piqe_ocp_lib.api.resources import OcpBase, OcpProjects
+from piqe_ocp_lib.api.resources.ocp_informer import ADDED, DELETED, MODIFIED
 
 logger = logging.getLogger(__loggername__)
 
@@ -22,6 +26,36 @@ def setup_params(get_kubeconfig):
     return params_dict
 
 
+class FakeNamespaceInformer:
+    """
+    Namespace informer replaying the events sent by the test
+    """
+
+    instance = None
+
+    def __init__(self, *args, **kwargs):
+        self.namespaces = dict()
+        self.handlers = list()
+        FakeNamespaceInformer.instance = self
+
+    def add_event_handler(self, handler):
+        self.handlers.append(handler)
+
+    def start(self, timeout=None):
+        return True
+
+    def stop(self, timeout=None):
+        pass
+
+    def get(self, name, namespace=None):
+        return self.namespaces.get(name)
+
+    def send(self, event_type, name, phase="Active"):
+        obj = {"metadata": {"name": name}, "status": {"phase": phase}}
+        for handler in self.handlers:
+            handler(event_type, obj, None)
+
+
 class TestOcpProjects:
     def __setup(self, setup_params, project_name):
         """
@@ -696,3 +730,150 @@ class TestOcpProjects:
         #
         finally:
             self.__cleanup(setup_params, setup_params["project1"]["name"])
+
+    @pytest.mark.unit
+    def test_bulk_create_and_delete_projects(self):
+        """
+        Verify bulk project operations complete when both the request succeeded and the namespace watch observed
+        the project, and report failures and progress
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            project_api_obj = OcpProjects(kube_config_file="kubeconfig")
+        project_api_obj.create_ocp_projects = mock.Mock()
+        project_api_obj.ocp_projects = mock.Mock()
+
+        def create(body):
+            name = body["metadata"]["name"]
+            if name == "existing":
+                raise ApiException(status=409, reason="Conflict")
+            FakeNamespaceInformer.instance.send(ADDED, name)
+
+        def delete(name):
+            if name == "missing":
+                raise ApiException(status=404, reason="Not Found")
+            if name == "forbidden":
+                raise ApiException(status=403, reason="Forbidden")
+            FakeNamespaceInformer.instance.send(DELETED, name, phase="Terminating")
+
+        project_api_obj.create_ocp_projects.create.side_effect = create
+        project_api_obj.ocp_projects.delete.side_effect = delete
+        progress = list()
+        with mock.patch("piqe_ocp_lib.api.resources.ocp_projects.OcpInformer", FakeNamespaceInformer):
+            results = project_api_obj.create_projects(
+                {"project-0": {"test": "0"}, "project-1": None, "existing": None},
+                progress_callback=lambda result, done, total: progress.append((done, total)),
+            )
+            assert results["project-0"].success and results["project-1"].success
+            assert results["existing"] == ("existing", False, results["existing"].latency, "409 Conflict")
+            project_api_obj.ocp_projects.patch.assert_called_once_with(
+                body={"metadata": {"labels": {"test": "0"}}}, name="project-0"
+            )
+            assert sorted(progress) == [(1, 3), (2, 3), (3, 3)]
+
+            results = project_api_obj.delete_projects(["project-0", "missing", "forbidden"], timeout=5)
+            assert results["project-0"].success and results["missing"].success
+            assert results["forbidden"].error == "403 Forbidden"
+
+    @pytest.mark.unit
+    def test_track_project_deletion(self):
+        """
+        Verify namespace conditions are streamed while a project is deleted and objects left are counted with
+        metadata-only lists
+        :return: None
+        """
+
+        def resource(name, group, counts):
+            resource = mock.Mock(group=group, verbs=["list", "get"])
+            resource.name = name
+            resource.get.side_effect = lambda **kwargs: mock.Mock(
+                items=[{}] if counts else [],
+                metadata={"continue": None, "remainingItemCount": max(0, counts.pop(0) - 1)},
+            )
+            return resource
+
+        def terminating(conditions):
+            return {
+                "metadata": {"name": "project"},
+                "status": {
+                    "phase": "Terminating",
+                    "conditions": [{"type": t, "status": "True", "message": m} for t, m in conditions.items()],
+                },
+            }
+
+        class TerminatingNamespaceInformer(FakeNamespaceInformer):
+            def start(self, timeout=None):
+                self.namespaces["project"] = terminating({})
+                self.send_object(MODIFIED, terminating({"NamespaceContentRemaining": "pods has 2 instances"}))
+                self.send_object(DELETED, terminating({}))
+                return True
+
+            def send_object(self, event_type, obj):
+                for handler in self.handlers:
+                    handler(event_type, obj, None)
+
+        pods = resource("pods", "", [2])
+        dcs = resource("deploymentconfigs", "apps.openshift.io", [1])
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            project_api_obj = OcpProjects(kube_config_file="kubeconfig")
+            project_api_obj._namespaced_resources = [pods, dcs]
+            with mock.patch("piqe_ocp_lib.api.resources.ocp_projects.OcpInformer", TerminatingNamespaceInformer):
+                statuses = list(project_api_obj.track_project_deletion("project", timeout=10, count_interval=0))
+        assert statuses[0].remaining == {"pods": 2, "deploymentconfigs.apps.openshift.io": 1}
+        assert statuses[0].conditions["NamespaceContentRemaining"] == ("True", None, "pods has 2 instances")
+        assert statuses[-1].deleted is True
+        assert pods.get.call_args[1]["header_params"]["Accept"].startswith(
+            "application/json;as=PartialObjectMetadataList"
+        )
+        assert pods.get.call_args[1]["limit"] == 1
+
+    @pytest.mark.unit
+    def test_count_namespace_objects_discovery(self):
+        """
+        Verify that only namespaced resources of preferred versions which can be listed are counted, leaving out
+        cluster scoped resources, list kinds and resources of other versions
+        :return: None
+        """
+        discovery = {
+            "api/v1": [
+                {"name": "pods", "kind": "Pod", "namespaced": True, "verbs": ["get", "list"]},
+                {"name": "pods/log", "kind": "Pod", "namespaced": True, "verbs": ["get"]},
+                {"name": "nodes", "kind": "Node", "namespaced": False, "verbs": ["get", "list"]},
+                {"name": "bindings", "kind": "Binding", "namespaced": True, "verbs": ["create"]},
+            ],
+            "apis/apps.openshift.io/v1": [
+                {"name": "deploymentconfigs", "kind": "DeploymentConfig", "namespaced": True, "verbs": ["list"]},
+            ],
+            "apis/apps/v1beta1": [
+                {"name": "deployments", "kind": "Deployment", "namespaced": True, "verbs": ["list"]},
+            ],
+        }
+        api_client = mock.Mock()
+        api_client.request.side_effect = lambda method, path, **kwargs: mock.Mock(
+            resources=copy.deepcopy(discovery[path])
+        )
+        counts = {"pods": 3, "deploymentconfigs": 1}
+        api_client.get.side_effect = lambda resource, **kwargs: mock.Mock(
+            items=[{}], metadata={"continue": None, "remainingItemCount": counts[resource.name] - 1}
+        )
+        discoverer = LazyDiscoverer.__new__(LazyDiscoverer)
+        discoverer.client = api_client
+        discoverer._write_cache = mock.Mock()
+        discoverer._cache = {"resources": {"api": {"": {}}, "apis": {"apps.openshift.io": {}, "apps": {}}}}
+        discoverer._LazyDiscoverer__update_cache = False
+        discoverer._LazyDiscoverer__resources = {
+            "api": {"": {"v1": ResourceGroup(True)}},
+            "apis": {"apps.openshift.io": {"v1": ResourceGroup(True)}, "apps": {"v1beta1": ResourceGroup(False)}},
+        }
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock) as mock_dyn_client:
+            project_api_obj = OcpProjects(kube_config_file="kubeconfig")
+            mock_dyn_client.return_value.resources = discoverer
+            assert project_api_obj.count_namespace_objects("project") == {
+                "pods": 3,
+                "deploymentconfigs.apps.openshift.io": 1,
+            }
+        assert sorted(resource.name for resource in project_api_obj._get_namespaced_resources()) == [
+            "deploymentconfigs",
+            "pods",
+        ]
+        assert api_client.get.call_count == 2
@@ -1,11 +1,14 @@
 import json
 import logging
 from random import randint
+import re
+from unittest import mock
 
 import pytest
 
 from piqe_ocp_lib import __loggername__
-from piqe_ocp_lib.api.resources import OcpProjects, OcpTemplates
+from piqe_ocp_lib.api.resources import OcpBase, OcpProjects, OcpTemplates
+from piqe_ocp_lib.api.resources.ocp_templates import OcpTemplateCache, generate_expression_value, process_template
 
 logger = logging.getLogger(__loggername__)
 
@@ -207,3 +210,61 @@ class TestOcpTemplates:
         # Cleanup
         #
         self.__cleanup(setup_params)
+
+    @pytest.mark.unit
+    def test_generate_expression_value(self):
+        """
+        Verify values generated from parameter expressions match their character ranges and lengths
+        :return: None
+        """
+        assert re.fullmatch(r"[a-zA-Z0-9]{40}", generate_expression_value("[a-zA-Z0-9]{40}"))
+        assert re.fullmatch(r"admin[A-Z0-9]{4}", generate_expression_value("admin[A-Z0-9]{4}"))
+        assert re.fullmatch(r"[0-9]{8}", generate_expression_value("[\\d]{8}"))
+        assert re.fullmatch(r"\w{12}", generate_expression_value("[\\w]{12}"))
+        with pytest.raises(ValueError):
+            generate_expression_value("[a-z]{256}")
+
+    @pytest.mark.unit
+    def test_process_template(self):
+        """
+        Verify local processing substitutes parameters, generates values and adds template labels
+        :return: None
+        """
+        with open("piqe_ocp_lib/tests/resources/templates/httpd.json") as t:
+            template = json.load(t)
+        processed_template = process_template(template)
+        assert "${" not in json.dumps(processed_template["objects"])
+        assert "${NAME}" in json.dumps(template["objects"])
+        service = processed_template["objects"][0]
+        assert service["metadata"]["name"] == "httpd-example"
+        assert service["metadata"]["labels"] == {"app": "httpd-example", "template": "httpd-example"}
+        secrets = {p["name"]: p["value"] for p in processed_template["parameters"] if p.get("generate")}
+        assert all(re.fullmatch(r"[a-zA-Z0-9]{40}", value) for value in secrets.values())
+
+        template = {
+            "metadata": {"name": "replicas"},
+            "parameters": [{"name": "REPLICAS", "value": "3"}, {"name": "NAME", "required": True}],
+            "objects": [{"spec": {"replicas": "${{REPLICAS}}", "name": "${NAME}"}}],
+        }
+        template["parameters"][1]["value"] = "web"
+        assert process_template(template)["objects"][0]["spec"] == {"replicas": 3, "name": "web"}
+        del template["parameters"][1]["value"]
+        assert process_template(template) is None
+
+    @pytest.mark.unit
+    def test_template_cache(self):
+        """
+        Verify templates are fetched once and returned as copies
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock) as mock_dyn_client:
+            mock_dyn_client.return_value.resources.get.return_value.get.return_value.to_dict.side_effect = lambda: {
+                "metadata": {"name": "httpd-example", "resourceVersion": "1"},
+                "parameters": [{"name": "NAME", "value": "httpd-example"}],
+            }
+            template_cache = OcpTemplateCache(ttl=None, kube_config_file="kubeconfig")
+            for ident in range(3):
+                template = template_cache.get_a_template_in_a_namespace("httpd-example")
+                template_cache.enumerate_unprocessed_template(template, ident)
+                assert template["parameters"][0]["value"] == f"httpd-example-{ident}"
+        assert (template_cache.hits, template_cache.misses) == (2, 1)
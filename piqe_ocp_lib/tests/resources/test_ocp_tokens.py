@@ -0,0 +1,59 @@
+import logging
+from unittest import mock
+
+from kubernetes.client.rest import ApiException
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_tokens import CachedToken, OcpTokenProvider
+
+logger = logging.getLogger(__loggername__)
+
+
+@pytest.fixture(scope="session")
+def ocp_token_provider(get_kubeconfig):
+    return OcpTokenProvider(kube_config_file=get_kubeconfig)
+
+
+class TestOcpTokenProvider:
+    def test_get_token(self, ocp_token_provider):
+        """
+        Verify that a token is returned and cached for the default service account
+        :param ocp_token_provider: OcpTokenProvider class object
+        :return: None
+        """
+        ocp_token_provider.invalidate()
+        bearer_token = ocp_token_provider.get_token()
+        assert bearer_token
+        with mock.patch.object(ocp_token_provider, "_request_token") as mock_request_token:
+            assert ocp_token_provider.get_token() == bearer_token
+            mock_request_token.assert_not_called()
+
+    def test_get_token_fallback_to_secret(self, ocp_token_provider):
+        """
+        Verify that the token secret is used when the TokenRequest API fails
+        :param ocp_token_provider: OcpTokenProvider class object
+        :return: None
+        """
+        ocp_token_provider.invalidate()
+        with mock.patch.object(
+            ocp_token_provider.core_v1, "create_namespaced_service_account_token", side_effect=ApiException(status=404)
+        ), mock.patch.object(
+            ocp_token_provider.ocp_secret, "get_long_live_bearer_token", return_value="secret-token"
+        ) as mock_secret_token:
+            assert ocp_token_provider.get_token() == "secret-token"
+            mock_secret_token.assert_called_once_with(sub_string="default-token", namespace="default")
+        ocp_token_provider.invalidate()
+
+    def test_get_token_refresh_before_expiry(self, ocp_token_provider):
+        """
+        Verify that a cached token is refreshed shortly before it expires
+        :param ocp_token_provider: OcpTokenProvider class object
+        :return: None
+        """
+        ocp_token_provider.invalidate()
+        expiring_token = CachedToken("expiring-token", 0, "TokenRequest")
+        with mock.patch.object(ocp_token_provider, "_request_token", return_value=expiring_token):
+            assert ocp_token_provider.get_token() == "expiring-token"
+        bearer_token = ocp_token_provider.get_token()
+        assert bearer_token and bearer_token != "expiring-token"
@@ -0,0 +1,85 @@
+import logging
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from piqe_ocp_lib import __loggername__
+from piqe_ocp_lib.api.resources.ocp_base import OcpBase
+from piqe_ocp_lib.api.tasks.populate_cluster.capacity_planner import (
+    OcpCapacityPlanner,
+    PodRequest,
+    first_fit_decreasing,
+    get_template_pod_requests,
+)
+
+logger = logging.getLogger(__loggername__)
+
+
+def _workload(kind, name, cpu, memory, replicas=1):
+    container = {"resources": {"requests": {"cpu": cpu, "memory": memory}}}
+    return {
+        "kind": kind,
+        "metadata": {"name": name},
+        "spec": {"replicas": replicas, "template": {"spec": {"containers": [container]}}},
+    }
+
+
+class TestOcpCapacityPlanner:
+    @pytest.mark.unit
+    def test_first_fit_decreasing(self):
+        """
+        Verify largest pods are placed first and pods left over are reported as unschedulable
+        :return: None
+        """
+        pod_requests = [
+            PodRequest("project", "small", "small", 0.5, 2**30, 4),
+            PodRequest("project", "large", "large", 3, 2**30, 2),
+        ]
+        unschedulable, cpu_placed, memory_placed, pods_placed = first_fit_decreasing(
+            [4, 4], [8 * 2**30, 8 * 2**30], [110, 2], pod_requests
+        )
+        assert unschedulable == [1, 0]
+        assert list(cpu_placed) == [4, 3.5]
+        assert list(pods_placed) == [3, 2]
+        assert list(memory_placed) == [3 * 2**30, 2 * 2**30]
+
+    @pytest.mark.unit
+    def test_get_template_pod_requests(self):
+        """
+        Verify requests and replicas of the workloads of a processed template
+        :return: None
+        """
+        processed_template = {
+            "objects": [
+                {"kind": "Service", "metadata": {"name": "frontend"}},
+                _workload("DeploymentConfig", "frontend", "250m", "512Mi", replicas=1),
+                _workload("StatefulSet", "database", "1", "1Gi", replicas=3),
+            ]
+        }
+        assert get_template_pod_requests(processed_template, replicas=5) == [
+            ("frontend", 0.25, 512 * 2**20, 5),
+            ("database", 1.0, 2**30, 3),
+        ]
+
+    @pytest.mark.unit
+    def test_plan(self):
+        """
+        Verify the pods of all app instances are planned and templates are processed once
+        :return: None
+        """
+        with mock.patch.object(OcpBase, "dyn_client", new_callable=mock.PropertyMock):
+            capacity_planner = OcpCapacityPlanner(kube_config_file="kubeconfig")
+        capacity_planner.template_obj = mock.Mock()
+        capacity_planner.template_obj.create_a_processed_template.return_value = {
+            "objects": [_workload("DeploymentConfig", "httpd", "1", "1Gi")]
+        }
+        app = SimpleNamespace(app_template="httpd-example", app_params=None, app_replicas=2, app_count=3)
+        projects = [SimpleNamespace(project_name=f"project-{i}", apps=[app]) for i in range(2)]
+        free_capacity = {"node-0": {"cpu": 4, "memory": 16 * 2**30, "pods": 250}}
+        capacity_plan = capacity_planner.plan(projects, free_capacity=free_capacity)
+        assert capacity_planner.template_obj.create_a_processed_template.call_count == 1
+        assert capacity_plan.total_pods == 12
+        assert capacity_plan.unschedulable_pods == 8
+        assert capacity_plan.unschedulable_by_app == {"project-0/httpd-example": 2, "project-1/httpd-example": 6}
+        assert capacity_plan.node_requests["node-0"]["pods"] == 4
@@ -0,0 +1,140 @@
+from threading import Thread
+import time
+
+import pytest
+
+from piqe_ocp_lib.api.ocp_concurrency import AdaptiveConcurrencyLimiter, RateLimiter, StagedPipeline
+
+
+class TestOcpConcurrency:
+    @pytest.mark.unit
+    def test_adaptive_concurrency_limiter(self):
+        """
+        Verify the concurrency limit grows while it's reached without overload and shrinks on throttling,
+        latency increase and errors
+        :return: None
+        """
+        limiter = AdaptiveConcurrencyLimiter(initial=2, max_limit=4, window=2)
+
+        def run_window(latency, error=False):
+            for _ in range(limiter.limit):
+                assert limiter.acquire(timeout=1)
+            assert not limiter.acquire(timeout=0.01)
+            for _ in range(2):
+                limiter.release(latency, error=error)
+            while limiter.in_flight:
+                limiter.release(latency)
+
+        for _ in range(3):
+            run_window(0.1)
+        assert limiter.limit == 4
+        run_window(0.5)
+        assert limiter.limit == 2
+        run_window(0.1, error=True)
+        assert limiter.limit == 1
+
+    @pytest.mark.unit
+    def test_adaptive_concurrency_limiter_mixed_latencies(self):
+        """
+        Verify slower kinds created after fast ones aren't taken for an overload, and a slowdown of all
+        kinds still decreases the limit
+        :return: None
+        """
+        limiter = AdaptiveConcurrencyLimiter(initial=5, max_limit=8, window=5)
+
+        def run_window(operations):
+            for _ in range(limiter.limit):
+                assert limiter.acquire(timeout=1)
+            for kind, latency in operations:
+                limiter.release(latency, key=kind)
+            while limiter.in_flight:
+                limiter.release(0.01, key="Secret")
+
+        for _ in range(2):
+            run_window([("Secret", 0.01)] * 5)
+        for _ in range(10):
+            run_window([("Secret", 0.01)] * 3 + [("DeploymentConfig", 0.04)] * 2)
+        assert limiter.limit == 8
+        assert all(sample.limit > 5 for sample in list(limiter.history)[1:])
+
+        run_window([("Secret", 0.05)] * 3 + [("DeploymentConfig", 0.2)] * 2)
+        assert limiter.limit == 4
+
+    @pytest.mark.unit
+    def test_staged_pipeline(self):
+        """
+        Verify items flow through the stages, failing items are counted without stopping the stage and join
+        waits for held items
+        :return: None
+        """
+        collected = list()
+        pipeline = StagedPipeline(name="Test")
+
+        def square(n):
+            if n == 3:
+                raise ValueError(n)
+            return [n * n]
+
+        pipeline.add_stage("split", range)
+        pipeline.add_stage("square", square, workers=3)
+        pipeline.add_stage("collect", collected.append, workers=2)
+        with pytest.raises(KeyError):
+            pipeline.put("missing", 1)
+        with pipeline:
+            pipeline.put("split", 2)
+            pipeline.put("split", 5)
+            # An item processed outside of the stages i.e. waiting on a watch
+            pipeline.hold()
+            assert not pipeline.join(timeout=0.2)
+            pipeline.put("collect", 100)
+            pipeline.release()
+            assert pipeline.join(timeout=5)
+        assert sorted(collected) == [0, 0, 1, 1, 4, 16, 100]
+        assert [(stats.name, stats.workers, stats.processed, stats.failed) for stats in pipeline.stats] == [
+            ("split", 1, 2, 0),
+            ("square", 3, 7, 1),
+            ("collect", 2, 7, 0),
+        ]
+        assert all(not stage.threads for stage in pipeline._stages)
+
+    @pytest.mark.unit
+    def test_rate_limiter(self):
+        """
+        Verify requests beyond the burst are spread at the rate limit
+        :return: None
+        """
+        rate_limiter = RateLimiter(rate=20, burst=2)
+        start_time = time.monotonic()
+        for _ in range(4):
+            rate_limiter.acquire()
+        assert 0.09 <= time.monotonic() - start_time < 1
+        assert RateLimiter(rate=None).acquire() == 0.0
+
+    @pytest.mark.unit
+    def test_rate_limiter_shared_by_threads(self):
+        """
+        Verify threads sharing a rate limiter are limited together, and the burst is refilled while idle
+        :return: None
+        """
+        rate_limiter = RateLimiter(rate=50, burst=2)
+        waited = list()
+
+        def request():
+            for _ in range(3):
+                with rate_limiter:
+                    pass
+            waited.append(rate_limiter.acquire())
+
+        threads = [Thread(target=request) for _ in range(4)]
+        start_time = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        # 16 requests, 2 without waiting and 14 at 50 per second
+        assert 0.27 <= time.monotonic() - start_time < 2
+        assert len(waited) == 4
+        time.sleep(0.1)
+        assert rate_limiter.acquire() == 0.0
+        assert rate_limiter.acquire() == 0.0
+        assert rate_limiter.acquire() > 0